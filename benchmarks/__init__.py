@@ -0,0 +1,5 @@
+"""Benchmarks run against a seeded copy of the PMS/IMS databases.
+
+Point them at throwaway databases: they insert data and drop/create
+indexes. With no URLs given they use SQLite files in the temp directory.
+"""
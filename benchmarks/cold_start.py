@@ -0,0 +1,89 @@
+"""Cold start of a worker: import, create_app() and the first request.
+
+Usage: python -m benchmarks.cold_start [--workers N] [--pms-url ...] [--ims-url ...]
+
+Each sample runs in a fresh interpreter, like a worker started without
+--preload. The "before" run adds the schema check every worker used to pay
+at import time when main.py ran create_all()/migrations itself. The gap
+between the first and second request is the lazy connect plus first-use
+setup that now happens on the first request instead.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from benchmarks.common import base_parser, build_app, summarize
+
+PROBE_PATH = '/api/categories/?limit=1&fields=id,name'
+PHASES = ('import_ms', 'create_app_ms', 'schema_check_ms',
+          'first_request_ms', 'second_request_ms')
+
+
+def _child(pms_url, ims_url, schema_check):
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+
+    class BenchConfig(object):
+        SQLALCHEMY_DATABASE_URI = pms_url
+        SQLALCHEMY_BINDS = {'IMS_db': ims_url}
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    app = main.create_app(BenchConfig)
+    created = time.perf_counter()
+    if schema_check:
+        from src.api.utils.migrations import upgrade_database
+        with app.app_context():
+            upgrade_database()
+    checked = time.perf_counter()
+
+    client = app.test_client()
+    timings = []
+    for _ in range(2):
+        request_started = time.perf_counter()
+        response = client.get(PROBE_PATH)
+        timings.append((time.perf_counter() - request_started) * 1000)
+        assert response.status_code < 400, response.status_code
+
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'schema_check_ms': (checked - created) * 1000,
+        'first_request_ms': timings[0],
+        'second_request_ms': timings[1],
+    }))
+
+
+def _sample(args, schema_check):
+    command = [sys.executable, '-m', 'benchmarks.cold_start', '--child',
+               '--pms-url', args.pms_url, '--ims-url', args.ims_url]
+    if schema_check:
+        command.append('--schema-check')
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--schema-check', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.pms_url, args.ims_url, args.schema_check)
+        return
+
+    # Make sure the schema exists so the probe request runs a real query.
+    build_app(args.pms_url, args.ims_url)
+    for label, schema_check in (('schema check at startup (before)', True),
+                                ('create_app only (after)', False)):
+        samples = [_sample(args, schema_check) for _ in range(args.workers)]
+        print(f"\n{label}")
+        print(f"{'phase':18} {'median (ms)':>12} {'min':>10} {'max':>10}")
+        for phase in PHASES:
+            stats = summarize([sample[phase] for sample in samples])
+            print(f"{phase[:-3]:18} {stats['median_ms']:>12} {stats['min_ms']:>10} {stats['max_ms']:>10}")
+
+if __name__ == '__main__':
+    main()
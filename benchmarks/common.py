@@ -0,0 +1,77 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from flask import Flask
+from src.api.utils.database import db
+from src.api.utils.migrations import upgrade_database
+
+
+def add_database_arguments(parser):
+    tmp = tempfile.gettempdir()
+    parser.add_argument('--pms-url', default=os.getenv(
+        'BENCH_PMS_URL', f'sqlite:///{os.path.join(tmp, "bench_pms.db")}'))
+    parser.add_argument('--ims-url', default=os.getenv(
+        'BENCH_IMS_URL', f'sqlite:///{os.path.join(tmp, "bench_ims.db")}'))
+    return parser
+
+
+def build_app(pms_url, ims_url):
+    """A bare app bound to the benchmark databases, migrated to the latest
+    schema."""
+    app = Flask('benchmarks')
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=pms_url,
+        SQLALCHEMY_BINDS={'IMS_db': ims_url},
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    with app.app_context():
+        upgrade_database()
+    return app
+
+
+def api_app(pms_url, ims_url, **overrides):
+    """The full API (``create_app``) over the benchmark databases, with the
+    response cache off so runs measure the query and serialization path."""
+    from main import create_app
+
+    class BenchConfig(object):
+        SQLALCHEMY_DATABASE_URI = pms_url
+        SQLALCHEMY_BINDS = {'IMS_db': ims_url}
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        CACHE_BACKEND = 'null'
+        JSON_SORT_KEYS = False
+
+    for name, value in overrides.items():
+        setattr(BenchConfig, name, value)
+    return create_app(BenchConfig)
+
+
+def time_call(func, repeat):
+    """Run ``func`` ``repeat`` times; return the timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(sorted_timings, share):
+    """Nearest-rank percentile of already sorted timings, rounded to 0.001."""
+    position = min(len(sorted_timings) - 1, int(len(sorted_timings) * share))
+    return round(sorted_timings[position], 3)
+
+
+def summarize(timings):
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def base_parser(description):
+    return add_database_arguments(argparse.ArgumentParser(description=description))
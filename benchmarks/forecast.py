@@ -0,0 +1,179 @@
+"""The raw material forecast against a per-material Python loop: same
+figures, and what the request costs as materials and history grow.
+
+Usage: python -m benchmarks.forecast [--materials 5000] [--years 3] [--repeat 5]
+                                     [--pms-url ...] [--ims-url ...]
+
+Fills ``receipt_daily`` directly (no receipts), so it uses databases of its
+own by default rather than the shared benchmark ones. First the most recent
+year of usage is written and the forecast timed for the first 10%, 50% and
+all of the materials, then the older years are added and the full run is
+timed again: only the window is read, so the extra history should not
+show. Finally every figure is compared with a plain Python loop over the
+materials, also timed (exit status 1 on any difference).
+
+Measured on SQLite (3 stocks, usage on 60% of days, 28-day window): 12 ms
+for 500 materials, 73 ms for 2,500 and 162 ms for 5,000 with a year of
+history; 164 ms for 5,000 with three years (3.3M rollup rows). The Python
+loop takes 250 ms for the same 5,000, so NumPy saves about a third; most
+of the rest is reading the ~84k window rows.
+"""
+import math
+import os
+import random
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import delete, func, insert, select
+from src.api.utils.database import db
+from src.api.models import RawMaterial, Stock, StockBalance, ReceiptDaily
+from src.api.utils.forecast import material_forecast, DEFAULT_WINDOW_DAYS, DEFAULT_LEAD_TIME_DAYS, \
+    DEFAULT_COVER_DAYS, SAFETY_FACTOR
+from benchmarks.common import base_parser, build_app, summarize, time_call
+
+STOCKS = 3
+USAGE_SHARE = 0.6
+BATCH_SIZE = 20000
+# The API rounds to 3 places (days of cover to 1), NumPy's way at the halves.
+TOLERANCE = 0.0015
+COVER_TOLERANCE = 0.05 + TOLERANCE
+
+
+def _insert(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+    db.session.commit()
+
+
+def reset(materials, seed):
+    rng = random.Random(seed)
+    for model in (ReceiptDaily, StockBalance, RawMaterial, Stock):
+        db.session.execute(delete(model))
+    db.session.commit()
+    _insert(Stock, ({'id': stock_id, 'stock_code': f'ST{stock_id}'} for stock_id in range(1, STOCKS + 1)))
+    _insert(RawMaterial, ({'id': material_id, 'code': f'RM{material_id:05d}', 'name': f'Material {material_id}',
+                           'default_unit': 'kg'} for material_id in range(1, materials + 1)))
+    _insert(StockBalance, ({'stock_id': stock_id, 'raw_material_id': material_id,
+                            'quantity': rng.randint(0, 500), 'line_count': 1}
+                           for material_id in range(1, materials + 1)
+                           for stock_id in range(1, STOCKS + 1)))
+
+
+def add_usage(materials, first_day, last_day, seed):
+    """One row per material on ``USAGE_SHARE`` of the days, in a random stock."""
+    rng = random.Random(seed)
+
+    def rows():
+        day = first_day
+        while day <= last_day:
+            for material_id in range(1, materials + 1):
+                if rng.random() < USAGE_SHARE:
+                    issued = rng.randint(1, 40)
+                    yield {'stock_id': rng.randint(1, STOCKS), 'raw_material_id': material_id,
+                           'day': day, 'quantity': -issued, 'issued_quantity': issued, 'line_count': 1}
+            day += timedelta(days=1)
+    _insert(ReceiptDaily, rows())
+
+
+def python_forecast(today, window_days=DEFAULT_WINDOW_DAYS, lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                    cover_days=DEFAULT_COVER_DAYS):
+    """The same figures, one material at a time in plain Python."""
+    first_day = today - timedelta(days=window_days)
+    usage = defaultdict(lambda: [0.0] * window_days)
+    for material_id, day, issued in db.session.execute(
+            select(ReceiptDaily.raw_material_id, ReceiptDaily.day, ReceiptDaily.issued_quantity)
+            .where(ReceiptDaily.day >= first_day, ReceiptDaily.day < today,
+                   ReceiptDaily.issued_quantity > 0)):
+        usage[material_id][(day - first_day).days] += float(issued)
+    on_hand = dict(db.session.execute(
+        select(StockBalance.raw_material_id, func.sum(StockBalance.quantity))
+        .group_by(StockBalance.raw_material_id)).all())
+
+    figures = {}
+    for material_id in db.session.execute(select(RawMaterial.id)).scalars():
+        days = usage[material_id]
+        average = sum(days) / window_days
+        deviation = math.sqrt(sum((value - average) ** 2 for value in days) / window_days)
+        quantity = float(on_hand.get(material_id) or 0)
+        reorder_point = average * lead_time_days + SAFETY_FACTOR * deviation * math.sqrt(lead_time_days)
+        reorder = average > 0 and quantity <= reorder_point
+        figures[material_id] = {
+            'on_hand': quantity,
+            'average_daily_usage': average,
+            'usage_deviation': deviation,
+            'reorder_point': reorder_point,
+            'suggested_quantity': max(reorder_point + average * cover_days - quantity, 0) if reorder else 0,
+            'days_of_cover': max(quantity, 0) / average if average > 0 else None,
+        }
+    return figures
+
+
+def differences(rows, figures):
+    """Material ids whose forecast figures differ from the Python loop's."""
+    different = []
+    for row in rows:
+        expected = figures[row['raw_material_id']]
+        for name, value in expected.items():
+            cover = name == 'days_of_cover'
+            actual = row[name] if cover else float(row[name])
+            if (value is None) != (actual is None) or (
+                    value is not None and abs(actual - value) > (COVER_TOLERANCE if cover else TOLERANCE)):
+                different.append(row['raw_material_id'])
+                break
+    return different
+
+
+def main():
+    parser = base_parser(__doc__.splitlines()[0])
+    tmp = tempfile.gettempdir()
+    parser.set_defaults(pms_url=f'sqlite:///{os.path.join(tmp, "bench_forecast_pms.db")}',
+                        ims_url=f'sqlite:///{os.path.join(tmp, "bench_forecast_ims.db")}')
+    parser.add_argument('--materials', type=int, default=5000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    today = date.today()
+    recent_start = today - timedelta(days=365)
+    with build_app(args.pms_url, args.ims_url).app_context():
+        reset(args.materials, args.seed)
+        add_usage(args.materials, recent_start, today - timedelta(days=1), args.seed)
+
+        for share in (0.1, 0.5, 1):
+            count = max(1, int(args.materials * share))
+            # Fewer materials: drop the rest for the run, put them back after.
+            db.session.execute(delete(StockBalance).where(StockBalance.raw_material_id > count))
+            db.session.execute(delete(ReceiptDaily).where(ReceiptDaily.raw_material_id > count))
+            db.session.execute(delete(RawMaterial).where(RawMaterial.id > count))
+            material_forecast(today=today)
+            print(f'{count:>6} materials, 1 year : {summarize(time_call(lambda: material_forecast(today=today), args.repeat))}')
+            db.session.rollback()
+
+        add_usage(args.materials, today - timedelta(days=365 * args.years), recent_start - timedelta(days=1),
+                  args.seed + 1)
+        total_rows = db.session.execute(select(func.count()).select_from(ReceiptDaily)).scalar()
+        rows = material_forecast(today=today)
+        print(f'{args.materials:>6} materials, {args.years} years ({total_rows} rollup rows): '
+              f'{summarize(time_call(lambda: material_forecast(today=today), args.repeat))}')
+
+        figures = python_forecast(today)
+        print(f'{args.materials:>6} materials, Python loop: '
+              f'{summarize(time_call(lambda: python_forecast(today), args.repeat))}')
+        different = differences(rows, figures)
+
+    if different:
+        print(f'{len(different)} material(s) differ, e.g.', different[:10])
+        sys.exit(1)
+    print('Every figure matches the Python loop.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""EXPLAIN plans and latency of the hot queries with and without the
+secondary indexes added by migration 0005.
+
+Usage: python -m benchmarks.index_plans [--scale N] [--repeat N] [--pms-url ...] [--ims-url ...]
+
+The indexes are dropped for the "without" run and re-created afterwards, so
+never point this at a live database.
+"""
+from datetime import date
+from sqlalchemy import select
+from src.api.utils.database import db
+from src.api.models import Invoice, Receipt, ReceiptRawMaterial
+from src.api.migrations.m0005_hot_path_indexes import INDEXES
+from src.api.utils.material_costs import material_cost_query
+from src.api.utils.reconciliation import invoiced_statement, received_statement
+from benchmarks.common import base_parser, build_app, time_call, summarize
+from benchmarks.seed import is_seeded, seed_dataset
+
+WINDOW = (date(2024, 3, 1), date(2024, 3, 31))
+
+
+def hot_queries():
+    """``(name, bind_key, statement)`` for the queries the API runs most."""
+    return [
+        ('material_costs', None, material_cost_query()),
+        ('invoiced_by_material_window', None, invoiced_statement(*WINDOW)),
+        ('invoices_by_supplier_window', None,
+         select(Invoice)
+         .where(Invoice.supplier_id == 3, Invoice.created_date.between(*WINDOW))
+         .order_by(Invoice.id).limit(100)),
+        ('received_by_material_window', 'IMS_db', received_statement(*WINDOW)),
+        ('receipts_by_stock_window', 'IMS_db',
+         select(Receipt)
+         .where(Receipt.stock_id == 2, Receipt.created_date.between(*WINDOW))
+         .order_by(Receipt.id).limit(100)),
+        ('movement_history', 'IMS_db',
+         select(ReceiptRawMaterial)
+         .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
+         .where(ReceiptRawMaterial.raw_material_id == 17)
+         .order_by(ReceiptRawMaterial.id).limit(100)),
+    ]
+
+
+def _set_indexes(present):
+    for bind_key, metadata in db.metadatas.items():
+        with db.engines[bind_key].begin() as connection:
+            for index in INDEXES.get(bind_key, ()):
+                if present:
+                    index.create(connection, checkfirst=True)
+                else:
+                    index.drop(connection, checkfirst=True)
+            # Refresh the optimizer statistics so the plans reflect the change.
+            if connection.dialect.name == 'sqlite':
+                connection.exec_driver_sql('ANALYZE')
+            else:
+                connection.exec_driver_sql(
+                    'ANALYZE TABLE ' + ', '.join(metadata.tables))
+
+
+def explain(bind_key, stmt):
+    engine = db.engines[bind_key]
+    compiled = stmt.compile(dialect=engine.dialect)
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    with engine.connect() as connection:
+        result = connection.exec_driver_sql(prefix + str(compiled), params)
+        columns = list(result.keys())
+        return [dict(zip(columns, row)) for row in result]
+
+
+def run_phase(repeat):
+    report = {}
+    for name, bind_key, stmt in hot_queries():
+        # Warm the page cache once so both phases start from the same state.
+        db.session.execute(stmt).all()
+        timings = time_call(lambda: db.session.execute(stmt).all(), repeat)
+        report[name] = {'plan': explain(bind_key, stmt), **summarize(timings)}
+    db.session.rollback()
+    return report
+
+
+def _print_plan(plan):
+    for row in plan:
+        print('      ' + ', '.join(f'{key}={value}' for key, value in row.items()
+                                   if value is not None))
+
+
+def main():
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    app = build_app(args.pms_url, args.ims_url)
+    with app.app_context():
+        if not is_seeded():
+            print('Seeding:', seed_dataset(args.scale))
+
+        _set_indexes(False)
+        without = run_phase(args.repeat)
+        _set_indexes(True)
+        with_indexes = run_phase(args.repeat)
+
+        print(f"{'query':32} {'without (ms)':>14} {'with (ms)':>12} {'speedup':>8}")
+        for name in without:
+            before = without[name]['median_ms']
+            after = with_indexes[name]['median_ms']
+            speedup = f'{before / after:.1f}x' if after else '-'
+            print(f'{name:32} {before:>14} {after:>12} {speedup:>8}')
+        for name in without:
+            print(f'\n{name}')
+            print('   without indexes:')
+            _print_plan(without[name]['plan'])
+            print('   with indexes:')
+            _print_plan(with_indexes[name]['plan'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Throughput of the API under concurrent load, per gunicorn worker count.
+
+Usage:
+    python -m benchmarks.load_test [--workers 1,2,4] [--threads 4] [--clients 32]
+                                   [--duration 15] [--pms-url ...] [--ims-url ...]
+    python -m benchmarks.load_test --url http://host:5000   # an already running server
+
+Without --url it seeds the benchmark databases if needed, then starts
+gunicorn with gunicorn.conf.py once per worker count and drives it from
+several client processes. The response cache is off unless --cache is
+given, so the numbers measure the query and serialization path.
+"""
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+from benchmarks.common import api_app, base_parser, build_app
+from benchmarks.seed import is_seeded, seed_dataset
+
+# Sparse fieldsets where the full schema nests every receipt/invoice line,
+# so one huge payload does not dominate the mix.
+DEFAULT_PATHS = (
+    '/api/stocks/?limit=5&fields=id,stock_code,stock_item',
+    '/api/raw-materials/?limit=50&fields=id,code,name,total_stock_quantity',
+    '/api/invoices/?limit=20',
+    '/api/receipts/?limit=20',
+    '/api/raw-materials/rm-invoice-prices/',
+    '/api/raw-materials/reconciliation/',
+)
+
+
+def bench_app():
+    """App factory for gunicorn: the API over the benchmark databases."""
+    return api_app(os.environ['BENCH_PMS_URL'], os.environ['BENCH_IMS_URL'],
+                   CACHE_BACKEND=os.getenv('BENCH_CACHE_BACKEND', 'null'))
+
+
+def _client_loop(base_url, paths, deadline, offset):
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    latencies = []
+    errors = 0
+    index = offset
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    return latencies, errors
+
+
+def _client_process(base_url, paths, deadline, clients, first_offset):
+    with ThreadPoolExecutor(clients) as executor:
+        results = list(executor.map(
+            lambda offset: _client_loop(base_url, paths, deadline, offset),
+            range(first_offset, first_offset + clients)))
+    latencies = [latency for result in results for latency in result[0]]
+    return latencies, sum(result[1] for result in results)
+
+
+def drive(base_url, paths, clients, duration, processes):
+    """Run ``clients`` keep-alive clients for ``duration`` seconds, spread
+    over ``processes`` so the load generator is not the bottleneck."""
+    deadline = time.monotonic() + duration
+    per_process = max(1, clients // processes)
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [executor.submit(_client_process, base_url, paths, deadline,
+                                   per_process, number * per_process)
+                   for number in range(processes)]
+        results = [future.result() for future in futures]
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    if not latencies:
+        return {'requests': 0, 'errors': errors, 'rps': 0.0,
+                'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+
+    def percentile(share):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * share))] * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def _wait_until_up(base_url, timeout=30):
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            connection.request('GET', '/api/cache/stats')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server at {base_url} did not come up')
+
+
+def run_gunicorn(args, workers):
+    port = args.port
+    env = dict(os.environ, BENCH_PMS_URL=args.pms_url, BENCH_IMS_URL=args.ims_url,
+               GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(args.threads),
+               PORT=str(port), GUNICORN_LOG_LEVEL='warning',
+               BENCH_CACHE_BACKEND='memory' if args.cache else 'null')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         'benchmarks.load_test:bench_app()'],
+        env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_until_up(base_url)
+        return drive(base_url, args.paths, args.clients, args.duration, args.client_processes)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _print_row(label, result, baseline_rps):
+    scaling = f"{result['rps'] / baseline_rps:.2f}x" if baseline_rps else '-'
+    print(f"{label:>10} {result['rps']:>10} {scaling:>8} {result['p50_ms']!s:>9} "
+          f"{result['p95_ms']!s:>9} {result['p99_ms']!s:>9} {result['errors']:>7}")
+
+
+def main():
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Drive an already running server instead.')
+    parser.add_argument('--workers', default='1,2,4',
+                        help='Comma separated gunicorn worker counts to compare.')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--client-processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--cache', action='store_true')
+    parser.add_argument('--paths', nargs='+', default=list(DEFAULT_PATHS))
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'workers':>10} {'req/s':>10} {'scaling':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'errors':>7}")
+    if args.url:
+        result = drive(args.url, args.paths, args.clients, args.duration, args.client_processes)
+        _print_row('external', result, None)
+        return
+
+    app = build_app(args.pms_url, args.ims_url)
+    with app.app_context():
+        if not is_seeded():
+            seed_dataset(args.scale)
+    baseline_rps = None
+    for workers in [int(value) for value in args.workers.split(',')]:
+        result = run_gunicorn(args, workers)
+        baseline_rps = baseline_rps or result['rps']
+        _print_row(str(workers), result, baseline_rps)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""Latency, SQL statement count and peak memory of every blueprint route,
+optionally compared against a stored baseline.
+
+Usage:
+    python -m benchmarks.routes [--repeat N] [--warmup N] [--only TEXT] [--no-writes]
+                                [--scale N | --lines N] [--pms-url ...] [--ims-url ...]
+                                [--save-baseline FILE] [--baseline FILE] [--tolerance 0.25]
+
+GET routes are discovered from the URL map and called through the Flask
+test client: list routes with ``?limit=50``, detail routes with id 1. The
+POST/PUT/DELETE routes run the cases in ``write_cases()``; they insert
+rows, so point this at throwaway databases. Any blueprint route that is not
+covered is listed at the end, so new routes do not silently go unmeasured.
+
+With --baseline the exit status is 1 when a route got slower (p95 beyond
+--tolerance and --min-delta-ms), runs more SQL statements, or peaks at
+more memory than recorded.
+"""
+import gc
+import json
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from benchmarks.common import api_app, base_parser, build_app, percentile
+from benchmarks.seed import is_seeded, scale_for_lines, seed_dataset
+
+SAMPLE_ID = 1
+LIST_QUERY = 'limit=50'
+# Routes that take their own arguments instead of the list ones.
+QUERY_STRINGS = {
+    'raw_material_routes.get_raw_materials_buying_prices': '',
+    'raw_material_routes.get_raw_materials_invoice_stock': '',
+    'raw_material_routes.get_reconciliation': 'date_from=2024-03-01&date_to=2024-03-31',
+    'raw_material_routes.get_raw_material_forecast': '',
+    'analytics_routes.get_purchase_analytics': 'bucket=month&date_from=2024-01-01&date_to=2024-12-31',
+    'analytics_routes.get_receipt_analytics': 'bucket=week&date_from=2024-01-01&date_to=2024-03-31',
+}
+ID_CONVERTER = re.compile(r'<int:\w+>')
+# Resources that take a list on POST and PUT, and how to build one row.
+LIST_RESOURCES = {
+    'suppliers': lambda n: {'name': f'Bench supplier {n}'},
+    'goods': lambda n: {'name': f'Bench goods {n}', 'material_code': 'RM00011',
+                        'convert_rate': 5, 'goods_unit': 'bag', 'supplier_id': 1},
+    'categories': lambda n: {'name': f'Bench category {n}'},
+    'raw-materials': lambda n: {'code': f'BENCH{n:07d}', 'name': f'Bench material {n}',
+                                'default_unit': 'kg', 'category_id': 1},
+    'stocks': lambda n: {'stock_code': f'BENCH{n:07d}'},
+}
+DELETABLE = ('suppliers', 'goods')
+# Offset for the values an update writes, so it never matches the created row.
+UPDATE_OFFSET = 5000000
+# Documents per batch POST; codes are n * BATCH_DOCUMENTS + offset.
+BATCH_DOCUMENTS = 20
+
+Case = namedtuple('Case', 'name method rule prepare')
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _invoice(n):
+    return {
+        'invoice': {'code': f'BENCH{n:07d}', 'created_date': '2025-01-15', 'supplier_id': 1},
+        'list_of_bought_goods': [
+            {'goods_id': goods_id, 'buy_quantity': str(n % 7 + 1), 'buying_price_per_unit': '12000'}
+            for goods_id in range(1, 6)],
+    }
+
+
+def _receipt(n):
+    return {
+        'receipt': {'receipt_code': f'BENCH{n:07d}', 'created_date': '2025-01-15', 'stock_id': 1},
+        'list_of_raw_materials': [
+            {'raw_material_id': raw_material_id, 'quantity': str(n % 7 + 1)}
+            for raw_material_id in range(1, 6)],
+    }
+
+
+def _create(client, resource, n):
+    """Insert one row outside the timed call; returns its id."""
+    if resource == 'invoices':
+        return client.post('/api/invoices/', json=_invoice(n)).get_json()['id']
+    if resource == 'receipts':
+        return client.post('/api/receipts/', json=_receipt(n)).get_json()['id']
+    return client.post(f'/api/{resource}/', json=[LIST_RESOURCES[resource](n)]).get_json()[0]['id']
+
+
+def read_cases(app):
+    cases = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if 'GET' not in rule.methods or '.' not in rule.endpoint:
+            continue
+        path = ID_CONVERTER.sub(str(SAMPLE_ID), rule.rule)
+        default_query = '' if rule.rule.endswith('>') else LIST_QUERY
+        query = QUERY_STRINGS.get(rule.endpoint, default_query)
+        url = f'{path}?{query}' if query else path
+        cases.append(Case(f'GET {url}', 'GET', rule.rule,
+                          lambda client, n, url=url: (url, None)))
+    return cases
+
+
+def write_cases():
+    cases = []
+    for resource, build in LIST_RESOURCES.items():
+        cases.append(Case(
+            f'POST /api/{resource}/', 'POST', f'/api/{resource}/',
+            lambda client, n, resource=resource, build=build: (f'/api/{resource}/', [build(n)])))
+        cases.append(Case(
+            f'PUT /api/{resource}/<id>', 'PUT', f'/api/{resource}/<int:id>',
+            lambda client, n, resource=resource, build=build: (
+                f'/api/{resource}/{_create(client, resource, n)}', build(n + UPDATE_OFFSET))))
+        cases.append(Case(
+            f'PUT /api/{resource}/', 'PUT', f'/api/{resource}/',
+            lambda client, n, resource=resource, build=build: (
+                f'/api/{resource}/',
+                [dict(build(n + UPDATE_OFFSET), id=_create(client, resource, n))])))
+        if resource in DELETABLE:
+            cases.append(Case(
+                f'DELETE /api/{resource}/<id>', 'DELETE', f'/api/{resource}/<int:id>',
+                lambda client, n, resource=resource: (
+                    f'/api/{resource}/{_create(client, resource, n)}', None)))
+    for resource, build in (('invoices', _invoice), ('receipts', _receipt)):
+        cases.append(Case(
+            f'POST /api/{resource}/', 'POST', f'/api/{resource}/',
+            lambda client, n, resource=resource, build=build: (f'/api/{resource}/', build(n))))
+        cases.append(Case(
+            f'PUT /api/{resource}/<id>', 'PUT', f'/api/{resource}/<int:id>',
+            lambda client, n, resource=resource, build=build: (
+                f'/api/{resource}/{_create(client, resource, n)}', build(n + UPDATE_OFFSET))))
+        cases.append(Case(
+            f'POST /api/{resource}/batch', 'POST', f'/api/{resource}/batch',
+            lambda client, n, resource=resource, build=build: (
+                f'/api/{resource}/batch',
+                [build(n * BATCH_DOCUMENTS + offset) for offset in range(BATCH_DOCUMENTS)])))
+    return cases
+
+
+def uncovered_routes(app, cases):
+    """Blueprint ``METHOD rule`` pairs that no case exercises."""
+    covered = {(case.method, case.rule) for case in cases}
+    return [f'{method} {rule.rule}'
+            for rule in app.url_map.iter_rules() if '.' in rule.endpoint
+            for method in sorted(rule.methods - {'HEAD', 'OPTIONS'})
+            if (method, rule.rule) not in covered]
+
+
+def run_case(client, case, repeat, warmup, counter, first_n):
+    # Untimed calls first, so compiled-statement caches are warm.
+    for iteration in range(warmup):
+        path, payload = case.prepare(client, first_n + iteration)
+        client.open(path, method=case.method, json=payload).get_data()
+    first_n += warmup
+    timings = []
+    queries = []
+    status = None
+    # Like timeit: a collection landing in one sample is noise, not the route.
+    gc.collect()
+    gc.disable()
+    try:
+        for iteration in range(repeat):
+            path, payload = case.prepare(client, first_n + iteration)
+            before = counter.count
+            started = time.perf_counter()
+            response = client.open(path, method=case.method, json=payload)
+            response.get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count - before)
+            status = response.status_code
+    finally:
+        gc.enable()
+
+    # Measured apart from the timings; tracing slows every allocation down.
+    path, payload = case.prepare(client, first_n + repeat)
+    tracemalloc.start()
+    try:
+        client.open(path, method=case.method, json=payload).get_data()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'status': status,
+        'p50_ms': percentile(timings, 0.5),
+        'p95_ms': percentile(timings, 0.95),
+        'queries': max(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """``{case: [reasons]}`` for every case that regressed against ``baseline``."""
+    regressions = {}
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        reasons = []
+        if (result['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+                and result['p95_ms'] - before['p95_ms'] > min_delta_ms):
+            reasons.append(f"p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+        if result['queries'] > before['queries']:
+            reasons.append(f"queries {before['queries']} -> {result['queries']}")
+        if (result['peak_kib'] > before['peak_kib'] * (1 + tolerance)
+                and result['peak_kib'] - before['peak_kib'] > 64):
+            reasons.append(f"peak {before['peak_kib']} -> {result['peak_kib']} KiB")
+        if result['status'] != before['status']:
+            reasons.append(f"status {before['status']} -> {result['status']}")
+        if reasons:
+            regressions[name] = reasons
+    return regressions
+
+
+def main():
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', help='Run only the cases whose name contains this.')
+    parser.add_argument('--no-writes', action='store_true')
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--scale', type=float, default=1)
+    size.add_argument('--lines', type=int)
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative growth of p95 and peak memory.')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='Ignore p95 changes smaller than this.')
+    args = parser.parse_args()
+
+    with build_app(args.pms_url, args.ims_url).app_context():
+        if not is_seeded():
+            print('Seeding:', seed_dataset(
+                scale_for_lines(args.lines) if args.lines else args.scale))
+    app = api_app(args.pms_url, args.ims_url)
+    client = app.test_client()
+    counter = QueryCounter()
+
+    cases = read_cases(app) + ([] if args.no_writes else write_cases())
+    missing = uncovered_routes(app, cases)
+    if args.only:
+        cases = [case for case in cases if args.only in case.name]
+
+    # Unique per run, so repeated runs never collide on codes.
+    first_n = int(time.time()) % 100000 * 10
+    results = {}
+    print(f"{'case':<80} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'peak KiB':>9}")
+    for case in cases:
+        result = results[case.name] = run_case(client, case, args.repeat, args.warmup, counter, first_n)
+        first_n += args.warmup + args.repeat + 1
+        print(f"{case.name:<80} {result['status']:>6} {result['p50_ms']:>9} "
+              f"{result['p95_ms']:>9} {result['queries']:>8} {result['peak_kib']:>9}")
+    if missing:
+        print('Not covered:', ', '.join(missing))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({
+                'meta': {'python': platform.python_version(), 'repeat': args.repeat,
+                         'pms_url': args.pms_url.split('://')[0]},
+                'results': results,
+            }, baseline_file, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.save_baseline}')
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for name, reasons in sorted(regressions.items()):
+            print(f'REGRESSION {name}: ' + '; '.join(reasons))
+        if regressions:
+            sys.exit(1)
+        print('No regressions against', args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Synthetic PMS/IMS dataset for the benchmarks.
+
+Usage: python -m benchmarks.seed [--scale N | --lines N] [--seed N] [--pms-url ...] [--ims-url ...]
+
+--lines picks the scale for a target number of invoice plus receipt lines,
+from 10k up to 10M; SQLite or a local MySQL (mysql+...://) both work.
+"""
+import math
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import insert, select, func
+from src.api.utils.database import db
+from src.api.models import (Supplier, Goods, Invoice, InvoiceGoods, Category, RawMaterial,
+                            Stock, Receipt, ReceiptRawMaterial)
+from src.api.utils.migrations import run_backfills
+from benchmarks.common import base_parser, build_app
+
+BATCH_SIZE = 5000
+START_DATE = date(2024, 1, 1)
+DAYS = 730
+# Mean of randint(1, 10).
+LINES_PER_DOCUMENT = 5.5
+
+
+def _insert(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+
+
+def _documents_with_lines(rng, model, line_model, count, make_document, make_line):
+    """Insert ``count`` documents with 1-10 lines each, a chunk at a time so
+    memory stays flat at any scale. Returns the number of lines."""
+    total_lines = 0
+    for first_id in range(1, count + 1, BATCH_SIZE):
+        document_ids = range(first_id, min(first_id + BATCH_SIZE, count + 1))
+        _insert(model, (make_document(document_id) for document_id in document_ids))
+        lines = [make_line(document_id)
+                 for document_id in document_ids
+                 for _ in range(rng.randint(1, 10))]
+        _insert(line_model, lines)
+        db.session.commit()
+        total_lines += len(lines)
+    return total_lines
+
+
+def is_seeded():
+    return db.session.execute(select(func.count(Invoice.id))).scalar() > 0
+
+
+def scale_for_lines(lines):
+    """The ``scale`` that yields about ``lines`` invoice plus receipt lines."""
+    return lines / (2 * 2000 * LINES_PER_DOCUMENT)
+
+
+def seed_dataset(scale=1, seed=42):
+    """Insert a reproducible dataset: ``2000 * scale`` invoices and receipts
+    of 1-10 lines each (about 22k lines per unit of scale), spread over two
+    years. Master data grows with the square root of the scale. Returns the
+    row counts."""
+    rng = random.Random(seed)
+    growth = max(1, int(math.sqrt(scale)))
+    suppliers = 20 * growth
+    materials = 200 * growth
+    goods = 300 * growth
+    stocks = 5 * growth
+    categories = 10
+    invoices = max(1, int(2000 * scale))
+    receipts = max(1, int(2000 * scale))
+    # A few codes exist on one side only, as they do in production.
+    material_codes = [f'RM{index:05d}' for index in range(1, materials + 11)]
+
+    _insert(Supplier, ({'id': index, 'name': f'Supplier {index}'}
+                       for index in range(1, suppliers + 1)))
+    _insert(Goods, ({
+        'id': index,
+        'name': f'Goods {index}',
+        'material_code': rng.choice(material_codes[10:]),
+        'convert_rate': rng.choice([1, 5, 10, 25]),
+        'goods_unit': rng.choice(['kg', 'bag', 'box']),
+        'supplier_id': rng.randint(1, suppliers),
+    } for index in range(1, goods + 1)))
+    invoice_lines = _documents_with_lines(
+        rng, Invoice, InvoiceGoods, invoices,
+        lambda invoice_id: {
+            'id': invoice_id,
+            'code': f'INV{invoice_id:08d}',
+            'created_date': START_DATE + timedelta(days=rng.randrange(DAYS)),
+            'supplier_id': rng.randint(1, suppliers),
+        },
+        lambda invoice_id: {
+            'invoice_id': invoice_id,
+            'goods_id': rng.randint(1, goods),
+            'buy_quantity': Decimal(rng.randint(1, 50000)) / 1000,
+            'buying_price_per_unit': rng.randint(1, 500) * 1000,
+        })
+
+    _insert(Category, ({'id': index, 'name': f'Category {index}'}
+                       for index in range(1, categories + 1)))
+    _insert(RawMaterial, ({
+        'id': index,
+        'code': code,
+        'name': f'Material {code}',
+        'default_unit': 'kg',
+        'category_id': rng.randint(1, categories),
+    } for index, code in enumerate(material_codes[:materials], start=1)))
+    _insert(Stock, ({'id': index, 'stock_code': f'ST{index}'}
+                    for index in range(1, stocks + 1)))
+    receipt_lines = _documents_with_lines(
+        rng, Receipt, ReceiptRawMaterial, receipts,
+        lambda receipt_id: {
+            'id': receipt_id,
+            'receipt_code': f'RC{receipt_id:08d}',
+            'created_date': START_DATE + timedelta(days=rng.randrange(DAYS)),
+            'stock_id': rng.randint(1, stocks),
+        },
+        lambda receipt_id: {
+            'receipt_id': receipt_id,
+            'raw_material_id': rng.randint(1, materials),
+            'quantity': Decimal(rng.randint(-20000, 100000)) / 1000,
+        })
+    db.session.commit()
+
+    # The rows bypass the write paths: fill the derived tables the way an
+    # upgraded database gets them.
+    run_backfills()
+    return {
+        'suppliers': suppliers,
+        'goods': goods,
+        'raw_materials': materials,
+        'stocks': stocks,
+        'invoices': invoices,
+        'invoice_lines': invoice_lines,
+        'receipts': receipts,
+        'receipt_lines': receipt_lines,
+    }
+
+
+def main():
+    parser = base_parser('Seed the benchmark databases.')
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--scale', type=float, default=1)
+    size.add_argument('--lines', type=int,
+                      help='Target invoice plus receipt lines (sets --scale).')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if args.lines:
+        args.scale = scale_for_lines(args.lines)
+    app = build_app(args.pms_url, args.ims_url)
+    with app.app_context():
+        if is_seeded():
+            print('Databases already hold invoices; not seeding again.')
+            return
+        print(seed_dataset(args.scale, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Generated serializers against marshmallow's dump(): identical output,
+and how much faster.
+
+Usage: python -m benchmarks.serializers [--goods 50000] [--rows 500] [--repeat 5]
+                                        [--pms-url ...] [--ims-url ...]
+
+First every schema, whole and with a few sparse fieldsets, is dumped both
+ways over real rows and the encoded JSON compared byte for byte (exit
+status 1 on any difference). Then ``GET /api/goods/`` is timed with
+COMPILED_SERIALIZERS on and off, after topping the goods table up to
+--goods rows.
+"""
+import sys
+from sqlalchemy import func, insert, select
+from src.api.utils.database import db
+from src.api.models import Goods
+from src.api.schemas import all_schemas
+from src.api.utils.pagination import schema_for
+from benchmarks.common import api_app, base_parser, build_app, summarize, time_call
+from benchmarks.seed import is_seeded, seed_dataset
+
+SCHEMAS = [
+    (all_schemas.SupplierSchema, (None, ('id', 'name'), ('goods', 'id'), ('invoices',))),
+    (all_schemas.GoodsSchema, (None, ('id', 'name', 'supplier'), ('purchased_history',))),
+    (all_schemas.InvoiceSchema, (None, ('code', 'created_date'), ('list_of_bought_goods', 'supplier'))),
+    (all_schemas.InvoiceGoodsSchema, (None, ('buy_quantity', 'goods', 'invoice'))),
+    (all_schemas.StockSchema, (None, ('id', 'stock_code'), ('receipts',))),
+    (all_schemas.CategorySchema, (None, ('name',))),
+    (all_schemas.ReceiptSchema, (None, ('receipt_code', 'stock'), ('list_of_raw_materials',))),
+    (all_schemas.ReceiptRawMaterialSchema, (None, ('quantity', 'raw_material', 'receipt'))),
+    (all_schemas.RawMaterialSchema, (None, ('code', 'category_name'), ('movement_history',))),
+]
+
+
+def check_identical(app, rows):
+    """Names of the schema/fieldset combinations whose outputs differ."""
+    failures = []
+    for schema_cls, fieldsets in SCHEMAS:
+        model = schema_cls.Meta.model
+        for only in fieldsets:
+            schema = schema_for(schema_cls, only)
+            fetched = db.session.execute(
+                select(model).options(*schema.loader_options())
+                .order_by(model.id).limit(rows)).scalars().all()
+            expected = app.json.dumps(schema.dump(fetched))
+            actual = app.json.dumps(schema.serialize(fetched))
+            label = f"{schema_cls.__name__}({', '.join(only) if only else 'all'})"
+            print(f'{label:<60} {len(fetched):>6} rows  '
+                  f"{'identical' if actual == expected else 'DIFFERENT'}")
+            if actual != expected:
+                failures.append(label)
+            db.session.expunge_all()
+    return failures
+
+
+def top_up_goods(count):
+    existing = db.session.execute(select(func.max(Goods.id))).scalar() or 0
+    if existing >= count:
+        return
+    db.session.execute(insert(Goods), [{
+        'id': index,
+        'name': f'Goods {index}',
+        'material_code': f'RM{index % 200 + 1:05d}',
+        'convert_rate': (1, 5, 10, 25)[index % 4],
+        'goods_unit': 'kg',
+        'supplier_id': index % 20 + 1,
+    } for index in range(existing + 1, count + 1)])
+    db.session.commit()
+
+
+def main():
+    parser = base_parser(__doc__.splitlines()[0])
+    parser.add_argument('--goods', type=int, default=50000)
+    parser.add_argument('--rows', type=int, default=500,
+                        help='Rows per schema for the identity check.')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with build_app(args.pms_url, args.ims_url).app_context():
+        if not is_seeded():
+            print('Seeding:', seed_dataset())
+        top_up_goods(args.goods)
+
+    app = api_app(args.pms_url, args.ims_url)
+    with app.app_context():
+        failures = check_identical(app, args.rows)
+
+    results = {}
+    for compiled in (False, True):
+        app.config['COMPILED_SERIALIZERS'] = compiled
+        client = app.test_client()
+        client.get('/api/goods/').get_data()
+        results[compiled] = summarize(time_call(
+            lambda: client.get('/api/goods/').get_data(), args.repeat))
+        print(f"GET /api/goods/ {'compiled' if compiled else 'marshmallow':>12}: {results[compiled]}")
+    print(f"speedup: {results[False]['median_ms'] / results[True]['median_ms']:.2f}x")
+
+    if failures:
+        print('Different output:', ', '.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Gunicorn settings, picked up automatically from the working directory.
+#
+# Threaded workers (gthread): each worker process serves GUNICORN_THREADS
+# requests at once, so one slow aggregation no longer blocks the others,
+# and the processes spread the load over the cores. Every request runs in
+# its own app context, which is what Flask-SQLAlchemy scopes db.session to,
+# so threads never share a session; each worker keeps its own engine pools.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# The database pools are sized from the same variable, so workers x
+# (threads + 3) connections per bind in total; see engine_options().
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# Import the app once in the master; workers fork from it.
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks never build up.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def _engines(server):
+    from src.api.utils.database import db
+    app = server.app.wsgi()
+    with app.app_context():
+        return list(db.engines.values())
+
+
+def when_ready(server):
+    # More threads than pooled connections just moves the queue into the pool.
+    for engine in _engines(server):
+        capacity = getattr(engine.pool, 'capacity', None)
+        if capacity is not None and threads > capacity:
+            server.log.warning(
+                f"{threads} threads per worker but the '{engine.pool.metrics_name}' "
+                f"pool allows only {capacity} connections")
+
+
+def post_fork(server, worker):
+    # Connections opened in the master (there should be none) must not be
+    # shared with the children; drop them without closing the parent's sockets.
+    for engine in _engines(server):
+        engine.dispose(close=False)
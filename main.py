@@ -1,67 +1,226 @@
 import os
+import time
 import logging
+import click
 from flask import Flask
+from flask.cli import with_appcontext
 from src.api.utils.database import db
+from src.api.utils.cache import response_cache
+from src.api.utils.json_provider import init_json
+from src.api.utils.pool_metrics import pool_stats_view
+from src.api.utils.metrics import request_metrics
+from src.api.utils.query_watch import query_watch
 from src.api.config.config import ProductionConfig, DevelopmentConfig, TestingConfig
 from src.api.utils.responses import response_with
 import src.api.utils.responses as resp
-from src.api.routes import supplier_routes, goods_routes, invoice_routes, raw_material_routes, stocks_routes, categories_routes, receipts_routes
+from src.api.utils.conditional import conditional_get_response, add_validators
+from src.api.utils.migrations import upgrade_database, pending_migrations
+from src.api.utils.material_costs import rebuild_material_costs, verify_material_costs
+from src.api.utils.stock_ledger import rebuild_stock_balances, verify_stock_balances
+from src.api.utils.idempotency import prune_idempotency_records
+from src.api.utils.stock_snapshots import build_stock_snapshots, reset_stock_snapshots, verify_stock_snapshots
+from src.api.utils.analytics import backfill_rollups, verify_rollups, DEFAULT_BACKFILL_CHUNK_DAYS
+from src.api.models import IdempotencyRecord, ImsIdempotencyRecord
+from src.api.routes import supplier_routes, goods_routes, invoice_routes, raw_material_routes, stocks_routes, categories_routes, receipts_routes, analytics_routes
 
-app = Flask(__name__)
 log_file_path = 'app_activity.log'
 
-if os.environ.get('WORK_ENV') == 'PROD':
-    app_config = ProductionConfig
-    logging.basicConfig(
-        level=logging.WARNING,
-        format='%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]',
-        filename=log_file_path,
-        filemode='a'
-    )
-elif os.environ.get('WORK_ENV') == 'TEST':
-    app_config = TestingConfig
-    logging.basicConfig(level=logging.INFO)
-else:
-    app_config = DevelopmentConfig
+
+def config_from_env():
+    """Pick the config class from ``WORK_ENV`` and set up logging to match."""
+    if os.environ.get('WORK_ENV') == 'PROD':
+        logging.basicConfig(
+            level=logging.WARNING,
+            format='%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]',
+            filename=log_file_path,
+            filemode='a'
+        )
+        return ProductionConfig
+    if os.environ.get('WORK_ENV') == 'TEST':
+        logging.basicConfig(level=logging.INFO)
+        return TestingConfig
     logging.basicConfig(
         level=logging.WARNING,
         format='%(asctime)s %(levelname)s: %(message)s'
     )
+    return DevelopmentConfig
+
+
+def create_app(config=None):
+    """Build the app without touching the database.
+
+    Engines only connect when a request (or CLI command) first needs them,
+    so importing this under ``gunicorn --preload`` is cheap and the forked
+    workers start with empty pools. Create or migrate the schema with
+    ``flask db-init`` before starting the server.
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.config.from_object(config or config_from_env())
+    init_json(app)
+    db.init_app(app)
+    response_cache.init_app(app)
+    if app.config.get('STATS_ENDPOINTS_ENABLED') or app.debug or app.testing:
+        app.add_url_rule('/api/pool/stats', 'pool_stats', pool_stats_view)
+
+    app.register_blueprint(supplier_routes, url_prefix='/api/suppliers')
+    app.register_blueprint(goods_routes,
+                           url_prefix='/api/goods')
+    app.register_blueprint(invoice_routes, url_prefix='/api/invoices')
+
+    app.register_blueprint(raw_material_routes, url_prefix='/api/raw-materials')
+    app.register_blueprint(stocks_routes, url_prefix='/api/stocks')
+    app.register_blueprint(categories_routes, url_prefix='/api/categories')
+    app.register_blueprint(receipts_routes, url_prefix='/api/receipts')
+    app.register_blueprint(analytics_routes, url_prefix='/api/analytics')
+
+    # First, so it times (and can profile) everything below, 304s included.
+    request_metrics.init_app(app)
+    query_watch.init_app(app)
+    app.before_request(check_conditional_get)
+    app.after_request(add_header)
+    app.register_error_handler(400, bad_request)
+    app.register_error_handler(500, server_error)
+    app.register_error_handler(404, not_found)
+
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(db_upgrade_command, 'db-init')
+    app.cli.add_command(rebuild_stock_balances_command)
+    app.cli.add_command(rebuild_material_costs_command)
+    app.cli.add_command(prune_idempotency_records_command)
+    app.cli.add_command(snapshot_stocks_command)
+    app.cli.add_command(backfill_rollups_command)
+
+    app.extensions['startup_ms'] = round(
+        (time.perf_counter() - started) * 1000, 3)
+    logging.info(f"App created in {app.extensions['startup_ms']} ms")
+    return app
+
+
+@click.command('db-upgrade')
+@click.option('--dry-run', is_flag=True, help='Only list the migrations that would run.')
+@with_appcontext
+def db_upgrade_command(dry_run):
+    """Create the schema on empty databases and apply pending migrations."""
+    versions = pending_migrations() if dry_run else upgrade_database()
+    for bind_key, applied in versions.items():
+        click.echo(f"{bind_key or 'default'}: {', '.join(applied) or 'up to date'}")
+
+
+@click.command('rebuild-stock-balances')
+@click.option('--verify', is_flag=True, help='Only report drifted balances, do not rewrite them.')
+@with_appcontext
+def rebuild_stock_balances_command(verify):
+    """Recompute the stock_balances ledger from receipt_raw_material."""
+    mismatches = verify_stock_balances()
+    for (stock_id, raw_material_id), (expected, stored) in sorted(mismatches.items()):
+        click.echo(
+            f"stock {stock_id} / raw material {raw_material_id}: expected {expected}, stored {stored}")
+    if verify:
+        click.echo(f"{len(mismatches)} drifted balance(s) found.")
+        if mismatches:
+            raise SystemExit(1)
+        return
+    count = rebuild_stock_balances()
+    click.echo(f"Rebuilt {count} stock balance(s).")
+
+
+@click.command('rebuild-material-costs')
+@click.option('--verify', is_flag=True, help='Only report drifted cost buckets, do not rewrite them.')
+@with_appcontext
+def rebuild_material_costs_command(verify):
+    """Recompute goods_costs/goods_cost_daily from invoices_goods."""
+    mismatches = verify_material_costs()
+    for (goods_id, day), (expected, stored) in sorted(mismatches.items()):
+        click.echo(
+            f"goods {goods_id} on {day}: expected {expected}, stored {stored}")
+    if verify:
+        click.echo(f"{len(mismatches)} drifted cost bucket(s) found.")
+        if mismatches:
+            raise SystemExit(1)
+        return
+    count = rebuild_material_costs()
+    click.echo(f"Rebuilt costs for {count} goods.")
+
+
+@click.command('snapshot-stocks')
+@click.option('--through', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Last day to snapshot (default: yesterday).')
+@click.option('--rebuild', is_flag=True, help='Drop every snapshot and rebuild from the first receipt.')
+@click.option('--verify', is_flag=True, help='Only compare the snapshots with the receipts.')
+@with_appcontext
+def snapshot_stocks_command(through, rebuild, verify):
+    """Fold the receipts since the last run into the daily stock snapshots."""
+    if verify:
+        mismatches = verify_stock_snapshots()
+        for (stock_id, raw_material_id, day), (expected, stored) in sorted(mismatches.items()):
+            click.echo(
+                f"stock {stock_id} / raw material {raw_material_id} on {day}: expected {expected}, stored {stored}")
+        click.echo(f"{len(mismatches)} drifted snapshot(s) found.")
+        if mismatches:
+            raise SystemExit(1)
+        return
+    if rebuild:
+        reset_stock_snapshots()
+    try:
+        count = build_stock_snapshots(through.date() if through else None)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--through')
+    click.echo(f"Wrote {count} snapshot row(s).")
+
+
+@click.command('backfill-rollups')
+@click.option('--date-from', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='First day to rebuild (default: the earliest document or rollup row).')
+@click.option('--date-to', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Last day to rebuild (default: the latest document or rollup row).')
+@click.option('--chunk-days', type=click.IntRange(min=1), default=DEFAULT_BACKFILL_CHUNK_DAYS,
+              show_default=True, help='Days rebuilt per transaction.')
+@click.option('--verify', is_flag=True, help='Only report drifted rollup rows, do not rewrite them.')
+@with_appcontext
+def backfill_rollups_command(date_from, date_to, chunk_days, verify):
+    """Rebuild goods_cost_daily/receipt_daily, the analytics rollups, and goods_costs."""
+    if verify:
+        mismatches = verify_rollups()
+        for (table_name, key), (expected, stored) in sorted(mismatches.items(), key=str):
+            click.echo(f"{table_name} {key}: expected {expected}, stored {stored}")
+        click.echo(f"{len(mismatches)} drifted rollup row(s) found.")
+        if mismatches:
+            raise SystemExit(1)
+        return
+    written = backfill_rollups(date_from.date() if date_from else None,
+                               date_to.date() if date_to else None, chunk_days)
+    for table_name, count in written.items():
+        click.echo(f"{table_name}: {count} row(s) written.")
+
 
-app.config.from_object(app_config)
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+@click.command('prune-idempotency-records')
+@with_appcontext
+def prune_idempotency_records_command():
+    """Delete stored create results older than IDEMPOTENCY_TTL_HOURS."""
+    count = sum(prune_idempotency_records(model)
+                for model in (IdempotencyRecord, ImsIdempotencyRecord))
+    click.echo(f"Pruned {count} idempotency record(s).")
 
-app.register_blueprint(supplier_routes, url_prefix='/api/suppliers')
-app.register_blueprint(goods_routes,
-                       url_prefix='/api/goods')
-app.register_blueprint(invoice_routes, url_prefix='/api/invoices')
 
-app.register_blueprint(raw_material_routes, url_prefix='/api/raw-materials')
-app.register_blueprint(stocks_routes, url_prefix='/api/stocks')
-app.register_blueprint(categories_routes, url_prefix='/api/categories')
-app.register_blueprint(receipts_routes, url_prefix='/api/receipts')
+def check_conditional_get():
+    return conditional_get_response()
 
 
-@app.after_request
 def add_header(response):
-    return response
+    return add_validators(response)
 
 
-@app.errorhandler(400)
 def bad_request(e):
     logging.error(f"Bad Request: {e}")
     return response_with(resp.BAD_REQUEST_400)
 
 
-@app.errorhandler(500)
 def server_error(e):
     logging.exception(f"Server Error: {e}")
     return response_with(resp.SERVER_ERROR_500)
 
 
-@app.errorhandler(404)
 def not_found(e):
     logging.warning(f"Not Found: {e}")
     return response_with(resp.SERVER_ERROR_404)
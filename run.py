@@ -1,4 +1,6 @@
-from main import app as application
+from main import create_app
+
+application = create_app()
 
 if __name__ == '__main__':
     application.run(port=5000, host="0.0.0.0", debug=True)
@@ -1,45 +1,132 @@
 import os
+from src.api.utils.pool_metrics import TimedQueuePool
 
 DB_HOST = os.getenv('DB_HOST', 'localhost')
 DB_USER = os.getenv('DB_USER', 'tony')
 DB_PASSWORD = os.getenv('DB_PASSWORD', 'default_dev_pass')
 DB_PORT = os.getenv('DB_PORT', '3306')
+# 'mysqlconnector' (default; uses its C extension when installed),
+# 'mysqldb' (mysqlclient, C) or 'pymysql' (pure Python).
+DB_DRIVER = os.getenv('DB_DRIVER', 'mysqlconnector')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+# Requests each gunicorn worker serves at once (gunicorn.conf.py reads the
+# same variable).
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Name of the connect timeout argument for each driver's connect().
+CONNECT_TIMEOUT_ARGS = {
+    'mysqlconnector': 'connection_timeout',
+    'mysqldb': 'connect_timeout',
+    'pymysql': 'connect_timeout',
+}
+
+
+def _env(prefix, name, default):
+    # A bind-specific variable (PMS_DB_POOL_SIZE) wins over the shared one
+    # (DB_POOL_SIZE).
+    return os.getenv(f'{prefix}_{name}', os.getenv(name, default))
+
+
+def default_cache_backend(redis_url):
+    # Entries are keyed on the committed table versions (see cache.py), so a
+    # per-process cache stays correct with several workers; redis only saves
+    # each worker filling its own.
+    return 'redis' if redis_url else 'memory'
+
+
+def mysql_url(database):
+    return f'mysql+{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{database}'
+
+
+def engine_options(prefix):
+    """Pool and connect options for one bind, read from the environment.
+
+    A request holds at most one connection per bind, so each worker needs
+    one per thread, plus one for the table version bump that runs after a
+    commit; two overflow connections absorb a CLI command or a slow
+    checkin. With the defaults (4 threads) that is 5 + 2 per bind and
+    worker: 9 workers on 4 cores open at most 9 x 7 x 2 binds = 126
+    connections, under MySQL's default max_connections of 151. Size
+    DB_POOL_SIZE/DB_MAX_OVERFLOW by the same sum when changing either.
+    """
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_logging_name': prefix.lower(),
+        'pool_size': int(_env(prefix, 'DB_POOL_SIZE', str(WORKER_THREADS + 1))),
+        'max_overflow': int(_env(prefix, 'DB_MAX_OVERFLOW', '2')),
+        # Whole seconds: Flask-SQLAlchemy's engine_from_config() casts it to int.
+        'pool_timeout': int(_env(prefix, 'DB_POOL_TIMEOUT', '10')),
+        # Keep below MySQL's wait_timeout so idle connections are replaced
+        # before the server drops them; pre-ping catches the rest.
+        'pool_recycle': int(_env(prefix, 'DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': _env(prefix, 'DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes'),
+        'connect_args': {
+            CONNECT_TIMEOUT_ARGS.get(DB_DRIVER, 'connect_timeout'):
+                int(_env(prefix, 'DB_CONNECT_TIMEOUT', '5')),
+        },
+    }
 
 
 class Config(object):
     DEBUG = False
     TESTING = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 'memory' (per-process LRU), 'redis' (shared, needs CACHE_REDIS_URL) or 'null'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', default_cache_backend(CACHE_REDIS_URL))
+    CACHE_REDIS_URL = CACHE_REDIS_URL
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', '30'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+    # Serve /metrics, /api/pool/stats and /api/cache/stats outside debug
+    # and tests; only turn on where the port is not publicly reachable.
+    STATS_ENDPOINTS_ENABLED = os.getenv('STATS_ENDPOINTS_ENABLED', '0') == '1'
+    # Allow ?profile=1 to return a profile instead of the response.
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+    # Slow-query log and N+1 detector (src/api/utils/query_watch.py); off
+    # unless a threshold is set.
+    SLOW_QUERY_THRESHOLD_MS = (float(os.environ['SLOW_QUERY_THRESHOLD_MS'])
+                               if os.getenv('SLOW_QUERY_THRESHOLD_MS') else None)
+    NPLUSONE_THRESHOLD = None
+    NPLUSONE_ACTION = 'log'
+    # Rows per list GET page when the client sends no limit, and the largest
+    # limit it may ask for.
+    DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', '100'))
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '1000'))
+    # How long a stored create result answers retries of the same key.
+    IDEMPOTENCY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_TTL_HOURS', '24'))
+    # List GETs and NDJSON exports dump through the generated serializers
+    # (src/api/schemas/serializers.py); '0' goes back to marshmallow's dump().
+    COMPILED_SERIALIZERS = os.getenv('COMPILED_SERIALIZERS', '1') == '1'
 
 
 class ProductionConfig(Config):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JSON_SORT_KEYS = False
-    SQLALCHEMY_DATABASE_URI = (
-        f'mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/PMS'
-    )
+    SQLALCHEMY_DATABASE_URI = mysql_url('PMS')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options('PMS')
     SQLALCHEMY_BINDS = {
-        'IMS_db': (
-            f'mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/IMS'
-        )
+        'IMS_db': {'url': mysql_url('IMS'), **engine_options('IMS')}
     }
 
 
 class DevelopmentConfig(Config):
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = (
-        f'mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/PMS'
-    )
+    PROFILING_ENABLED = True
+    SQLALCHEMY_DATABASE_URI = mysql_url('PMS')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options('PMS')
     SQLALCHEMY_BINDS = {
-        'IMS_db': (
-            f'mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/IMS'
-        )
+        'IMS_db': {'url': mysql_url('IMS'), **engine_options('IMS')}
     }
     SQLALCHEMY_ECHO = False
     JSON_SORT_KEYS = False
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100'))
+    NPLUSONE_THRESHOLD = 5
 
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_ECHO = False
     JSON_SORT_KEYS = False
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '250'))
+    # Fail the request, and with it the test, on a repeated lazy load.
+    NPLUSONE_THRESHOLD = 5
+    NPLUSONE_ACTION = 'raise'
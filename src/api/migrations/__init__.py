@@ -0,0 +1,15 @@
+from . import m0001_baseline, m0002_stock_balances, m0003_table_versions, m0004_goods_costs, m0005_hot_path_indexes, m0006_idempotency_records, m0007_stock_snapshots, m0008_analytics_rollups, m0009_receipt_daily_issued_quantity, m0010_sparse_stock_snapshots
+
+# Applied in this order; append new migrations, never reorder or rename.
+MIGRATIONS = [
+    m0001_baseline,
+    m0002_stock_balances,
+    m0003_table_versions,
+    m0004_goods_costs,
+    m0005_hot_path_indexes,
+    m0006_idempotency_records,
+    m0007_stock_snapshots,
+    m0008_analytics_rollups,
+    m0009_receipt_daily_issued_quantity,
+    m0010_sparse_stock_snapshots,
+]
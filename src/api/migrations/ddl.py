@@ -0,0 +1,24 @@
+"""Helpers for migrations that carry their own table definitions.
+
+Each migration declares what it creates on a private ``MetaData``, frozen
+as it was when the migration was written, so replaying it creates the same
+schema however the models change later. ``stub()`` stands in for the
+existing tables it only points a foreign key or index at.
+"""
+from sqlalchemy import Table, Column, Integer
+
+
+def stub(metadata, name, *column_names):
+    """A placeholder for an existing table: ``id`` plus ``column_names``."""
+    return Table(name, metadata, Column('id', Integer, primary_key=True),
+                 *[Column(column_name, Integer) for column_name in column_names])
+
+
+def create_tables(connection, tables):
+    for table in tables:
+        table.create(connection, checkfirst=True)
+
+
+def create_indexes(connection, indexes):
+    for index in indexes:
+        index.create(connection, checkfirst=True)
@@ -0,0 +1,98 @@
+"""The tables the application had before migrations existed.
+
+Databases from that time already hold them; on an empty database this
+creates them as they were then, and the later migrations take it from
+there.
+"""
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Integer, String, Float, Date, DECIMAL
+from src.api.migrations.ddl import create_tables
+
+VERSION = '0001_baseline'
+
+metadata = MetaData()
+
+suppliers = Table(
+    'suppliers', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String(100), nullable=False),
+    Column('email', String(60), nullable=True),
+    Column('phone_number', String(20), nullable=True),
+    Column('address', String(255), nullable=True),
+)
+
+goods = Table(
+    'goods', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String(255), nullable=False),
+    Column('material_code', String(60), nullable=False),
+    Column('convert_rate', Float(10, 3), nullable=False),
+    Column('goods_unit', String(10), nullable=False),
+    Column('supplier_id', Integer, ForeignKey('suppliers.id'), nullable=False),
+)
+
+invoices = Table(
+    'invoices', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('code', String(100), nullable=False),
+    Column('created_date', Date, nullable=False),
+    Column('supplier_id', Integer, ForeignKey('suppliers.id'), nullable=False),
+)
+
+invoices_goods = Table(
+    'invoices_goods', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('invoice_id', Integer, ForeignKey('invoices.id'), nullable=False),
+    Column('goods_id', Integer, ForeignKey('goods.id'), nullable=False),
+    Column('buy_quantity', DECIMAL(precision=5, scale=3), nullable=False),
+    Column('buying_price_per_unit', DECIMAL(precision=13, scale=0), nullable=False),
+    Column('vat_precentage', DECIMAL(precision=5, scale=3), nullable=True),
+)
+
+stocks = Table(
+    'stocks', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('stock_code', String(60), nullable=False),
+    Column('max_capacity', Integer, nullable=True),
+    Column('location', String(255), nullable=True),
+)
+
+categories = Table(
+    'categories', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String(100), nullable=False, unique=True),
+)
+
+raw_materials = Table(
+    'raw_materials', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('code', String(60), nullable=False, unique=True),
+    Column('name', String(100), nullable=False),
+    Column('default_unit', String(10), nullable=False),
+    Column('category_id', Integer, ForeignKey('categories.id', ondelete='SET NULL'), nullable=True),
+)
+
+receipts = Table(
+    'receipts', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('receipt_code', String(60), nullable=False, unique=True),
+    Column('request_code', String(60), nullable=True),
+    Column('created_date', Date, nullable=False),
+    Column('stock_id', Integer, ForeignKey('stocks.id'), nullable=False),
+)
+
+receipt_raw_material = Table(
+    'receipt_raw_material', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('receipt_id', Integer, ForeignKey('receipts.id'), nullable=False),
+    Column('raw_material_id', Integer, ForeignKey('raw_materials.id'), nullable=False),
+    Column('quantity', DECIMAL(precision=10, scale=3), nullable=False),
+)
+
+TABLES = {
+    None: (suppliers, goods, invoices, invoices_goods),
+    'IMS_db': (stocks, categories, raw_materials, receipts, receipt_raw_material),
+}
+
+
+def upgrade(connection, bind_key):
+    create_tables(connection, TABLES.get(bind_key, ()))
@@ -0,0 +1,33 @@
+"""The per stock and raw material balance ledger the stock reads use,
+filled from the existing receipts.
+"""
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Integer, DECIMAL, UniqueConstraint
+from src.api.migrations.ddl import stub, create_tables
+from src.api.utils.stock_ledger import rebuild_stock_balances
+
+VERSION = '0002_stock_balances'
+
+metadata = MetaData()
+stub(metadata, 'stocks')
+stub(metadata, 'raw_materials')
+
+stock_balances = Table(
+    'stock_balances', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('stock_id', Integer, ForeignKey('stocks.id'), nullable=False),
+    Column('raw_material_id', Integer, ForeignKey('raw_materials.id'), nullable=False),
+    Column('quantity', DECIMAL(precision=13, scale=3), nullable=False),
+    Column('line_count', Integer, nullable=False),
+    UniqueConstraint('stock_id', 'raw_material_id', name='uq_stock_balances_stock_raw_material'),
+)
+
+TABLES = {
+    'IMS_db': (stock_balances,),
+}
+
+
+def upgrade(connection, bind_key):
+    create_tables(connection, TABLES.get(bind_key, ()))
+
+
+backfill = rebuild_stock_balances
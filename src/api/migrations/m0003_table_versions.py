@@ -0,0 +1,25 @@
+"""Per table write counters behind the ETags and response cache keys, one
+table on each bind.
+"""
+from sqlalchemy import MetaData, Table, Column, String, BigInteger, DateTime
+from src.api.migrations.ddl import create_tables
+
+VERSION = '0003_table_versions'
+
+metadata = MetaData()
+
+table_versions = Table(
+    'table_versions', metadata,
+    Column('table_name', String(64), primary_key=True),
+    Column('version', BigInteger, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+)
+
+TABLES = {
+    None: (table_versions,),
+    'IMS_db': (table_versions,),
+}
+
+
+def upgrade(connection, bind_key):
+    create_tables(connection, TABLES.get(bind_key, ()))
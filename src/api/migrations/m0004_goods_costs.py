@@ -0,0 +1,47 @@
+"""Running purchase totals per goods, overall and per invoice day, filled
+from the existing invoices.
+"""
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Integer, Date, DECIMAL, UniqueConstraint
+from src.api.migrations.ddl import stub, create_tables
+from src.api.utils.material_costs import rebuild_material_costs
+
+VERSION = '0004_goods_costs'
+
+metadata = MetaData()
+stub(metadata, 'goods')
+
+
+def _cost_columns():
+    return (
+        Column('buy_quantity', DECIMAL(precision=18, scale=3), nullable=False),
+        Column('total_cost', DECIMAL(precision=24, scale=3), nullable=False),
+        Column('price_sum', DECIMAL(precision=24, scale=0), nullable=False),
+        Column('line_count', Integer, nullable=False),
+    )
+
+
+goods_costs = Table(
+    'goods_costs', metadata,
+    Column('goods_id', Integer, ForeignKey('goods.id'), primary_key=True, autoincrement=False),
+    *_cost_columns(),
+)
+
+goods_cost_daily = Table(
+    'goods_cost_daily', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('goods_id', Integer, ForeignKey('goods.id'), nullable=False),
+    Column('day', Date, nullable=False),
+    *_cost_columns(),
+    UniqueConstraint('goods_id', 'day', name='uq_goods_cost_daily_goods_day'),
+)
+
+TABLES = {
+    None: (goods_costs, goods_cost_daily),
+}
+
+
+def upgrade(connection, bind_key):
+    create_tables(connection, TABLES.get(bind_key, ()))
+
+
+backfill = rebuild_material_costs
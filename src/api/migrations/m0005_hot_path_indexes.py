@@ -0,0 +1,44 @@
+"""Secondary indexes for the columns the list filters, aggregations and
+reconciliation join or group on.
+
+Line tables get one index per join direction, so a date-windowed scan of
+the parent can reach its lines without relying on MySQL's implicit
+foreign-key indexes (which these replace).
+"""
+from sqlalchemy import MetaData, Index
+from src.api.migrations.ddl import stub, create_indexes
+
+VERSION = '0005_hot_path_indexes'
+
+metadata = MetaData()
+goods = stub(metadata, 'goods', 'material_code', 'convert_rate')
+invoices = stub(metadata, 'invoices', 'created_date', 'supplier_id')
+invoices_goods = stub(metadata, 'invoices_goods', 'invoice_id', 'goods_id')
+receipts = stub(metadata, 'receipts', 'created_date', 'stock_id')
+receipt_raw_material = stub(metadata, 'receipt_raw_material', 'receipt_id', 'raw_material_id')
+stock_balances = stub(metadata, 'stock_balances', 'raw_material_id')
+
+INDEXES = {
+    None: (
+        Index('ix_goods_material_code_convert_rate', goods.c.material_code, goods.c.convert_rate),
+        Index('ix_invoices_created_date', invoices.c.created_date),
+        Index('ix_invoices_supplier_id_created_date', invoices.c.supplier_id, invoices.c.created_date),
+        Index('ix_invoices_goods_goods_id_invoice_id',
+              invoices_goods.c.goods_id, invoices_goods.c.invoice_id),
+        Index('ix_invoices_goods_invoice_id_goods_id',
+              invoices_goods.c.invoice_id, invoices_goods.c.goods_id),
+    ),
+    'IMS_db': (
+        Index('ix_receipts_created_date', receipts.c.created_date),
+        Index('ix_receipts_stock_id_created_date', receipts.c.stock_id, receipts.c.created_date),
+        Index('ix_receipt_raw_material_raw_material_id_receipt_id',
+              receipt_raw_material.c.raw_material_id, receipt_raw_material.c.receipt_id),
+        Index('ix_receipt_raw_material_receipt_id_raw_material_id',
+              receipt_raw_material.c.receipt_id, receipt_raw_material.c.raw_material_id),
+        Index('ix_stock_balances_raw_material_id', stock_balances.c.raw_material_id),
+    ),
+}
+
+
+def upgrade(connection, bind_key):
+    create_indexes(connection, INDEXES.get(bind_key, ()))
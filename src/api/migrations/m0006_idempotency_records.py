@@ -0,0 +1,35 @@
+"""The stored results of idempotent creates, and the invoice code index
+the natural-key lookup uses (``invoices.code`` is not unique).
+"""
+from sqlalchemy import MetaData, Table, Column, Index, Integer, String, LargeBinary, DateTime, UniqueConstraint
+from src.api.migrations.ddl import stub, create_tables, create_indexes
+
+VERSION = '0006_idempotency_records'
+
+metadata = MetaData()
+invoices = stub(metadata, 'invoices', 'code', 'supplier_id')
+
+idempotency_records = Table(
+    'idempotency_records', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('scope', String(32), nullable=False),
+    Column('key', String(255), nullable=False),
+    Column('fingerprint', String(64), nullable=False),
+    Column('status_code', Integer, nullable=False),
+    Column('body', LargeBinary, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    UniqueConstraint('scope', 'key', name='uq_idempotency_records_scope_key'),
+)
+
+TABLES = {
+    None: (idempotency_records,),
+    'IMS_db': (idempotency_records,),
+}
+INDEXES = {
+    None: (Index('ix_invoices_code_supplier_id', invoices.c.code, invoices.c.supplier_id),),
+}
+
+
+def upgrade(connection, bind_key):
+    create_tables(connection, TABLES.get(bind_key, ()))
+    create_indexes(connection, INDEXES.get(bind_key, ()))
@@ -0,0 +1,41 @@
+"""Daily stock snapshots and their per-stock watermark, for as-of stock
+queries, built up to yesterday from the existing receipts.
+"""
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Index, Integer, Date, DECIMAL, UniqueConstraint
+from src.api.migrations.ddl import stub, create_tables
+from src.api.utils.stock_snapshots import build_stock_snapshots
+
+VERSION = '0007_stock_snapshots'
+
+metadata = MetaData()
+stub(metadata, 'stocks')
+stub(metadata, 'raw_materials')
+
+stock_snapshots = Table(
+    'stock_snapshots', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('stock_id', Integer, ForeignKey('stocks.id'), nullable=False),
+    Column('raw_material_id', Integer, ForeignKey('raw_materials.id'), nullable=False),
+    Column('day', Date, nullable=False),
+    Column('quantity', DECIMAL(precision=13, scale=3), nullable=False),
+    Column('line_count', Integer, nullable=False),
+    UniqueConstraint('stock_id', 'day', 'raw_material_id', name='uq_stock_snapshots_stock_day_material'),
+    Index('ix_stock_snapshots_raw_material_id_day', 'raw_material_id', 'day'),
+)
+
+stock_snapshot_states = Table(
+    'stock_snapshot_states', metadata,
+    Column('stock_id', Integer, ForeignKey('stocks.id'), primary_key=True, autoincrement=False),
+    Column('snapshot_through', Date, nullable=False),
+)
+
+TABLES = {
+    'IMS_db': (stock_snapshots, stock_snapshot_states),
+}
+
+
+def upgrade(connection, bind_key):
+    create_tables(connection, TABLES.get(bind_key, ()))
+
+
+backfill = build_stock_snapshots
@@ -0,0 +1,39 @@
+"""The receipt_daily rollup, filled from the existing receipts, and a day
+index on goods_cost_daily, for the analytics endpoints.
+"""
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Index, Integer, Date, DECIMAL, UniqueConstraint
+from src.api.migrations.ddl import stub, create_tables, create_indexes
+from src.api.utils.analytics import backfill_receipt_daily
+
+VERSION = '0008_analytics_rollups'
+
+metadata = MetaData()
+stub(metadata, 'stocks')
+stub(metadata, 'raw_materials')
+goods_cost_daily = stub(metadata, 'goods_cost_daily', 'day')
+
+receipt_daily = Table(
+    'receipt_daily', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('stock_id', Integer, ForeignKey('stocks.id'), nullable=False),
+    Column('raw_material_id', Integer, ForeignKey('raw_materials.id'), nullable=False),
+    Column('day', Date, nullable=False),
+    Column('quantity', DECIMAL(precision=18, scale=3), nullable=False),
+    Column('line_count', Integer, nullable=False),
+    UniqueConstraint('day', 'stock_id', 'raw_material_id', name='uq_receipt_daily_day_stock_raw_material'),
+)
+
+TABLES = {
+    'IMS_db': (receipt_daily,),
+}
+INDEXES = {
+    None: (Index('ix_goods_cost_daily_day', goods_cost_daily.c.day),),
+}
+
+
+def upgrade(connection, bind_key):
+    create_tables(connection, TABLES.get(bind_key, ()))
+    create_indexes(connection, INDEXES.get(bind_key, ()))
+
+
+backfill = backfill_receipt_daily
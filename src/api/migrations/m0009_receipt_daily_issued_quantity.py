@@ -0,0 +1,25 @@
+"""receipt_daily.issued_quantity, the daily usage read by the raw material
+forecast, refilled from the existing receipts.
+"""
+from sqlalchemy import inspect, text, DECIMAL
+from src.api.utils.analytics import backfill_receipt_daily
+
+VERSION = '0009_receipt_daily_issued_quantity'
+
+BIND_KEY = 'IMS_db'
+TABLE = 'receipt_daily'
+COLUMN = 'issued_quantity'
+COLUMN_TYPE = DECIMAL(precision=18, scale=3)
+
+
+def upgrade(connection, bind_key):
+    if bind_key != BIND_KEY or not inspect(connection).has_table(TABLE):
+        return
+    if COLUMN in {column['name'] for column in inspect(connection).get_columns(TABLE)}:
+        return
+    column_type = COLUMN_TYPE.compile(dialect=connection.dialect)
+    connection.execute(text(
+        f"ALTER TABLE {TABLE} ADD COLUMN {COLUMN} {column_type} NOT NULL DEFAULT 0"))
+
+
+backfill = backfill_receipt_daily
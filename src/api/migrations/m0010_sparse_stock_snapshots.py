@@ -0,0 +1,26 @@
+"""Stock snapshots kept only for the days a material moved: an index for
+the latest-row-before-a-day lookup, and the existing daily rows rebuilt in
+the sparse form.
+"""
+from sqlalchemy import MetaData, Index
+from src.api.migrations.ddl import stub, create_indexes
+from src.api.utils.stock_snapshots import rebuild_stock_snapshots
+
+VERSION = '0010_sparse_stock_snapshots'
+
+metadata = MetaData()
+stock_snapshots = stub(metadata, 'stock_snapshots', 'stock_id', 'raw_material_id', 'day')
+
+INDEXES = {
+    'IMS_db': (
+        Index('ix_stock_snapshots_stock_material_day', stock_snapshots.c.stock_id,
+              stock_snapshots.c.raw_material_id, stock_snapshots.c.day),
+    ),
+}
+
+
+def upgrade(connection, bind_key):
+    create_indexes(connection, INDEXES.get(bind_key, ()))
+
+
+backfill = rebuild_stock_snapshots
@@ -7,3 +7,9 @@ from .raw_materials import RawMaterial
 from .categories import Category
 from .receipts import Receipt
 from .receipt_raw_material import ReceiptRawMaterial
+from .stock_balances import StockBalance, ReceiptDaily
+from .table_versions import TableVersion, ImsTableVersion
+from .goods_costs import GoodsCost, GoodsCostDaily
+from .schema_migrations import SchemaMigration, ImsSchemaMigration
+from .idempotency_records import IdempotencyRecord, ImsIdempotencyRecord
+from .stock_snapshots import StockSnapshot, StockSnapshotState
@@ -1,11 +1,16 @@
 from typing import List
 from src.api.utils.database import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Float, ForeignKey
+from sqlalchemy import String, Float, ForeignKey, Index
 
 
 class Goods (db.Model):
     __tablename__ = 'goods'
+    __table_args__ = (
+        # Covers the group-by-material aggregations (costs, invoice stock).
+        Index('ix_goods_material_code_convert_rate',
+              'material_code', 'convert_rate'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
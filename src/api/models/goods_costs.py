@@ -0,0 +1,56 @@
+from datetime import date
+from src.api.utils.database import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, DECIMAL, Integer, Date, Index, UniqueConstraint
+from decimal import Decimal
+
+
+class GoodsCostMixin(object):
+    buy_quantity: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=18, scale=3), nullable=False, default=0)
+    # SUM(buy_quantity * buying_price_per_unit)
+    total_cost: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=24, scale=3), nullable=False, default=0)
+    # SUM(buying_price_per_unit), for the unweighted per-line average
+    price_sum: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=24, scale=0), nullable=False, default=0)
+    line_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0)
+
+
+class GoodsCost(GoodsCostMixin, db.Model):
+    """Running purchase totals per goods, maintained from invoice writes."""
+    __tablename__ = 'goods_costs'
+
+    goods_id: Mapped[int] = mapped_column(
+        ForeignKey('goods.id'), primary_key=True, autoincrement=False)
+
+    def __init__(self, goods_id, buy_quantity=0, total_cost=0, price_sum=0, line_count=0):
+        self.goods_id = goods_id
+        self.buy_quantity = buy_quantity
+        self.total_cost = total_cost
+        self.price_sum = price_sum
+        self.line_count = line_count
+
+
+class GoodsCostDaily(GoodsCostMixin, db.Model):
+    """The same totals bucketed by invoice date, for as-of costing."""
+    __tablename__ = 'goods_cost_daily'
+    __table_args__ = (
+        UniqueConstraint('goods_id', 'day', name='uq_goods_cost_daily_goods_day'),
+        # Date-range reads of the purchase analytics.
+        Index('ix_goods_cost_daily_day', 'day'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    goods_id: Mapped[int] = mapped_column(
+        ForeignKey('goods.id'), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+
+    def __init__(self, goods_id, day, buy_quantity=0, total_cost=0, price_sum=0, line_count=0):
+        self.goods_id = goods_id
+        self.day = day
+        self.buy_quantity = buy_quantity
+        self.total_cost = total_cost
+        self.price_sum = price_sum
+        self.line_count = line_count
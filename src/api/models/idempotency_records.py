@@ -0,0 +1,40 @@
+from datetime import datetime
+from src.api.utils.database import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, LargeBinary, DateTime, UniqueConstraint
+
+
+class IdempotencyRecordMixin(object):
+    """The stored response of a create, replayed when its key comes back."""
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # 'receipts' for Idempotency-Key headers, 'receipts.code' for natural keys
+    scope: Mapped[str] = mapped_column(String(32), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # sha256 of the canonical request body, to tell a retry from a reuse
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    body: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __init__(self, scope, key, fingerprint, status_code, body, created_at):
+        self.scope = scope
+        self.key = key
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.body = body
+        self.created_at = created_at
+
+
+class IdempotencyRecord(IdempotencyRecordMixin, db.Model):
+    __tablename__ = 'idempotency_records'
+    __table_args__ = (
+        UniqueConstraint('scope', 'key', name='uq_idempotency_records_scope_key'),
+    )
+
+
+class ImsIdempotencyRecord(IdempotencyRecordMixin, db.Model):
+    __bind_key__ = 'IMS_db'
+    __tablename__ = 'idempotency_records'
+    __table_args__ = (
+        UniqueConstraint('scope', 'key', name='uq_idempotency_records_scope_key'),
+    )
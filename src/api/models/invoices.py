@@ -2,11 +2,18 @@ from typing import List
 from datetime import date
 from src.api.utils.database import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Date, ForeignKey, func
+from sqlalchemy import String, Date, ForeignKey, Index, func
 
 
 class Invoice (db.Model):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        Index('ix_invoices_created_date', 'created_date'),
+        Index('ix_invoices_supplier_id_created_date',
+              'supplier_id', 'created_date'),
+        # Natural key lookups (?dedupe=code) and the code filter.
+        Index('ix_invoices_code_supplier_id', 'code', 'supplier_id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     code: Mapped[str] = mapped_column(String(100), nullable=False)
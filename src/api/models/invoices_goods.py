@@ -1,11 +1,15 @@
 from src.api.utils.database import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, DECIMAL
+from sqlalchemy import ForeignKey, DECIMAL, Index
 from decimal import Decimal
 
 
 class InvoiceGoods(db.Model):
     __tablename__ = 'invoices_goods'
+    __table_args__ = (
+        Index('ix_invoices_goods_goods_id_invoice_id', 'goods_id', 'invoice_id'),
+        Index('ix_invoices_goods_invoice_id_goods_id', 'invoice_id', 'goods_id'),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     invoice_id: Mapped[int] = mapped_column(ForeignKey('invoices.id'))
@@ -1,13 +1,19 @@
 
 from src.api.utils.database import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, DECIMAL
+from sqlalchemy import ForeignKey, DECIMAL, Index
 from decimal import Decimal
 
 
 class ReceiptRawMaterial(db.Model):
     __bind_key__ = 'IMS_db'
     __tablename__ = 'receipt_raw_material'
+    __table_args__ = (
+        Index('ix_receipt_raw_material_raw_material_id_receipt_id',
+              'raw_material_id', 'receipt_id'),
+        Index('ix_receipt_raw_material_receipt_id_raw_material_id',
+              'receipt_id', 'raw_material_id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     receipt_id: Mapped[int] = mapped_column(ForeignKey('receipts.id'))
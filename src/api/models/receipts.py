@@ -2,12 +2,16 @@ from typing import List
 from src.api.utils.database import db
 from datetime import date
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, ForeignKey, Date, func
+from sqlalchemy import String, ForeignKey, Date, Index, func
 
 
 class Receipt(db.Model):
     __bind_key__ = 'IMS_db'
     __tablename__ = 'receipts'
+    __table_args__ = (
+        Index('ix_receipts_created_date', 'created_date'),
+        Index('ix_receipts_stock_id_created_date', 'stock_id', 'created_date'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     receipt_code: Mapped[str] = mapped_column(
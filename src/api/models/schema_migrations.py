@@ -0,0 +1,18 @@
+from datetime import datetime
+from src.api.utils.database import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime
+
+
+class SchemaMigrationMixin(object):
+    version: Mapped[str] = mapped_column(String(64), primary_key=True)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class SchemaMigration(SchemaMigrationMixin, db.Model):
+    __tablename__ = 'schema_migrations'
+
+
+class ImsSchemaMigration(SchemaMigrationMixin, db.Model):
+    __bind_key__ = 'IMS_db'
+    __tablename__ = 'schema_migrations'
@@ -0,0 +1,73 @@
+from datetime import date
+from src.api.utils.database import db
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import ForeignKey, DECIMAL, Integer, Date, Index, UniqueConstraint
+from decimal import Decimal
+
+
+class StockBalance(db.Model):
+    __bind_key__ = 'IMS_db'
+    __tablename__ = 'stock_balances'
+    __table_args__ = (
+        UniqueConstraint('stock_id', 'raw_material_id',
+                         name='uq_stock_balances_stock_raw_material'),
+        Index('ix_stock_balances_raw_material_id', 'raw_material_id'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    stock_id: Mapped[int] = mapped_column(
+        ForeignKey('stocks.id'), nullable=False)
+    raw_material_id: Mapped[int] = mapped_column(
+        ForeignKey('raw_materials.id'), nullable=False)
+    quantity: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=13, scale=3), nullable=False, default=0)
+    # Number of receipt lines folded into this balance, so a balance whose
+    # last line is removed disappears exactly like it would from a live SUM.
+    line_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0)
+    stock: Mapped['Stock'] = relationship('Stock')  # type: ignore
+    raw_material: Mapped['RawMaterial'] = relationship(  # type: ignore
+        'RawMaterial')
+
+    def __init__(self, stock_id, raw_material_id, quantity=0, line_count=0):
+        self.stock_id = stock_id
+        self.raw_material_id = raw_material_id
+        self.quantity = quantity
+        self.line_count = line_count
+
+
+class ReceiptDaily(db.Model):
+    """Received quantity per stock, material and receipt date, maintained
+    from receipt writes like the balances; the rollup behind the receipt
+    analytics and the raw material forecast.
+
+    ``issued_quantity`` is the part taken out by negative lines, so daily
+    usage survives days that also restock."""
+    __bind_key__ = 'IMS_db'
+    __tablename__ = 'receipt_daily'
+    __table_args__ = (
+        # Day first: analytics read a date range.
+        UniqueConstraint('day', 'stock_id', 'raw_material_id',
+                         name='uq_receipt_daily_day_stock_raw_material'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    stock_id: Mapped[int] = mapped_column(
+        ForeignKey('stocks.id'), nullable=False)
+    raw_material_id: Mapped[int] = mapped_column(
+        ForeignKey('raw_materials.id'), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    quantity: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=18, scale=3), nullable=False, default=0)
+    issued_quantity: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=18, scale=3), nullable=False, default=0)
+    line_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0)
+
+    def __init__(self, stock_id, raw_material_id, day, quantity=0, line_count=0, issued_quantity=0):
+        self.stock_id = stock_id
+        self.raw_material_id = raw_material_id
+        self.day = day
+        self.quantity = quantity
+        self.line_count = line_count
+        self.issued_quantity = issued_quantity
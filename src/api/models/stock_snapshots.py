@@ -0,0 +1,57 @@
+from datetime import date
+from src.api.utils.database import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, DECIMAL, Integer, Date, Index, UniqueConstraint
+from decimal import Decimal
+
+
+class StockSnapshot(db.Model):
+    """Closing balance of a stock/material at the end of ``day``.
+
+    Only days the material moved in the stock get a row; the balance on any
+    other day is the latest row before it (see balances_as_of).
+    """
+    __bind_key__ = 'IMS_db'
+    __tablename__ = 'stock_snapshots'
+    __table_args__ = (
+        UniqueConstraint('stock_id', 'day', 'raw_material_id',
+                         name='uq_stock_snapshots_stock_day_material'),
+        Index('ix_stock_snapshots_raw_material_id_day', 'raw_material_id', 'day'),
+        Index('ix_stock_snapshots_stock_material_day', 'stock_id', 'raw_material_id', 'day'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    stock_id: Mapped[int] = mapped_column(
+        ForeignKey('stocks.id'), nullable=False)
+    raw_material_id: Mapped[int] = mapped_column(
+        ForeignKey('raw_materials.id'), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    quantity: Mapped[Decimal] = mapped_column(
+        DECIMAL(precision=13, scale=3), nullable=False, default=0)
+    line_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0)
+
+    def __init__(self, stock_id, raw_material_id, day, quantity=0, line_count=0):
+        self.stock_id = stock_id
+        self.raw_material_id = raw_material_id
+        self.day = day
+        self.quantity = quantity
+        self.line_count = line_count
+
+
+class StockSnapshotState(db.Model):
+    """How far the snapshots of one stock are complete.
+
+    Every receipt dated on or before ``snapshot_through`` is folded in; a
+    backdated receipt write moves it back to the day before.
+    """
+    __bind_key__ = 'IMS_db'
+    __tablename__ = 'stock_snapshot_states'
+
+    stock_id: Mapped[int] = mapped_column(
+        ForeignKey('stocks.id'), primary_key=True, autoincrement=False)
+    snapshot_through: Mapped[date] = mapped_column(Date, nullable=False)
+
+    def __init__(self, stock_id, snapshot_through):
+        self.stock_id = stock_id
+        self.snapshot_through = snapshot_through
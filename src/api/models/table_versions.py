@@ -0,0 +1,19 @@
+from datetime import datetime
+from src.api.utils.database import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, BigInteger, DateTime
+
+
+class TableVersionMixin(object):
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class TableVersion(TableVersionMixin, db.Model):
+    __tablename__ = 'table_versions'
+
+
+class ImsTableVersion(TableVersionMixin, db.Model):
+    __bind_key__ = 'IMS_db'
+    __tablename__ = 'table_versions'
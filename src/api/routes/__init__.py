@@ -5,3 +5,4 @@ from .categories import categories_routes
 from .stocks import stocks_routes
 from .raw_materials import raw_material_routes
 from .receipts import receipts_routes
+from .analytics import analytics_routes
@@ -0,0 +1,61 @@
+from datetime import date
+from flask import Blueprint, request
+from src.api.utils.responses import response_with
+from src.api.utils import responses as resp
+from src.api.utils.cache import response_cache
+from src.api.utils.analytics import BUCKETS, purchase_totals, receipt_totals
+
+
+analytics_routes = Blueprint("analytics_routes", __name__)
+
+
+class AnalyticsArgsError(Exception):
+    pass
+
+
+def _parse_args(int_filters=(), text_filters=()):
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise AnalyticsArgsError(f"'bucket' must be one of {', '.join(BUCKETS)}")
+    args = {'bucket': bucket}
+    for name in ('date_from', 'date_to'):
+        raw_value = request.args.get(name)
+        args[name] = None
+        if raw_value is not None:
+            try:
+                args[name] = date.fromisoformat(raw_value)
+            except ValueError:
+                raise AnalyticsArgsError(f"'{name}' must be a date (YYYY-MM-DD)")
+    if args['date_from'] and args['date_to'] and args['date_from'] > args['date_to']:
+        raise AnalyticsArgsError("'date_from' must not be after 'date_to'")
+    for name in int_filters:
+        raw_value = request.args.get(name)
+        args[name] = None
+        if raw_value is not None:
+            try:
+                args[name] = int(raw_value)
+            except ValueError:
+                raise AnalyticsArgsError(f"'{name}' must be an integer")
+    for name in text_filters:
+        args[name] = request.args.get(name)
+    return args
+
+
+@analytics_routes.route('/purchases', methods=['GET'])
+@response_cache.cached()
+def get_purchase_analytics():
+    try:
+        args = _parse_args(int_filters=('supplier_id',), text_filters=('material_code',))
+    except AnalyticsArgsError as e:
+        return response_with(resp.INVALID_INPUT_422, message=str(e))
+    return purchase_totals(**args), 200
+
+
+@analytics_routes.route('/receipts', methods=['GET'])
+@response_cache.cached()
+def get_receipt_analytics():
+    try:
+        args = _parse_args(int_filters=('stock_id', 'raw_material_id'))
+    except AnalyticsArgsError as e:
+        return response_with(resp.INVALID_INPUT_422, message=str(e))
+    return receipt_totals(**args), 200
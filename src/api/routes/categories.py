@@ -3,12 +3,19 @@ from marshmallow import ValidationError
 from src.api.utils.responses import response_with
 from src.api.utils import responses as resp
 from src.api.utils.database import db
+from src.api.utils.cache import response_cache
+from src.api.utils.bulk import bulk_create_response, bulk_update_response, dump_reloaded
+from src.api.utils.pagination import parse_list_args, fetch_page, list_response, ListArgsError
 from src.api.models import Category
-from src.api.schemas.all_schemas import categories_schema, category_schema
+from src.api.schemas.all_schemas import CategorySchema, categories_schema, category_schema
 
 
 categories_routes = Blueprint("categories_routes", __name__)
 
+CATEGORY_FILTERS = {
+    'name': (Category.name, '=='),
+}
+
 
 @categories_routes.route('/', methods=['POST'])
 def create_categories():
@@ -17,6 +24,10 @@ def create_categories():
         return response_with(resp.INVALID_INPUT_422, message="No input data provided")
 
     is_many = isinstance(json_data, list)
+    bulk_mode = request.args.get('bulk')
+    if is_many and bulk_mode:
+        return bulk_create_response(Category, CategorySchema, json_data, bulk_mode)
+
     schema_to_use = categories_schema if is_many else category_schema
     try:
         loaded_data = schema_to_use.load(json_data)
@@ -36,19 +47,26 @@ def create_categories():
     except Exception as e:
         print(f"Database error during creation: {e}")
         return response_with(resp.INVALID_INPUT_422, message="Database creation error")
-    return categories_schema.dump(created_categories), 201
+    return dump_reloaded(Category, categories_schema, [category.id for category in created_categories]), 201
 
 
 @categories_routes.route('/', methods=['GET'])
+@response_cache.cached()
 def get_categories():
-    fetched = db.session.execute(db.select(Category)).scalars().all()
-    output = categories_schema.dump(fetched)
-    return output, 201
+    try:
+        list_args = parse_list_args(CategorySchema, CATEGORY_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    fetched, pagination = fetch_page(Category, list_args)
+    output = list_args.schema.serialize(fetched)
+    return list_response(output, pagination)
 
 
 @categories_routes.route('/<int:id>', methods=['GET'])
 def get_category_by_id(id):
-    category = db.session.get(Category, id)
+    category = db.session.get(
+        Category, id, options=category_schema.loader_options())
     if category is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Category with id {id} not found")
 
@@ -91,33 +109,4 @@ def update_category_by_list():
     if not json_data:
         return response_with(resp.INVALID_INPUT_422, message="Input list is empty.")
 
-    updated_categories_list = []
-    try:
-        for item_data in json_data:
-            category_id = item_data.get('id')
-            if category_id is None:
-                db.session.rollback()
-                return response_with(resp.INVALID_INPUT_422, message=f"Missing 'id' field in one of the category objects.")
-
-            existing_category = db.session.get(
-                Category, category_id)
-            if existing_category is None:
-                db.session.rollback()
-                return response_with(resp.SERVER_ERROR_404,
-                                     message=f"Category with id {category_id} not found, aborting bulk update.")
-
-            updated_stock = category_schema.load(
-                item_data,
-                instance=existing_category,
-                partial=True
-            )
-            updated_categories_list.append(updated_stock)
-
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Database error during bulk update: {e}")
-        return response_with(resp.INVALID_INPUT_422, message=f"Database update error: {str(e)}")
-
-    output = categories_schema.dump(updated_categories_list)
-    return output, 200
+    return bulk_update_response(Category, CategorySchema, categories_schema, json_data, 'Category')
@@ -3,12 +3,19 @@ from marshmallow import ValidationError
 from src.api.utils.responses import response_with
 from src.api.utils import responses as resp
 from src.api.models import Goods
-from src.api.schemas.all_schemas import goods_schema, list_goods_schema
+from src.api.schemas.all_schemas import GoodsSchema, goods_schema, list_goods_schema
 from src.api.utils.database import db
+from src.api.utils.bulk import bulk_create_response, bulk_update_response, dump_reloaded
+from src.api.utils.pagination import parse_list_args, fetch_page, list_response, ListArgsError
 
 
 goods_routes = Blueprint("goods_routes", __name__)
 
+GOODS_FILTERS = {
+    'supplier_id': (Goods.supplier_id, '=='),
+    'material_code': (Goods.material_code, '=='),
+}
+
 
 @goods_routes.route('/', methods=['POST'])
 def create_goods():
@@ -16,6 +23,10 @@ def create_goods():
     if json_data is None:
         return response_with(resp.INVALID_INPUT_422, message="No input data provided")
     is_many = isinstance(json_data, list)
+    bulk_mode = request.args.get('bulk')
+    if is_many and bulk_mode:
+        return bulk_create_response(Goods, GoodsSchema, json_data, bulk_mode)
+
     schema_to_use = list_goods_schema if is_many else goods_schema
     try:
         loaded_data = schema_to_use.load(json_data)
@@ -36,19 +47,25 @@ def create_goods():
     except Exception as e:
         print(f"Database error during creation: {e}")
         return response_with(resp.INVALID_INPUT_422, message="Database creation error")
-    return list_goods_schema.dump(created_goods), 201
+    return dump_reloaded(Goods, list_goods_schema, [goods.id for goods in created_goods]), 201
 
 
 @goods_routes.route('/', methods=['GET'])
 def get_goods_list():
-    fetched = db.session.execute(db.select(Goods)).scalars().all()
-    output = list_goods_schema.dump(fetched)
-    return output, 201
+    try:
+        list_args = parse_list_args(GoodsSchema, GOODS_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    fetched, pagination = fetch_page(Goods, list_args)
+    output = list_args.schema.serialize(fetched)
+    return list_response(output, pagination)
 
 
 @goods_routes.route('/<int:id>', methods=['GET'])
 def get_goods_by_id(id):
-    goods = db.session.get(Goods, id)
+    goods = db.session.get(
+        Goods, id, options=goods_schema.loader_options())
     if goods is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Goods with id {id} not found")
 
@@ -92,35 +109,7 @@ def update_goods_by_list():
     if not json_data:
         return response_with(resp.INVALID_INPUT_422, message="Input list is empty.")
 
-    updated_goods_list = []
-    try:
-        for item_data in json_data:
-            goods_id = item_data.get('id')
-            if goods_id is None:
-                db.session.rollback()
-                return response_with(resp.INVALID_INPUT_422, message=f"Missing 'id' field in one of the goods objects.")
-
-            existing_goods = db.session.get(Goods, goods_id)
-            if existing_goods is None:
-                db.session.rollback()
-                return response_with(resp.SERVER_ERROR_404,
-                                     message=f"goods with id {goods_id} not found, aborting bulk update.")
-
-            updated_goods = goods_schema.load(
-                item_data,
-                instance=existing_goods,
-                partial=True
-            )
-            updated_goods_list.append(updated_goods)
-
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Database error during bulk update: {e}")
-        return response_with(resp.INVALID_INPUT_422, message=f"Database update error: {str(e)}")
-
-    output = list_goods_schema.dump(updated_goods_list)
-    return output, 200
+    return bulk_update_response(Goods, GoodsSchema, list_goods_schema, json_data, 'goods')
 
 
 @goods_routes.route('/<int:id>', methods=['DELETE'])
@@ -2,13 +2,35 @@ from flask import Blueprint, request
 from marshmallow import ValidationError
 from src.api.utils.responses import response_with
 from src.api.utils import responses as resp
-from src.api.schemas.all_schemas import invoice_schema, list_invoice_goods_schema, invoices_schema, invoice_goods_schema
+from src.api.schemas.all_schemas import InvoiceSchema, InvoiceGoodsSchema, invoice_schema, list_invoice_goods_schema
 from src.api.utils.database import db
-from src.api.models import Invoice
+from src.api.utils.material_costs import apply_invoice_lines, snapshot_invoice, apply_invoice_change, apply_invoice_documents
+from src.api.utils.bulk import DocumentBatch, batch_create_response
+from src.api.utils.idempotency import IdempotentCreate, claim_idempotency
+from src.api.utils.line_items import merge_line_items, LineMergeError, LINE_UPDATE_MODES
+from src.api.utils.pagination import parse_list_args, fetch_page, list_response, ListArgsError, build_list_statement
+from src.api.utils.export import stream_ndjson, wants_ndjson
+from src.api.models import Invoice, InvoiceGoods, IdempotencyRecord
 
 
 invoice_routes = Blueprint("invoice_routes", __name__)
 
+INVOICE_FILTERS = {
+    'supplier_id': (Invoice.supplier_id, '=='),
+    'code': (Invoice.code, '=='),
+    'created_date_from': (Invoice.created_date, '>='),
+    'created_date_to': (Invoice.created_date, '<='),
+}
+
+INVOICE_BATCH = DocumentBatch(
+    Invoice, InvoiceSchema, 'invoice',
+    InvoiceGoods, InvoiceGoodsSchema, 'list_of_bought_goods', 'invoice_id',
+    apply_invoice_documents, ('created_date',))
+
+INVOICE_IDEMPOTENCY = IdempotentCreate(
+    'invoices', IdempotencyRecord, 'invoice',
+    {'supplier_id': Invoice.supplier_id, 'code': Invoice.code})
+
 
 @invoice_routes.route('/', methods=['POST'])
 def create_invoice():
@@ -16,6 +38,10 @@ def create_invoice():
     if json_data is None:
         return response_with(resp.INVALID_INPUT_422, message="No input data provided")
 
+    claim = claim_idempotency(INVOICE_IDEMPOTENCY, json_data)
+    if claim.response is not None:
+        return claim.response
+
     invoice_data = json_data.get('invoice')
     list_of_bought_goods = json_data.get('list_of_bought_goods')
     if not invoice_data or not list_of_bought_goods:
@@ -40,26 +66,65 @@ def create_invoice():
         for invoice_goods in loaded_invoice_goods_data:
             invoice_goods.invoice_id = new_invoice_id
             db.session.add(invoice_goods)
+        apply_invoice_lines(loaded_invoice_data, loaded_invoice_goods_data)
 
+        # Dumped before the commit so a stored replay commits with it;
+        # reloaded first, with the schema's eager loads, so it shows the
+        # values as stored (DECIMAL scale) without a query per line.
+        db.session.flush()
+        stored_invoice = db.session.get(
+            Invoice, new_invoice_id, options=invoice_schema.loader_options(), populate_existing=True)
+        rv = response_with(resp.SUCCESS_201, value=invoice_schema.dump(stored_invoice))
+        claim.save(rv)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
+        replay = claim.replay()
+        if replay is not None:
+            return replay
         print(f"Database error during creation: {e}")
         return response_with(resp.INVALID_INPUT_422, message="Database creation error")
 
-    return response_with(resp.SUCCESS_201, value=invoice_schema.dump(loaded_invoice_data))
+    return rv
+
+
+@invoice_routes.route('/batch', methods=['POST'])
+def create_invoices_batch():
+    json_data = request.get_json()
+    if json_data is None:
+        return response_with(resp.INVALID_INPUT_422, message="No input data provided")
+    return batch_create_response(INVOICE_BATCH, json_data, request.args.get('mode', 'atomic'))
 
 
 @invoice_routes.route('/', methods=['GET'])
 def get_inoivces():
-    fetched = db.session.execute(db.select(Invoice)).scalars().all()
-    output = invoices_schema.dump(fetched)
-    return output, 201
+    try:
+        list_args = parse_list_args(InvoiceSchema, INVOICE_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    if wants_ndjson():
+        return stream_ndjson(Invoice, build_list_statement(Invoice, list_args), list_args.schema)
+
+    fetched, pagination = fetch_page(Invoice, list_args)
+    output = list_args.schema.serialize(fetched)
+    return list_response(output, pagination)
+
+
+@invoice_routes.route('/export', methods=['GET'])
+def export_invoices():
+    try:
+        list_args = parse_list_args(InvoiceSchema, INVOICE_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    return stream_ndjson(Invoice, build_list_statement(Invoice, list_args), list_args.schema)
 
 
 @invoice_routes.route('/<int:id>', methods=['GET'])
 def get_inoivce_by_id(id):
-    invoice = db.session.get(Invoice, id)
+    invoice = db.session.get(
+        Invoice, id, options=invoice_schema.loader_options())
     if invoice is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Goods with id {id} not found")
 
@@ -89,27 +154,48 @@ def update_invoice_by_id(id):
         print(f"Unexpected error during schema load: {err}")
         return response_with(resp.INVALID_INPUT_422, message="Internal processing error")
 
+    mode = request.args.get('mode', 'merge')
+    if mode not in LINE_UPDATE_MODES:
+        return response_with(resp.INVALID_INPUT_422, message=f"Unknown update mode '{mode}'")
+
     existing_invoice = db.session.get(Invoice, id)
     if existing_invoice is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Invoice with id {id} not found")
 
+    line_changes = None
     try:
         db.session.begin_nested()  # Start a transaction
+        cost_snapshot = snapshot_invoice(existing_invoice)
         existing_invoice = invoice_schema.load(
             invoice_data,
             instance=existing_invoice,
             partial=True
         )
-        existing_invoice.list_of_bought_goods.clear()
-        db.session.flush()
-        for new_item in loaded_invoice_goods_data:
-            new_item.invoice_id = id
-            db.session.add(new_item)
+        if mode == 'merge':
+            line_changes = merge_line_items(
+                existing_invoice.list_of_bought_goods,
+                list_of_bought_goods,
+                loaded_invoice_goods_data,
+                match_attr='goods_id',
+                fields=('goods_id', 'buy_quantity',
+                        'buying_price_per_unit', 'vat_precentage')
+            )
+        else:
+            existing_invoice.list_of_bought_goods.clear()
+            db.session.flush()
+            existing_invoice.list_of_bought_goods.extend(
+                loaded_invoice_goods_data)
+        apply_invoice_change(cost_snapshot, existing_invoice)
 
         db.session.commit()
+    except LineMergeError as e:
+        db.session.rollback()
+        return response_with(resp.INVALID_INPUT_422, message=str(e))
     except Exception as e:
         db.session.rollback()
         print(f"Database error during update: {e}")
         return response_with(resp.INVALID_INPUT_422, message=f"Database update error: {e}")
     output = invoice_schema.dump(existing_invoice)
+    if line_changes is not None:
+        output['line_changes'] = line_changes
     return output, 201
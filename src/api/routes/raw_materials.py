@@ -1,39 +1,74 @@
 import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 from flask import Blueprint, request
 from src.api.utils.responses import response_with
 from src.api.utils import responses as resp
-from src.api.models import Goods, InvoiceGoods, RawMaterial, ReceiptRawMaterial
+from src.api.models import Goods, InvoiceGoods, RawMaterial, StockBalance, ReceiptRawMaterial, Receipt
 from sqlalchemy import func, Float, select, Integer
+from sqlalchemy.orm import with_loader_criteria
 from src.api.utils.database import db
-from src.api.schemas.all_schemas import raw_material_schema, raw_materials_schema
+from src.api.utils.cache import response_cache
+from src.api.schemas.all_schemas import RawMaterialSchema, ReceiptRawMaterialSchema, raw_material_schema, raw_materials_schema
+from src.api.utils.bulk import bulk_create_response, bulk_update_response, dump_reloaded
+from src.api.utils.pagination import parse_list_args, fetch_page, list_response, ListArgsError, wants_field, build_list_statement
+from src.api.utils.export import stream_ndjson, stream_ndjson_records, wants_ndjson
+from src.api.utils.reconciliation import reconcile, ReconciliationError
+from src.api.utils.material_costs import material_cost_query
+from src.api.utils.stock_snapshots import balances_as_of
+from src.api.utils.forecast import material_forecast, DEFAULT_WINDOW_DAYS, MAX_WINDOW_DAYS, DEFAULT_LEAD_TIME_DAYS, DEFAULT_COVER_DAYS, MAX_PLANNING_DAYS
 from marshmallow import ValidationError
 
 
 raw_material_routes = Blueprint("raw_material_routes", __name__)
 
+RAW_MATERIAL_FILTERS = {
+    'category_id': (RawMaterial.category_id, '=='),
+    'code': (RawMaterial.code, '=='),
+}
+
+# Query argument: (default, lowest, highest); stock_id has no default.
+FORECAST_ARGS = {
+    'window_days': (DEFAULT_WINDOW_DAYS, 1, MAX_WINDOW_DAYS),
+    'lead_time_days': (DEFAULT_LEAD_TIME_DAYS, 0, MAX_PLANNING_DAYS),
+    'cover_days': (DEFAULT_COVER_DAYS, 0, MAX_PLANNING_DAYS),
+    'stock_id': (None, 1, None),
+}
+
+MOVEMENT_HISTORY_FILTERS = {
+    'raw_material_id': (ReceiptRawMaterial.raw_material_id, '=='),
+    'stock_id': (Receipt.stock_id, '=='),
+    'created_date_from': (Receipt.created_date, '>='),
+    'created_date_to': (Receipt.created_date, '<='),
+}
+
 
 @raw_material_routes.route('/rm-invoice-prices/', methods=['GET'])
+@response_cache.cached()
 def get_raw_materials_buying_prices():
+    as_of = request.args.get('as_of')
+    if as_of is not None:
+        try:
+            as_of = date.fromisoformat(as_of)
+        except ValueError:
+            return response_with(resp.INVALID_INPUT_422, message="'as_of' must be a date (YYYY-MM-DD)")
+
     try:
-        results = db.session.execute(
-            db.select(
-                Goods.material_code,
-                func.cast(
-                    func.round(
-                        func.avg(InvoiceGoods.buying_price_per_unit.cast(
-                            Float)).label('average_price'),
-                    ),
-                    Integer
-                )
-            )
-            .join(InvoiceGoods, Goods.id == InvoiceGoods.goods_id, isouter=True)
-            .group_by(Goods.material_code)
-        ).all()
+        results = db.session.execute(material_cost_query(as_of)).all()
         response_data = []
-        for code, avg_price in results:
+        for code, price_sum, line_count, total_cost, base_quantity in results:
+            average_price = None
+            if line_count:
+                average_price = (Decimal(str(price_sum)) / line_count).quantize(
+                    Decimal('1'), rounding=ROUND_HALF_UP)
+            weighted_cost = None
+            if base_quantity:
+                weighted_cost = (Decimal(str(total_cost)) / Decimal(str(base_quantity))).quantize(
+                    Decimal('0.001'), rounding=ROUND_HALF_UP)
             response_data.append({
                 "material_code": code,
-                "average_buying_price": str(avg_price) if avg_price is not None else None
+                "average_buying_price": str(average_price) if average_price is not None else None,
+                "weighted_average_cost": str(weighted_cost) if weighted_cost is not None else None
             })
         output = response_data
         return output, 200
@@ -44,6 +79,7 @@ def get_raw_materials_buying_prices():
 
 
 @raw_material_routes.route('/rm-invoices-stock/', methods=['GET'])
+@response_cache.cached()
 def get_raw_materials_invoice_stock():
     try:
         results = db.session.execute(
@@ -74,6 +110,66 @@ def get_raw_materials_invoice_stock():
         return response_with(resp.SERVER_ERROR_500, message="An error occurred during stock calculation.")
 
 
+@raw_material_routes.route('/reconciliation/', methods=['GET'])
+@response_cache.cached()
+def get_reconciliation():
+    window = {}
+    for name in ('date_from', 'date_to'):
+        raw_value = request.args.get(name)
+        if raw_value is None:
+            window[name] = None
+            continue
+        try:
+            window[name] = date.fromisoformat(raw_value)
+        except ValueError:
+            return response_with(resp.INVALID_INPUT_422, message=f"'{name}' must be a date (YYYY-MM-DD)")
+
+    rows = reconcile(**window)
+    if wants_ndjson():
+        return stream_ndjson_records(rows)
+    try:
+        return list(rows), 200
+    except ReconciliationError as e:
+        logging.error(f"Reconciliation failed: {e}")
+        return response_with(resp.SERVER_ERROR_500, message=str(e))
+
+
+def _forecast_ttl():
+    # The forecast window moves at midnight, receipts or not. A per-process
+    # cache never sees the tag bumps of receipts written through other
+    # workers, so there it keeps the default TTL like every other route.
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), time())
+    seconds = max(int((tomorrow - datetime.now()).total_seconds()), 1)
+    if not response_cache.shared:
+        return min(seconds, response_cache.default_ttl)
+    return seconds
+
+
+@raw_material_routes.route('/forecast', methods=['GET'])
+@response_cache.cached(ttl=_forecast_ttl)
+def get_raw_material_forecast():
+    forecast_args = {}
+    for name, (default, lowest, highest) in FORECAST_ARGS.items():
+        raw_value = request.args.get(name)
+        if raw_value is None:
+            forecast_args[name] = default
+            continue
+        try:
+            value = int(raw_value)
+        except ValueError:
+            return response_with(resp.INVALID_INPUT_422, message=f"'{name}' must be an integer")
+        if value < lowest or (highest is not None and value > highest):
+            bounds = f"between {lowest} and {highest}" if highest is not None else f"at least {lowest}"
+            return response_with(resp.INVALID_INPUT_422, message=f"'{name}' must be {bounds}")
+        forecast_args[name] = value
+
+    try:
+        return material_forecast(**forecast_args), 200
+    except RuntimeError as e:
+        logging.error(f"Forecast failed: {e}")
+        return response_with(resp.SERVER_ERROR_500, message=str(e))
+
+
 @raw_material_routes.route('/', methods=['POST'])
 def create_raw_material():
     json_data = request.get_json()
@@ -81,6 +177,10 @@ def create_raw_material():
         return response_with(resp.INVALID_INPUT_422, message="No input data provided")
 
     is_many = isinstance(json_data, list)
+    bulk_mode = request.args.get('bulk')
+    if is_many and bulk_mode:
+        return bulk_create_response(RawMaterial, RawMaterialSchema, json_data, bulk_mode)
+
     schema_to_use = raw_materials_schema if is_many else raw_material_schema
     try:
         loaded_data = schema_to_use.load(json_data)
@@ -100,66 +200,89 @@ def create_raw_material():
     except Exception as e:
         print(f"Database error during creation: {e}")
         return response_with(resp.INVALID_INPUT_422, message="Database creation error")
-    return raw_materials_schema.dump(created_raw_materials), 201
+    return dump_reloaded(RawMaterial, raw_materials_schema, [raw_material.id for raw_material in created_raw_materials]), 201
 
 
 @raw_material_routes.route('/', methods=['GET'])
+@response_cache.cached()
 def get_raw_materials():
-    fetched_raw_materials = db.session.execute(
-        db.select(RawMaterial)).scalars().all()
     try:
-        results = db.session.execute(
-            db.select(
-                RawMaterial.code,
-                func.round(func.sum(ReceiptRawMaterial.quantity.cast(
-                    Float)).label('total_stock_quantity'), 3)
-            )
-            .join(ReceiptRawMaterial, RawMaterial.id == ReceiptRawMaterial.raw_material_id, isouter=True)
-            .group_by(RawMaterial.code)
-        ).all()
+        list_args = parse_list_args(
+            RawMaterialSchema, RAW_MATERIAL_FILTERS, extra_fields=('total_stock_quantity',))
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    fetched_raw_materials, pagination = fetch_page(RawMaterial, list_args)
+    page_raw_material_ids = [
+        raw_material.id for raw_material in fetched_raw_materials]
+    results = []
+    try:
+        if wants_field(list_args, 'total_stock_quantity') and page_raw_material_ids:
+            results = db.session.execute(
+                db.select(
+                    StockBalance.raw_material_id,
+                    func.round(func.sum(StockBalance.quantity.cast(
+                        Float)).label('total_stock_quantity'), 3)
+                )
+                .where(StockBalance.raw_material_id.in_(page_raw_material_ids))
+                .group_by(StockBalance.raw_material_id)
+            ).all()
     except Exception as e:
         logging.error(
             f"Error fetching aggregated stock for raw materials: {e}")
         results = []
 
-    # { "BAKINGSODA": "0.954", "BOLAT-0001": "1.0", ... }
+    # { 1: "0.954", 2: "1.0", ... } keyed by raw material id
     stock_map = {}
-    for code, total_quantity in results:
+    for raw_material_id, total_quantity in results:
         quantity_str = str(
             total_quantity) if total_quantity is not None else None
-        stock_map[code] = quantity_str
+        stock_map[raw_material_id] = quantity_str
 
-    final_output = []
-    for raw_material in fetched_raw_materials:
-        # Dump the base data using the single item schema
-        raw_material_data = raw_material_schema.dump(raw_material)
-        # Get the code from the dumped data (or directly from raw_material.code)
-        material_code = raw_material_data.get('code')
-        # Look up the quantity using the code. Default to None if no receipts were found.
-        stock_qty = stock_map.get(material_code, None)
-        # --- CRITICAL FIX 2: Assign the single value found in the map ---
-        raw_material_data['total_stock_quantity'] = stock_qty
-        final_output.append(raw_material_data)
+    final_output = list_args.schema.serialize(fetched_raw_materials)
+    if wants_field(list_args, 'total_stock_quantity'):
+        for raw_material, raw_material_data in zip(fetched_raw_materials, final_output):
+            # Default to None if no receipts were found.
+            raw_material_data['total_stock_quantity'] = stock_map.get(
+                raw_material.id, None)
 
-    return final_output, 200
+    return list_response(final_output, pagination)
 
 
 @raw_material_routes.route('/<int:id>', methods=['GET'])
 def get_raw_material_by_id(id):
-    raw_material = db.session.get(RawMaterial, id)
+    as_of = request.args.get('as_of')
+    if as_of is not None:
+        try:
+            as_of = date.fromisoformat(as_of)
+        except ValueError:
+            return response_with(resp.INVALID_INPUT_422, message="'as_of' must be a date (YYYY-MM-DD)")
+
+    options = raw_material_schema.loader_options()
+    if as_of is not None:
+        # Only the movements the as-of balances count.
+        options = [*options, with_loader_criteria(
+            ReceiptRawMaterial, ReceiptRawMaterial.receipt.has(Receipt.created_date <= as_of))]
+    raw_material = db.session.get(RawMaterial, id, options=options)
     if raw_material is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Raw Material with id {id} not found")
+
+    if as_of is not None:
+        balances = balances_as_of(as_of, raw_material_id=id)
+        raw_material_data = raw_material_schema.dump(raw_material)
+        raw_material_data['as_of'] = as_of.isoformat()
+        raw_material_data['total_stock_quantity'] = (
+            str(round(float(sum(balances.values())), 3)) if balances else None)
+        return raw_material_data, 200
+
     stock_qty = None
     try:
         result_row = db.session.execute(
             select(
-                func.round(func.sum(ReceiptRawMaterial.quantity.cast(Float)), 3).label(
+                func.round(func.sum(StockBalance.quantity.cast(Float)), 3).label(
                     'total_stock_quantity')
             )
-            .join(RawMaterial, RawMaterial.id == ReceiptRawMaterial.raw_material_id, isouter=True)
-            .where(RawMaterial.id == id)
-            # Grouping is technically unnecessary here but doesn't hurt
-            .group_by(RawMaterial.code)
+            .where(StockBalance.raw_material_id == id)
         ).scalar_one_or_none()  # Executes and gets the single calculated value
         if result_row is not None:
             # result_row is the scalar value (the rounded sum)
@@ -173,6 +296,26 @@ def get_raw_material_by_id(id):
     return raw_material_data, 200
 
 
+@raw_material_routes.route('/movement-history/export', methods=['GET'])
+@raw_material_routes.route('/<int:id>/movement-history/export', methods=['GET'])
+def export_movement_history(id=None):
+    try:
+        list_args = parse_list_args(
+            ReceiptRawMaterialSchema, MOVEMENT_HISTORY_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    stmt = db.select(ReceiptRawMaterial).join(
+        Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
+    if id is not None:
+        stmt = stmt.where(ReceiptRawMaterial.raw_material_id == id)
+    return stream_ndjson(
+        ReceiptRawMaterial,
+        build_list_statement(ReceiptRawMaterial, list_args, stmt),
+        list_args.schema
+    )
+
+
 @raw_material_routes.route('/<int:id>', methods=['PUT'])
 def update_raw_material_by_id(id):
     json_data = request.get_json()
@@ -208,33 +351,4 @@ def update_raw_material_by_list():
     if not json_data:
         return response_with(resp.INVALID_INPUT_422, message="Input list is empty.")
 
-    updated_raw_material_list = []
-    try:
-        for item_data in json_data:
-            raw_material_id = item_data.get('id')
-            if raw_material_id is None:
-                db.session.rollback()
-                return response_with(resp.INVALID_INPUT_422, message=f"Missing 'id' field in one of the raw material objects.")
-
-            existing_raw_materials = db.session.get(
-                RawMaterial, raw_material_id)
-            if existing_raw_materials is None:
-                db.session.rollback()
-                return response_with(resp.SERVER_ERROR_404,
-                                     message=f"raw material with id {raw_material_id} not found, aborting bulk update.")
-
-            updated_raw_materials = raw_material_schema.load(
-                item_data,
-                instance=existing_raw_materials,
-                partial=True
-            )
-            updated_raw_material_list.append(updated_raw_materials)
-
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Database error during bulk update: {e}")
-        return response_with(resp.INVALID_INPUT_422, message=f"Database update error: {str(e)}")
-
-    output = raw_materials_schema.dump(updated_raw_material_list)
-    return output, 200
+    return bulk_update_response(RawMaterial, RawMaterialSchema, raw_materials_schema, json_data, 'raw material')
@@ -3,12 +3,34 @@ from marshmallow import ValidationError
 from src.api.utils.responses import response_with
 from src.api.utils import responses as resp
 from src.api.utils.database import db
-from src.api.models import Receipt
-from src.api.schemas.all_schemas import receipt_schema, receipts_schema, receipt_raw_material_schema, list_receipt_raw_material_schema
+from src.api.utils.stock_ledger import apply_receipt_lines, snapshot_receipt, apply_receipt_change, apply_receipt_documents
+from src.api.utils.bulk import DocumentBatch, batch_create_response
+from src.api.utils.idempotency import IdempotentCreate, claim_idempotency
+from src.api.utils.line_items import merge_line_items, LineMergeError, LINE_UPDATE_MODES
+from src.api.utils.pagination import parse_list_args, fetch_page, list_response, ListArgsError, build_list_statement
+from src.api.utils.export import stream_ndjson, wants_ndjson
+from src.api.models import Receipt, ReceiptRawMaterial, ImsIdempotencyRecord
+from src.api.schemas.all_schemas import ReceiptSchema, ReceiptRawMaterialSchema, receipt_schema, receipt_raw_material_schema, list_receipt_raw_material_schema
 
 
 receipts_routes = Blueprint("receipts_routes", __name__)
 
+RECEIPT_FILTERS = {
+    'stock_id': (Receipt.stock_id, '=='),
+    'receipt_code': (Receipt.receipt_code, '=='),
+    'request_code': (Receipt.request_code, '=='),
+    'created_date_from': (Receipt.created_date, '>='),
+    'created_date_to': (Receipt.created_date, '<='),
+}
+
+RECEIPT_BATCH = DocumentBatch(
+    Receipt, ReceiptSchema, 'receipt',
+    ReceiptRawMaterial, ReceiptRawMaterialSchema, 'list_of_raw_materials', 'receipt_id',
+    apply_receipt_documents, ('created_date',))
+
+RECEIPT_IDEMPOTENCY = IdempotentCreate(
+    'receipts', ImsIdempotencyRecord, 'receipt', {'receipt_code': Receipt.receipt_code})
+
 
 @receipts_routes.route('/', methods=['POST'])
 def create_receipts():
@@ -16,6 +38,10 @@ def create_receipts():
     if json_data is None:
         return response_with(resp.INVALID_INPUT_422, message="No input data provided")
 
+    claim = claim_idempotency(RECEIPT_IDEMPOTENCY, json_data)
+    if claim.response is not None:
+        return claim.response
+
     receipt_data = json_data.get('receipt')
     list_of_raw_materials = json_data.get('list_of_raw_materials')
     if not receipt_data or not list_of_raw_materials:
@@ -41,26 +67,66 @@ def create_receipts():
         for receipt_raw_material in loaded_receipt_raw_materials_data:
             receipt_raw_material.receipt_id = new_receipt_id
             db.session.add(receipt_raw_material)
+        apply_receipt_lines(
+            loaded_receipt_data, loaded_receipt_raw_materials_data)
 
+        # Dumped before the commit so a stored replay commits with it;
+        # reloaded first, with the schema's eager loads, so it shows the
+        # values as stored (DECIMAL scale) without a query per line.
+        db.session.flush()
+        stored_receipt = db.session.get(
+            Receipt, new_receipt_id, options=receipt_schema.loader_options(), populate_existing=True)
+        rv = response_with(resp.SUCCESS_201, value=receipt_schema.dump(stored_receipt))
+        claim.save(rv)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
+        replay = claim.replay()
+        if replay is not None:
+            return replay
         print(f"Database error during creation: {e}")
         return response_with(resp.INVALID_INPUT_422, message="Database creation error")
 
-    return response_with(resp.SUCCESS_201, value=receipt_raw_material_schema.dump(loaded_receipt_data))
+    return rv
+
+
+@receipts_routes.route('/batch', methods=['POST'])
+def create_receipts_batch():
+    json_data = request.get_json()
+    if json_data is None:
+        return response_with(resp.INVALID_INPUT_422, message="No input data provided")
+    return batch_create_response(RECEIPT_BATCH, json_data, request.args.get('mode', 'atomic'))
 
 
 @receipts_routes.route('/', methods=['GET'])
 def get_receipt():
-    fetched = db.session.execute(db.select(Receipt)).scalars().all()
-    output = receipts_schema.dump(fetched)
-    return output, 201
+    try:
+        list_args = parse_list_args(ReceiptSchema, RECEIPT_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    if wants_ndjson():
+        return stream_ndjson(Receipt, build_list_statement(Receipt, list_args), list_args.schema)
+
+    fetched, pagination = fetch_page(Receipt, list_args)
+    output = list_args.schema.serialize(fetched)
+    return list_response(output, pagination)
+
+
+@receipts_routes.route('/export', methods=['GET'])
+def export_receipts():
+    try:
+        list_args = parse_list_args(ReceiptSchema, RECEIPT_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    return stream_ndjson(Receipt, build_list_statement(Receipt, list_args), list_args.schema)
 
 
 @receipts_routes.route('/<int:id>', methods=['GET'])
 def get_receipt_by_id(id):
-    receipt = db.session.get(Receipt, id)
+    receipt = db.session.get(
+        Receipt, id, options=receipt_schema.loader_options())
     if receipt is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Receipt with id {id} not found")
 
@@ -90,27 +156,47 @@ def update_receipt_by_id(id):
         print(f"Unexpected error during schema load: {err}")
         return response_with(resp.INVALID_INPUT_422, message="Internal processing error")
 
+    mode = request.args.get('mode', 'merge')
+    if mode not in LINE_UPDATE_MODES:
+        return response_with(resp.INVALID_INPUT_422, message=f"Unknown update mode '{mode}'")
+
     existing_receipt = db.session.get(Receipt, id)
     if existing_receipt is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Receipt with id {id} not found")
 
+    line_changes = None
     try:
         db.session.begin_nested()
+        ledger_snapshot = snapshot_receipt(existing_receipt)
         existing_receipt = receipt_schema.load(
             receipt_data,
             instance=existing_receipt,
             partial=True
         )
-        existing_receipt.list_of_raw_materials.clear()
-        db.session.flush()
-        for new_item in loaded_list_of_raw_materials_data:
-            new_item.receipt_id = id
-            db.session.add(new_item)
+        if mode == 'merge':
+            line_changes = merge_line_items(
+                existing_receipt.list_of_raw_materials,
+                list_of_raw_materials_data,
+                loaded_list_of_raw_materials_data,
+                match_attr='raw_material_id',
+                fields=('raw_material_id', 'quantity')
+            )
+        else:
+            existing_receipt.list_of_raw_materials.clear()
+            db.session.flush()
+            existing_receipt.list_of_raw_materials.extend(
+                loaded_list_of_raw_materials_data)
+        apply_receipt_change(ledger_snapshot, existing_receipt)
 
         db.session.commit()
+    except LineMergeError as e:
+        db.session.rollback()
+        return response_with(resp.INVALID_INPUT_422, message=str(e))
     except Exception as e:
         db.session.rollback()
         print(f"Database error during update: {e}")
         return response_with(resp.INVALID_INPUT_422, message=f"Database update error: {e}")
     output = receipt_schema.dump(existing_receipt)
+    if line_changes is not None:
+        output['line_changes'] = line_changes
     return output, 201
@@ -1,16 +1,26 @@
 import logging
+from datetime import date
 from flask import Blueprint, request
 from marshmallow import ValidationError
 from src.api.utils.responses import response_with
 from src.api.utils import responses as resp
 from src.api.utils.database import db
+from src.api.utils.cache import response_cache
+from src.api.utils.bulk import bulk_create_response, bulk_update_response, dump_reloaded
+from src.api.utils.pagination import parse_list_args, fetch_page, list_response, ListArgsError, wants_field
+from src.api.utils.stock_snapshots import balances_as_of
 from sqlalchemy import func, Float, select
-from src.api.models import Stock, RawMaterial, ReceiptRawMaterial, Receipt
-from src.api.schemas.all_schemas import stock_schema, stocks_schema
+from sqlalchemy.orm import with_loader_criteria
+from src.api.models import Stock, RawMaterial, StockBalance, Receipt
+from src.api.schemas.all_schemas import StockSchema, stock_schema, stocks_schema
 
 
 stocks_routes = Blueprint("stocks_routes", __name__)
 
+STOCK_FILTERS = {
+    'stock_code': (Stock.stock_code, '=='),
+}
+
 
 @stocks_routes.route('/', methods=['POST'])
 def create_stock():
@@ -19,6 +29,10 @@ def create_stock():
         return response_with(resp.INVALID_INPUT_422, message="No input data provided")
 
     is_many = isinstance(json_data, list)
+    bulk_mode = request.args.get('bulk')
+    if is_many and bulk_mode:
+        return bulk_create_response(Stock, StockSchema, json_data, bulk_mode)
+
     schema_to_use = stocks_schema if is_many else stock_schema
     try:
         loaded_data = schema_to_use.load(json_data)
@@ -38,72 +52,92 @@ def create_stock():
     except Exception as e:
         print(f"Database error during creation: {e}")
         return response_with(resp.INVALID_INPUT_422, message="Database creation error")
-    return stocks_schema.dump(created_stock), 201
+    return dump_reloaded(Stock, stocks_schema, [stock.id for stock in created_stock]), 201
 
 
 @stocks_routes.route('/', methods=['GET'])
+@response_cache.cached()
 def get_stocks():
-    fetched_stocks = db.session.execute(db.select(Stock)).scalars().all()
     try:
-        results = db.session.execute(
-            select(
-                Stock.stock_code,
-                RawMaterial.code.label('material_code'),
-                func.round(
-                    func.sum(ReceiptRawMaterial.quantity.cast(Float)),
-                    3
-                ).label('total_stock_quantity')
-            )
-            .join(RawMaterial, RawMaterial.id == ReceiptRawMaterial.raw_material_id, isouter=True)
-            .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
-            .join(Stock, Stock.id == Receipt.stock_id)
-            .group_by(Stock.stock_code, RawMaterial.code)
-        ).all()
+        list_args = parse_list_args(
+            StockSchema, STOCK_FILTERS, extra_fields=('stock_item',))
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    fetched_stocks, pagination = fetch_page(Stock, list_args)
+    page_stock_ids = [stock.id for stock in fetched_stocks]
+    results = []
+    try:
+        if wants_field(list_args, 'stock_item') and page_stock_ids:
+            results = db.session.execute(
+                select(
+                    StockBalance.stock_id,
+                    RawMaterial.code.label('material_code'),
+                    func.round(
+                        StockBalance.quantity.cast(Float),
+                        3
+                    ).label('total_stock_quantity')
+                )
+                .join(RawMaterial, RawMaterial.id == StockBalance.raw_material_id)
+                .where(StockBalance.stock_id.in_(page_stock_ids))
+            ).all()
     except Exception as e:
         logging.error(f"Error fetching aggregated stock: {e}")
 
     stock_quantities_map = {}
-    for stock_code, material_code, total_quantity in results:
+    for stock_id, material_code, total_quantity in results:
         quantity_str = str(
             total_quantity) if total_quantity is not None else None
-        if stock_code not in stock_quantities_map:
-            stock_quantities_map[stock_code] = []
-        stock_quantities_map[stock_code].append({
+        if stock_id not in stock_quantities_map:
+            stock_quantities_map[stock_id] = []
+        stock_quantities_map[stock_id].append({
             "material_code": material_code,
             "total_stock_quantity": quantity_str
         })
 
-    final_output = []
-    for stock in fetched_stocks:
-        stock_data = stock_schema.dump(stock)
-        stock_code = stock_data.get('stock_code')
-        stock_data['stock_item'] = stock_quantities_map.get(stock_code, [])
-        final_output.append(stock_data)
+    final_output = list_args.schema.serialize(fetched_stocks)
+    if wants_field(list_args, 'stock_item'):
+        for stock, stock_data in zip(fetched_stocks, final_output):
+            stock_data['stock_item'] = stock_quantities_map.get(stock.id, [])
 
-    return final_output, 200
+    return list_response(final_output, pagination)
 
 
 @stocks_routes.route('/<int:id>', methods=['GET'])
 def get_stock_by_id(id):
-    stock = db.session.get(Stock, id)
+    as_of = request.args.get('as_of')
+    if as_of is not None:
+        try:
+            as_of = date.fromisoformat(as_of)
+        except ValueError:
+            return response_with(resp.INVALID_INPUT_422, message="'as_of' must be a date (YYYY-MM-DD)")
+
+    options = stock_schema.loader_options()
+    if as_of is not None:
+        # Only the receipts the as-of balances count.
+        options = [*options, with_loader_criteria(Receipt, Receipt.created_date <= as_of)]
+    stock = db.session.get(Stock, id, options=options)
     if stock is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Stock with id {id} not found")
 
+    if as_of is not None:
+        stock_data = stock_schema.dump(stock)
+        stock_data['as_of'] = as_of.isoformat()
+        stock_data['stock_item'] = _stock_items_as_of(id, as_of)
+        return stock_data, 200
+
     stock_items_list = []
     try:
         results = db.session.execute(
             select(
                 RawMaterial.code.label('material_code'),
                 func.round(
-                    func.sum(ReceiptRawMaterial.quantity.cast(Float)),
+                    StockBalance.quantity.cast(Float),
                     3
                 ).label('total_stock_quantity')
             )
-            .join(RawMaterial, RawMaterial.id == ReceiptRawMaterial.raw_material_id, isouter=True)
-            .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
-            .join(Stock, Stock.id == Receipt.stock_id)
-            .where(Stock.id == id)
-            .group_by(RawMaterial.code)
+            .join(RawMaterial, RawMaterial.id == StockBalance.raw_material_id)
+            .where(StockBalance.stock_id == id)
         ).all()
         for material_code, total_quantity in results:
             quantity_str = str(
@@ -121,6 +155,23 @@ def get_stock_by_id(id):
     return stock_data, 200
 
 
+def _stock_items_as_of(stock_id, as_of):
+    """``stock_item`` of a stock at the close of ``as_of``, from the
+    daily snapshots plus the receipts since."""
+    balances = balances_as_of(as_of, stock_id=stock_id)
+    codes = dict(db.session.execute(
+        select(RawMaterial.id, RawMaterial.code)
+        .where(RawMaterial.id.in_([raw_material_id for _, raw_material_id in balances]))
+    ).all()) if balances else {}
+    return [
+        {
+            "material_code": codes.get(raw_material_id),
+            "total_stock_quantity": str(round(float(quantity), 3))
+        }
+        for (_, raw_material_id), quantity in sorted(balances.items())
+    ]
+
+
 @stocks_routes.route('/<int:id>', methods=['PUT'])
 def update_stock_by_id(id):
     json_data = request.get_json()
@@ -156,33 +207,4 @@ def update_stock_by_list():
     if not json_data:
         return response_with(resp.INVALID_INPUT_422, message="Input list is empty.")
 
-    updated_stocks_list = []
-    try:
-        for item_data in json_data:
-            stock_id = item_data.get('id')
-            if stock_id is None:
-                db.session.rollback()
-                return response_with(resp.INVALID_INPUT_422, message=f"Missing 'id' field in one of the stock objects.")
-
-            existing_stocks = db.session.get(
-                Stock, stock_id)
-            if existing_stocks is None:
-                db.session.rollback()
-                return response_with(resp.SERVER_ERROR_404,
-                                     message=f"Stock with id {stock_id} not found, aborting bulk update.")
-
-            updated_stock = stock_schema.load(
-                item_data,
-                instance=existing_stocks,
-                partial=True
-            )
-            updated_stocks_list.append(updated_stock)
-
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Database error during bulk update: {e}")
-        return response_with(resp.INVALID_INPUT_422, message=f"Database update error: {str(e)}")
-
-    output = stocks_schema.dump(updated_stocks_list)
-    return output, 200
+    return bulk_update_response(Stock, StockSchema, stocks_schema, json_data, 'Stock')
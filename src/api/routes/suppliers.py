@@ -2,13 +2,19 @@ from flask import Blueprint, request
 from marshmallow import ValidationError
 from src.api.utils.responses import response_with
 from src.api.utils import responses as resp
-from src.api.schemas.all_schemas import supplier_schema, suppliers_schema
+from src.api.schemas.all_schemas import SupplierSchema, supplier_schema, suppliers_schema
 from src.api.utils.database import db
+from src.api.utils.bulk import bulk_create_response, bulk_update_response, dump_reloaded
+from src.api.utils.pagination import parse_list_args, fetch_page, list_response, ListArgsError
 from src.api.models import Supplier
 
 
 supplier_routes = Blueprint("supplier_routes", __name__)
 
+SUPPLIER_FILTERS = {
+    'name': (Supplier.name, '=='),
+}
+
 
 @supplier_routes.route('/', methods=['POST'])
 def create_supplier():
@@ -17,6 +23,10 @@ def create_supplier():
         return response_with(resp.INVALID_INPUT_422, message="No input data provided")
 
     is_many = isinstance(json_data, list)
+    bulk_mode = request.args.get('bulk')
+    if is_many and bulk_mode:
+        return bulk_create_response(Supplier, SupplierSchema, json_data, bulk_mode)
+
     schema_to_use = suppliers_schema if is_many else supplier_schema
     try:
         loaded_data = schema_to_use.load(json_data)
@@ -36,24 +46,25 @@ def create_supplier():
     except Exception as e:
         print(f"Database error during creation: {e}")
         return response_with(resp.INVALID_INPUT_422, message="Database creation error")
-    return suppliers_schema.dump(created_suppliers), 201
+    return dump_reloaded(Supplier, suppliers_schema, [supplier.id for supplier in created_suppliers]), 201
 
 
 @supplier_routes.route('/', methods=['GET'])
 def get_supplier_list():
-    # SQLAlchemy 2.0 style query execution
-    # db.select(Supplier) creates the SELECT statement object
-    # db.session.execute runs it
-    # .scalars() gets the results as model objects
-    # .all() gets all results in a list
-    fetched = db.session.execute(db.select(Supplier)).scalars().all()
-    output = suppliers_schema.dump(fetched)
-    return output, 201
+    try:
+        list_args = parse_list_args(SupplierSchema, SUPPLIER_FILTERS)
+    except ListArgsError as err:
+        return response_with(err.response, message=err.message)
+
+    fetched, pagination = fetch_page(Supplier, list_args)
+    output = list_args.schema.serialize(fetched)
+    return list_response(output, pagination)
 
 
 @supplier_routes.route('/<int:id>', methods=['GET'])
 def get_supplier_by_id(id):
-    supplier = db.session.get(Supplier, id)
+    supplier = db.session.get(
+        Supplier, id, options=supplier_schema.loader_options())
     if supplier is None:
         return response_with(resp.SERVER_ERROR_404, message=f"Supplier with id {id} not found")
 
@@ -96,35 +107,7 @@ def update_supplier_by_list():
     if not json_data:
         return response_with(resp.INVALID_INPUT_422, message="Input list is empty.")
 
-    updated_suppliers_list = []
-    try:
-        for item_data in json_data:
-            supplier_id = item_data.get('id')
-            if supplier_id is None:
-                db.session.rollback()
-                return response_with(resp.INVALID_INPUT_422, message=f"Missing 'id' field in one of the supplier objects.")
-
-            existing_supplier = db.session.get(Supplier, supplier_id)
-            if existing_supplier is None:
-                db.session.rollback()
-                return response_with(resp.SERVER_ERROR_404,
-                                     message=f"Supplier with id {supplier_id} not found, aborting bulk update.")
-
-            updated_supplier = supplier_schema.load(
-                item_data,
-                instance=existing_supplier,
-                partial=True
-            )
-            updated_suppliers_list.append(updated_supplier)
-
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Database error during bulk update: {e}")
-        return response_with(resp.INVALID_INPUT_422, message=f"Database update error: {str(e)}")
-
-    output = suppliers_schema.dump(updated_suppliers_list)
-    return output, 200
+    return bulk_update_response(Supplier, SupplierSchema, suppliers_schema, json_data, 'Supplier')
 
 
 @supplier_routes.route('/<int:id>', methods=['DELETE'])
@@ -1,8 +1,14 @@
 # Imports the models only AFTER they are all registered via models.__init__
 from src.api.models import Supplier, Goods, Invoice, InvoiceGoods, Stock, RawMaterial, Category, Receipt, ReceiptRawMaterial
 from src.api.utils.database import db
+from src.api.utils.metrics import record_serialization
+from src.api.schemas.serializers import compiled_serializer, register_inline
+import threading
+import time
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 from marshmallow import EXCLUDE, fields
+from flask import current_app
+from sqlalchemy.orm import selectinload, joinedload
 
 
 class DecimalToString(fields.Decimal):
@@ -12,7 +18,55 @@ class DecimalToString(fields.Decimal):
         return str(value)
 
 
-class GoodsSchema(SQLAlchemyAutoSchema):
+register_inline(DecimalToString, '(None if ({v} := {value}) is None else str({v}))')
+
+
+class _DumpDepth(threading.local):
+    value = 0
+
+
+_dump_depth = _DumpDepth()
+
+
+class EagerLoadingSchema(SQLAlchemyAutoSchema):
+    # Loader options needed to dump each relationship field without lazy
+    # loads, keyed by field name so sparse fieldsets only load what they dump.
+    eager_loads = {}
+
+    def dump(self, obj, *, many=None):
+        # Nested fields dump through their own schema; only time the
+        # outermost call so nothing is counted twice.
+        if _dump_depth.value:
+            return super().dump(obj, many=many)
+        _dump_depth.value += 1
+        started = time.perf_counter()
+        try:
+            return super().dump(obj, many=many)
+        finally:
+            _dump_depth.value -= 1
+            record_serialization(time.perf_counter() - started)
+
+    def serialize(self, obj, *, many=None):
+        """``dump()`` for read-only responses, through the serializer
+        generated for this schema (see serializers.py); same output."""
+        if not current_app.config.get('COMPILED_SERIALIZERS', True):
+            return self.dump(obj, many=many)
+        started = time.perf_counter()
+        serializer = compiled_serializer(self)
+        many = self.many if many is None else many
+        result = [serializer(item) for item in obj] if many else serializer(obj)
+        record_serialization(time.perf_counter() - started)
+        return result
+
+    def loader_options(self):
+        return [
+            option
+            for field_name in self.dump_fields
+            for option in self.eager_loads.get(field_name, ())
+        ]
+
+
+class GoodsSchema(EagerLoadingSchema):
     convert_rate = DecimalToString(as_string=True)
     supplier = fields.Nested(
         'SupplierSchema',
@@ -35,8 +89,16 @@ class GoodsSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'supplier': (joinedload(Goods.supplier),),
+        'purchased_history': (
+            selectinload(Goods.purchased_history)
+            .joinedload(InvoiceGoods.invoice),
+        ),
+    }
+
 
-class SupplierSchema(SQLAlchemyAutoSchema):
+class SupplierSchema(EagerLoadingSchema):
     goods = fields.Nested(
         GoodsSchema,
         many=True,
@@ -58,8 +120,17 @@ class SupplierSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'goods': (selectinload(Supplier.goods),),
+        'invoices': (
+            selectinload(Supplier.invoices)
+            .selectinload(Invoice.list_of_bought_goods)
+            .joinedload(InvoiceGoods.goods),
+        ),
+    }
+
 
-class InvoiceSchema(SQLAlchemyAutoSchema):
+class InvoiceSchema(EagerLoadingSchema):
     supplier = fields.Nested(
         SupplierSchema,
         only=['name']
@@ -82,8 +153,16 @@ class InvoiceSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'supplier': (joinedload(Invoice.supplier),),
+        'list_of_bought_goods': (
+            selectinload(Invoice.list_of_bought_goods)
+            .joinedload(InvoiceGoods.goods),
+        ),
+    }
 
-class InvoiceGoodsSchema(SQLAlchemyAutoSchema):
+
+class InvoiceGoodsSchema(EagerLoadingSchema):
     buy_quantity = DecimalToString(as_string=True)
     buying_price_per_unit = DecimalToString(as_string=True)
     vat_precentage = DecimalToString(as_string=True)
@@ -108,8 +187,13 @@ class InvoiceGoodsSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'invoice': (joinedload(InvoiceGoods.invoice),),
+        'goods': (joinedload(InvoiceGoods.goods),),
+    }
+
 
-class StockSchema(SQLAlchemyAutoSchema):
+class StockSchema(EagerLoadingSchema):
     receipts = fields.List(fields.Nested(
         'ReceiptSchema',
         only=['receipt_code', 'created_date', 'list_of_raw_materials']
@@ -125,8 +209,17 @@ class StockSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'receipts': (
+            selectinload(Stock.receipts)
+            .selectinload(Receipt.list_of_raw_materials)
+            .joinedload(ReceiptRawMaterial.raw_material)
+            .joinedload(RawMaterial.category),
+        ),
+    }
 
-class CategorySchema(SQLAlchemyAutoSchema):
+
+class CategorySchema(EagerLoadingSchema):
     raw_materials = fields.List(fields.Nested(
         'RawMaterialSchema',
         only=['code', 'name']
@@ -142,8 +235,12 @@ class CategorySchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'raw_materials': (selectinload(Category.raw_materials),),
+    }
+
 
-class ReceiptSchema(SQLAlchemyAutoSchema):
+class ReceiptSchema(EagerLoadingSchema):
     stock = fields.Nested(
         'StockSchema',
         only=['stock_code']
@@ -164,8 +261,17 @@ class ReceiptSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'stock': (joinedload(Receipt.stock),),
+        'list_of_raw_materials': (
+            selectinload(Receipt.list_of_raw_materials)
+            .joinedload(ReceiptRawMaterial.raw_material)
+            .joinedload(RawMaterial.category),
+        ),
+    }
+
 
-class ReceiptRawMaterialSchema(SQLAlchemyAutoSchema):
+class ReceiptRawMaterialSchema(EagerLoadingSchema):
     quantity = DecimalToString(as_string=True)
     receipt_id = fields.Integer(required=False, load_only=True)
     receipt = fields.Nested(
@@ -188,8 +294,19 @@ class ReceiptRawMaterialSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'receipt': (
+            joinedload(ReceiptRawMaterial.receipt)
+            .joinedload(Receipt.stock),
+        ),
+        'raw_material': (
+            joinedload(ReceiptRawMaterial.raw_material)
+            .joinedload(RawMaterial.category),
+        ),
+    }
 
-class RawMaterialSchema(SQLAlchemyAutoSchema):
+
+class RawMaterialSchema(EagerLoadingSchema):
     category_name = fields.Method(
         "get_category_name",
         dump_only=True,
@@ -210,6 +327,15 @@ class RawMaterialSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         unknown = EXCLUDE
 
+    eager_loads = {
+        'category_name': (joinedload(RawMaterial.category),),
+        'movement_history': (
+            selectinload(RawMaterial.movement_history)
+            .joinedload(ReceiptRawMaterial.receipt)
+            .joinedload(Receipt.stock),
+        ),
+    }
+
     def get_category_name(self, raw_material_instance):
         if raw_material_instance.category:
             return raw_material_instance.category.name
@@ -0,0 +1,120 @@
+"""Generated serializers: the dump side of a schema, compiled to one function.
+
+``compiled_serializer(schema)`` turns the schema's dump fields (after
+``only``) into Python source for ``serialize(obj) -> dict``, a single dict
+display with each field's formatting inlined, and caches the function on
+the schema instance. The output is the same as ``schema.dump(obj)``: same
+keys, same order, same values. Field types without an inline template fall
+back to the field's own ``serialize()``, so anything unusual still matches.
+
+Objects are read by attribute, so pass ORM instances or ``Row`` tuples
+labelled with the field names. Loading and validation stay with marshmallow.
+"""
+import itertools
+import keyword
+from marshmallow import fields, missing
+from marshmallow.utils import ensure_text_type
+
+# ``{value}`` is the expression reading the attribute, ``{v}`` a free local.
+INLINE_TEMPLATES = {
+    fields.String._serialize:
+        '({v} if type({v} := {value}) is str or {v} is None else _text({v}))',
+    fields.DateTime._serialize:
+        '(None if ({v} := {value}) is None else {format}({v}))',
+}
+
+
+def register_inline(field_cls, template):
+    """Inline ``field_cls._serialize`` as ``template`` (see INLINE_TEMPLATES)."""
+    INLINE_TEMPLATES[field_cls._serialize] = template
+
+
+class _Compiler(object):
+    def __init__(self, schema):
+        self.schema = schema
+        self.namespace = {'_text': ensure_text_type, '_missing': missing}
+        self.names = itertools.count()
+        self.uses_fallback = False
+
+    def bind(self, prefix, value):
+        name = f'_{prefix}{next(self.names)}'
+        self.namespace[name] = value
+        return name
+
+    def local(self):
+        return f'_v{next(self.names)}'
+
+    def attribute(self, field, name):
+        attribute = field.attribute or name
+        if attribute.isidentifier() and not keyword.iskeyword(attribute):
+            return f'obj.{attribute}'
+        if '.' in attribute:
+            return None
+        return f'getattr(obj, {attribute!r})'
+
+    def expression(self, field, name):
+        serialize = type(field)._serialize
+
+        if isinstance(field, fields.Method) and field._serialize_method is not None:
+            return f"{self.bind('m', field._serialize_method)}(obj)"
+
+        value = self.attribute(field, name)
+        if value is not None:
+            if (serialize is fields.Number._serialize and not field.as_string
+                    and type(field)._format_num is fields.Number._format_num
+                    and field.num_type is int):
+                v = self.local()
+                return f'({v} if type({v} := {value}) is int or {v} is None else int({v}))'
+            if serialize is fields.DateTime._serialize:
+                format_func = field.SERIALIZATION_FUNCS.get(field.format or field.DEFAULT_FORMAT)
+                if format_func is not None:
+                    return INLINE_TEMPLATES[serialize].format(
+                        v=self.local(), value=value, format=self.bind('f', format_func))
+            elif serialize in INLINE_TEMPLATES:
+                return INLINE_TEMPLATES[serialize].format(v=self.local(), value=value)
+            if isinstance(field, fields.Nested) and serialize is fields.Nested._serialize:
+                return self.nested(field, value)
+            if (isinstance(field, fields.List) and serialize is fields.List._serialize
+                    and isinstance(field.inner, fields.Nested)
+                    and type(field.inner)._serialize is fields.Nested._serialize):
+                v = self.local()
+                item = self.nested(field.inner, '_item')
+                return f'(None if ({v} := {value}) is None else [{item} for _item in {v}])'
+
+        self.uses_fallback = True
+        return (f"{self.bind('field', field)}.serialize("
+                f"{name!r}, obj, accessor={self.bind('get', self.schema.get_attribute)})")
+
+    def nested(self, field, value):
+        nested_schema = field.schema
+        serializer = self.bind('s', compiled_serializer(nested_schema))
+        v = self.local()
+        if nested_schema.many or field.many:
+            return f'(None if ({v} := {value}) is None else [{serializer}(_o) for _o in {v}])'
+        return f'(None if ({v} := {value}) is None else {serializer}({v}))'
+
+    def compile(self):
+        entries = []
+        for name, field in self.schema.dump_fields.items():
+            key = field.data_key if field.data_key is not None else name
+            entries.append(f'        {key!r}: {self.expression(field, name)},')
+        lines = ['def serialize(obj):', '    result = {', *entries, '    }']
+        if self.uses_fallback:
+            lines.append('    result = {key: value for key, value in result.items() '
+                         'if value is not _missing}')
+        lines.append('    return result')
+        source = '\n'.join(lines) + '\n'
+        code = compile(source, f'<serializer {type(self.schema).__name__}>', 'exec')
+        exec(code, self.namespace)
+        serialize = self.namespace['serialize']
+        serialize.source = source
+        return serialize
+
+
+def compiled_serializer(schema):
+    """The generated ``serialize(obj)`` for ``schema`` (ignoring ``many``),
+    built on first use and kept on the schema instance."""
+    serialize = schema.__dict__.get('_compiled_serializer')
+    if serialize is None:
+        serialize = schema._compiled_serializer = _Compiler(schema).compile()
+    return serialize
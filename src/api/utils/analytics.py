@@ -0,0 +1,257 @@
+"""Daily/weekly/monthly purchase and receipt totals, read from rollups.
+
+Purchases come from ``goods_cost_daily`` (maintained by invoice writes, see
+material_costs) and receipts from ``receipt_daily`` (maintained by receipt
+writes, see stock_ledger); both hold one row per key and day, so a bucket
+is a GROUP BY over at most a few rows per key and day in the range.
+``backfill_rollups()`` rebuilds both from the documents, a date window at
+a time, and then the ``goods_costs`` totals from ``goods_cost_daily``.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import func, select, delete, insert, case
+from src.api.utils.database import db
+from src.api.utils.material_costs import rebuild_cost_totals
+from src.api.models import Goods, GoodsCostDaily, Invoice, InvoiceGoods, Receipt, ReceiptRawMaterial, ReceiptDaily
+
+BUCKETS = ('day', 'week', 'month')
+DEFAULT_BACKFILL_CHUNK_DAYS = 31
+QUANTITY_PLACES = Decimal('0.001')
+
+
+def _to_quantity(value):
+    return Decimal(str(value or 0)).quantize(QUANTITY_PLACES)
+
+
+def _dialect_name(model):
+    return db.session.get_bind(mapper=model.__mapper__).dialect.name
+
+
+def bucket_start(column, bucket, dialect_name):
+    """SQL expression for the first day of the ``bucket`` holding ``column``
+    (weeks start on Monday)."""
+    if bucket == 'day':
+        return column
+    if dialect_name == 'sqlite':
+        if bucket == 'week':
+            return func.date(column, func.printf('-%d days', (func.strftime('%w', column) + 6) % 7))
+        return func.strftime('%Y-%m-01', column)
+    if dialect_name in ('mysql', 'mariadb'):
+        if bucket == 'week':
+            return func.subdate(column, func.weekday(column))
+        return func.date_format(column, '%Y-%m-01')
+    return func.date_trunc(bucket, column)
+
+
+def _bucket_label(value):
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+def _date_window(column, date_from, date_to):
+    criteria = []
+    if date_from is not None:
+        criteria.append(column >= date_from)
+    if date_to is not None:
+        criteria.append(column <= date_to)
+    return criteria
+
+
+def purchase_totals(bucket, date_from=None, date_to=None, material_code=None, supplier_id=None):
+    """Invoiced base-unit quantity and cost per bucket and ``material_code``."""
+    start = bucket_start(GoodsCostDaily.day, bucket, _dialect_name(GoodsCostDaily)).label('bucket')
+    statement = (
+        select(
+            start,
+            Goods.material_code,
+            func.sum(GoodsCostDaily.buy_quantity * Goods.convert_rate),
+            func.sum(GoodsCostDaily.total_cost),
+            func.sum(GoodsCostDaily.line_count)
+        )
+        .join(Goods, Goods.id == GoodsCostDaily.goods_id)
+        .where(*_date_window(GoodsCostDaily.day, date_from, date_to))
+        .group_by(start, Goods.material_code)
+        .order_by(start, Goods.material_code)
+    )
+    if material_code is not None:
+        statement = statement.where(Goods.material_code == material_code)
+    if supplier_id is not None:
+        statement = statement.where(Goods.supplier_id == supplier_id)
+    return [
+        {
+            'bucket': _bucket_label(bucket_value),
+            'material_code': code,
+            'quantity': str(_to_quantity(quantity)),
+            'total_cost': str(_to_quantity(total_cost)),
+            'line_count': int(line_count or 0),
+        }
+        for bucket_value, code, quantity, total_cost, line_count in db.session.execute(statement)
+    ]
+
+
+def receipt_totals(bucket, date_from=None, date_to=None, stock_id=None, raw_material_id=None):
+    """Received quantity per bucket, ``stock_id`` and ``raw_material_id``."""
+    start = bucket_start(ReceiptDaily.day, bucket, _dialect_name(ReceiptDaily)).label('bucket')
+    statement = (
+        select(
+            start,
+            ReceiptDaily.stock_id,
+            ReceiptDaily.raw_material_id,
+            func.sum(ReceiptDaily.quantity),
+            func.sum(ReceiptDaily.line_count)
+        )
+        .where(*_date_window(ReceiptDaily.day, date_from, date_to))
+        .group_by(start, ReceiptDaily.stock_id, ReceiptDaily.raw_material_id)
+        .order_by(start, ReceiptDaily.stock_id, ReceiptDaily.raw_material_id)
+    )
+    if stock_id is not None:
+        statement = statement.where(ReceiptDaily.stock_id == stock_id)
+    if raw_material_id is not None:
+        statement = statement.where(ReceiptDaily.raw_material_id == raw_material_id)
+    return [
+        {
+            'bucket': _bucket_label(bucket_value),
+            'stock_id': row_stock_id,
+            'raw_material_id': row_raw_material_id,
+            'quantity': str(_to_quantity(quantity)),
+            'line_count': int(line_count or 0),
+        }
+        for bucket_value, row_stock_id, row_raw_material_id, quantity, line_count
+        in db.session.execute(statement)
+    ]
+
+
+def compute_purchase_daily(date_from=None, date_to=None):
+    """``goods_cost_daily`` rows recomputed from the invoice lines."""
+    rows = db.session.execute(
+        select(
+            InvoiceGoods.goods_id,
+            Invoice.created_date,
+            func.sum(InvoiceGoods.buy_quantity),
+            func.sum(InvoiceGoods.buy_quantity * InvoiceGoods.buying_price_per_unit),
+            func.sum(InvoiceGoods.buying_price_per_unit),
+            func.count(InvoiceGoods.id)
+        )
+        .join(Invoice, Invoice.id == InvoiceGoods.invoice_id)
+        .where(*_date_window(Invoice.created_date, date_from, date_to))
+        .group_by(InvoiceGoods.goods_id, Invoice.created_date)
+    )
+    return [
+        {'goods_id': goods_id, 'day': day, 'buy_quantity': _to_quantity(quantity),
+         'total_cost': _to_quantity(total_cost), 'price_sum': Decimal(str(price_sum or 0)),
+         'line_count': line_count}
+        for goods_id, day, quantity, total_cost, price_sum, line_count in rows
+    ]
+
+
+def compute_receipt_daily(date_from=None, date_to=None):
+    """``receipt_daily`` rows recomputed from the receipt lines."""
+    rows = db.session.execute(
+        select(
+            Receipt.stock_id,
+            ReceiptRawMaterial.raw_material_id,
+            Receipt.created_date,
+            func.sum(ReceiptRawMaterial.quantity),
+            func.count(ReceiptRawMaterial.id),
+            func.sum(case((ReceiptRawMaterial.quantity < 0, -ReceiptRawMaterial.quantity), else_=0))
+        )
+        .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
+        .where(*_date_window(Receipt.created_date, date_from, date_to))
+        .group_by(Receipt.stock_id, ReceiptRawMaterial.raw_material_id, Receipt.created_date)
+    )
+    return [
+        {'stock_id': stock_id, 'raw_material_id': raw_material_id, 'day': day,
+         'quantity': _to_quantity(quantity), 'line_count': line_count,
+         'issued_quantity': _to_quantity(issued_quantity)}
+        for stock_id, raw_material_id, day, quantity, line_count, issued_quantity in rows
+    ]
+
+
+# Rollup model, its recompute function, the document date it follows, and
+# the quantity columns verify_rollups() compares.
+ROLLUPS = (
+    (GoodsCostDaily, compute_purchase_daily, Invoice.created_date, ('buy_quantity',)),
+    (ReceiptDaily, compute_receipt_daily, Receipt.created_date, ('quantity', 'issued_quantity')),
+)
+
+
+def _day_range(model, document_date):
+    days = [
+        value
+        for column in (model.day, document_date)
+        for value in db.session.execute(select(func.min(column), func.max(column))).one()
+        if value is not None
+    ]
+    return (min(days), max(days)) if days else (None, None)
+
+
+def backfill_rollups(date_from=None, date_to=None, chunk_days=DEFAULT_BACKFILL_CHUNK_DAYS, models=None):
+    """Rebuild the daily rollups (all, or only those of ``models``) from the
+    documents, ``chunk_days`` at a time (one transaction each); return
+    ``{table: rows written}``.
+
+    Each window first locks its documents, so writes dated in the window
+    wait for its commit instead of racing the recompute; a rebuilt
+    ``goods_cost_daily`` is then summed into ``goods_costs``.
+    """
+    written = {}
+    for model, compute, document_date, _ in ROLLUPS:
+        if models is not None and model not in models:
+            continue
+        first_day, last_day = _day_range(model, document_date)
+        first_day = date_from or first_day
+        last_day = date_to or last_day
+        count = 0
+        window_start = first_day
+        while window_start is not None and window_start <= last_day:
+            window_end = min(window_start + timedelta(days=chunk_days - 1), last_day)
+            try:
+                db.session.execute(
+                    select(document_date.class_.id)
+                    .where(*_date_window(document_date, window_start, window_end))
+                    .with_for_update()
+                ).all()
+                db.session.execute(
+                    delete(model)
+                    .where(model.day >= window_start, model.day <= window_end)
+                    .execution_options(synchronize_session=False))
+                rows = compute(window_start, window_end)
+                if rows:
+                    db.session.execute(insert(model), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            count += len(rows)
+            window_start = window_end + timedelta(days=1)
+        written[model.__tablename__] = count
+        if model is GoodsCostDaily:
+            written['goods_costs'] = rebuild_cost_totals()
+    return written
+
+
+def backfill_receipt_daily():
+    """Rebuild ``receipt_daily`` alone (goods_cost_daily is rebuilt with the
+    cost totals, see material_costs)."""
+    return backfill_rollups(models=(ReceiptDaily,))
+
+
+def verify_rollups():
+    """Return ``{(table, key): (expected, stored)}`` for drifted rollup rows."""
+    mismatches = {}
+    for model, compute, _, value_columns in ROLLUPS:
+        key_columns = [column.name for column in model.__table__.columns
+                       if column.name in ('goods_id', 'stock_id', 'raw_material_id', 'day')]
+        expected = {
+            tuple(row[name] for name in key_columns):
+                tuple(row[name] for name in value_columns) + (row['line_count'],)
+            for row in compute()
+        }
+        stored = {
+            tuple(getattr(row, name) for name in key_columns):
+                tuple(_to_quantity(getattr(row, name)) for name in value_columns) + (row.line_count,)
+            for row in db.session.execute(select(model)).scalars()
+        }
+        for key in expected.keys() | stored.keys():
+            if expected.get(key) != stored.get(key):
+                mismatches[(model.__tablename__, key)] = (expected.get(key), stored.get(key))
+    return mismatches
@@ -0,0 +1,365 @@
+from collections import namedtuple
+from functools import lru_cache
+from itertools import groupby
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import insert
+from src.api.utils.database import db
+from src.api.utils.responses import response_with
+from src.api.utils import responses as resp
+
+BULK_MODES = ('atomic', 'partial')
+DEFAULT_BULK_CHUNK_SIZE = 1000
+
+
+@lru_cache(maxsize=None)
+def _loader_schema(schema_cls):
+    # Plain dicts are enough for a bulk INSERT; skip building ORM instances.
+    return schema_cls(many=True, load_instance=False)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _validate(schema_cls, model, rows_data):
+    """Validate the whole batch in one ``load`` call.
+
+    Returns ``(valid, errors)`` where ``valid`` is a list of
+    ``(index, column_values)`` and ``errors`` maps input index to messages.
+    """
+    schema = _loader_schema(schema_cls)
+    errors = {}
+    indices = list(range(len(rows_data)))
+    try:
+        loaded = schema.load(rows_data)
+    except ValidationError as err:
+        errors = err.messages if isinstance(err.messages, dict) else {
+            '_schema': err.messages}
+        indices = [index for index in indices if index not in errors]
+        loaded = schema.load([rows_data[index]
+                             for index in indices]) if indices else []
+
+    column_keys = set(model.__table__.columns.keys())
+    valid = [
+        (index, {key: value for key, value in row.items() if key in column_keys})
+        for index, row in zip(indices, loaded)
+    ]
+    return valid, errors
+
+
+def _insert_rows(model, rows):
+    if not rows:
+        return []
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        return list(db.session.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows
+        ))
+    # MySQL has no INSERT ... RETURNING. One multi-row INSERT per run of
+    # rows with the same columns; InnoDB gives the rows of such a "simple
+    # insert" consecutive keys (auto_increment_increment apart) starting
+    # at the statement's LAST_INSERT_ID().
+    step = _auto_increment_step(model)
+    ids = []
+    for _, run in groupby(rows, key=lambda row: tuple(row)):
+        run = list(run)
+        first_id = db.session.execute(insert(model).values(run)).lastrowid
+        ids.extend(range(first_id, first_id + step * len(run), step))
+    return ids
+
+
+def _auto_increment_step(model):
+    connection = db.session.connection(bind_arguments={'mapper': model.__mapper__})
+    # Kept on the pooled DBAPI connection, so it is read once per connection.
+    if 'auto_increment_increment' not in connection.info:
+        connection.info['auto_increment_increment'] = connection.exec_driver_sql(
+            'SELECT @@auto_increment_increment').scalar()
+    return connection.info['auto_increment_increment']
+
+
+def _insert_partial(model, chunk, ids, errors):
+    try:
+        with db.session.begin_nested():
+            chunk_ids = _insert_rows(model, [row for _, row in chunk])
+    except Exception:
+        # Narrow the failing chunk down to the offending rows.
+        for index, row in chunk:
+            try:
+                with db.session.begin_nested():
+                    ids[index] = _insert_rows(model, [row])[0]
+            except Exception as e:
+                errors[index] = {'_database': [str(e.__cause__ or e)]}
+        return
+    for (index, _), new_id in zip(chunk, chunk_ids):
+        ids[index] = new_id
+
+
+def bulk_create(model, schema_cls, rows_data, mode='atomic'):
+    """Validate and insert ``rows_data`` in one transaction.
+
+    ``atomic`` inserts nothing if any row is invalid or rejected by the
+    database; ``partial`` inserts every row it can and reports the rest.
+    Returns ``(ids, errors)``: ``ids`` is aligned with ``rows_data`` (None
+    for rows that were not inserted), ``errors`` is keyed by input index.
+    """
+    valid, errors = _validate(schema_cls, model, rows_data)
+    ids = [None] * len(rows_data)
+    if errors and mode == 'atomic':
+        return ids, errors
+
+    chunk_size = current_app.config.get(
+        'BULK_CHUNK_SIZE', DEFAULT_BULK_CHUNK_SIZE)
+    try:
+        for chunk in _chunks(valid, chunk_size):
+            if mode == 'partial':
+                _insert_partial(model, chunk, ids, errors)
+                continue
+            chunk_ids = _insert_rows(model, [row for _, row in chunk])
+            for (index, _), new_id in zip(chunk, chunk_ids):
+                ids[index] = new_id
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return [None] * len(rows_data), {'_database': [str(e.__cause__ or e)]}
+    return ids, errors
+
+
+def bulk_create_response(model, schema_cls, rows_data, mode):
+    if mode not in BULK_MODES:
+        return response_with(resp.INVALID_INPUT_422,
+                             message=f"Unknown bulk mode '{mode}', expected one of {', '.join(BULK_MODES)}")
+
+    ids, errors = bulk_create(model, schema_cls, rows_data, mode)
+    inserted = sum(1 for new_id in ids if new_id is not None)
+    if errors and inserted == 0:
+        return response_with(resp.INVALID_INPUT_422, value={'ids': ids},
+                             message="Bulk creation error", error=errors)
+    return response_with(resp.SUCCESS_201, value={'ids': ids, 'inserted': inserted},
+                         error=errors or None)
+
+
+@lru_cache(maxsize=None)
+def _partial_loader_schema(schema_cls):
+    return schema_cls(many=True, load_instance=False, partial=True)
+
+
+def _existing_ids(model, ids):
+    found = set()
+    chunk_size = current_app.config.get(
+        'BULK_CHUNK_SIZE', DEFAULT_BULK_CHUNK_SIZE)
+    for chunk in _chunks(list(ids), chunk_size):
+        found.update(db.session.scalars(
+            db.select(model.id).where(model.id.in_(chunk))))
+    return found
+
+
+def bulk_update(model, schema_cls, items):
+    """Apply partial updates to many rows of ``model`` at once.
+
+    Looks up every targeted id with ``WHERE id IN (...)``, validates the
+    whole list in one ``load`` call and writes it with a single ORM bulk
+    UPDATE (executemany keyed on the primary key).
+    Returns ``(ids, errors, missing_ids)``; nothing is written unless both
+    ``errors`` and ``missing_ids`` are empty.
+    """
+    errors = {}
+    ids = []
+    for index, item in enumerate(items):
+        try:
+            ids.append(int(item['id']))
+        except (TypeError, KeyError, ValueError):
+            errors[index] = {'id': ['Missing or invalid id.']}
+            ids.append(None)
+    if errors:
+        return ids, errors, []
+
+    existing = _existing_ids(model, set(ids))
+    missing_ids = sorted(set(ids) - existing)
+    if missing_ids:
+        return ids, errors, missing_ids
+
+    try:
+        loaded = _partial_loader_schema(schema_cls).load(items)
+    except ValidationError as err:
+        return ids, err.messages, []
+
+    column_keys = set(model.__table__.columns.keys()) - {'id'}
+    rows = []
+    for row_id, row in zip(ids, loaded):
+        values = {key: value for key,
+                  value in row.items() if key in column_keys}
+        if values:
+            rows.append({'id': row_id, **values})
+
+    try:
+        if rows:
+            db.session.execute(db.update(model), rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return ids, {'_database': [str(e.__cause__ or e)]}, []
+    return ids, {}, []
+
+
+def bulk_update_response(model, schema_cls, output_schema, items, label):
+    ids, errors, missing_ids = bulk_update(model, schema_cls, items)
+    if missing_ids:
+        return response_with(resp.SERVER_ERROR_404,
+                             message=f"{label} with id(s) {', '.join(map(str, missing_ids))} not found, aborting bulk update.",
+                             error={'missing_ids': missing_ids})
+    if errors:
+        return response_with(resp.INVALID_INPUT_422, message="Bulk update error", error=errors)
+
+    return dump_reloaded(model, output_schema, ids), 200
+
+
+def dump_reloaded(model, output_schema, ids):
+    """Dump the rows ``ids``, in that order, reloaded with the schema's eager
+    loads, so the relationships cost one query each rather than one per row."""
+    reloaded = {
+        instance.id: instance
+        for instance in db.session.scalars(
+            db.select(model)
+            .where(model.id.in_(set(ids)))
+            .options(*output_schema.loader_options())
+            .execution_options(populate_existing=True)
+        )
+    }
+    return output_schema.dump([reloaded[row_id] for row_id in ids])
+
+
+DocumentBatch = namedtuple('DocumentBatch', [
+    'header_model', 'header_schema', 'header_key',
+    'line_model', 'line_schema', 'lines_key', 'parent_key',
+    'apply_documents', 'required_header_fields',
+])
+DEFAULT_BATCH_CHUNK_SIZE = 200
+DEFAULT_MAX_BATCH_DOCUMENTS = 2000
+
+
+def _validate_documents(batch, documents):
+    """Validate every header and line of the batch with one ``load`` call
+    each. Returns ``(valid, errors)``: ``valid`` is a list of
+    ``(index, header_row, line_rows)``, ``errors`` is keyed by document."""
+    errors = {}
+    headers = []
+    lines = []
+    for index, document in enumerate(documents):
+        header = document.get(batch.header_key) if isinstance(document, dict) else None
+        document_lines = document.get(batch.lines_key) if isinstance(document, dict) else None
+        if not header or not document_lines or not isinstance(document_lines, list):
+            errors[index] = {'_schema': [
+                f"Missing '{batch.header_key}' or '{batch.lines_key}' data."]}
+            continue
+        headers.append((index, header))
+        lines.extend((index, position, line) for position, line in enumerate(document_lines))
+
+    valid_headers, header_errors = _validate(
+        batch.header_schema, batch.header_model, [header for _, header in headers])
+    for position, messages in header_errors.items():
+        errors.setdefault(headers[position][0], {})[batch.header_key] = messages
+    for position, row in valid_headers:
+        missing = {name: ['Missing data for required field.']
+                   for name in batch.required_header_fields if row.get(name) is None}
+        if missing:
+            errors.setdefault(headers[position][0], {})[batch.header_key] = missing
+
+    valid_lines, line_errors = _validate(
+        batch.line_schema, batch.line_model, [line for _, _, line in lines])
+    for position, messages in line_errors.items():
+        index, line_position, _ = lines[position]
+        errors.setdefault(index, {}).setdefault(batch.lines_key, {})[line_position] = messages
+
+    rows_by_document = {}
+    for position, row in valid_lines:
+        rows_by_document.setdefault(lines[position][0], []).append(row)
+    valid = [
+        (headers[position][0], row, rows_by_document.get(headers[position][0], []))
+        for position, row in valid_headers
+        if headers[position][0] not in errors
+    ]
+    return valid, errors
+
+
+def _insert_documents(batch, chunk):
+    """Multi-row INSERT of the headers, then of all their lines."""
+    header_ids = _insert_rows(batch.header_model, [header for _, header, _ in chunk])
+    line_rows = [
+        {**line, batch.parent_key: header_id}
+        for (_, _, document_lines), header_id in zip(chunk, header_ids)
+        for line in document_lines
+    ]
+    if line_rows:
+        db.session.execute(insert(batch.line_model), line_rows)
+    return header_ids
+
+
+def batch_create(batch, documents, mode='atomic'):
+    """Validate and insert header+lines documents in one transaction.
+
+    Every document is validated before anything is written. Documents are
+    then inserted ``BATCH_CHUNK_SIZE`` at a time, headers and lines each
+    with one multi-row INSERT, and ``batch.apply_documents`` folds the
+    inserted ones into the ledgers before the single commit. ``atomic`` and
+    ``partial`` behave as in ``bulk_create``; a document is always written
+    whole or not at all. Returns ``(ids, errors)`` aligned with and keyed
+    by the input documents.
+    """
+    valid, errors = _validate_documents(batch, documents)
+    ids = [None] * len(documents)
+    if errors and mode == 'atomic':
+        return ids, errors
+
+    chunk_size = current_app.config.get('BATCH_CHUNK_SIZE', DEFAULT_BATCH_CHUNK_SIZE)
+    inserted = []
+    try:
+        for chunk in _chunks(valid, chunk_size):
+            if mode == 'partial':
+                try:
+                    with db.session.begin_nested():
+                        chunk_ids = _insert_documents(batch, chunk)
+                except Exception:
+                    # Narrow the failing chunk down to the offending documents.
+                    chunk_ids = []
+                    for document in chunk:
+                        try:
+                            with db.session.begin_nested():
+                                chunk_ids.extend(_insert_documents(batch, [document]))
+                        except Exception as e:
+                            chunk_ids.append(None)
+                            errors[document[0]] = {'_database': [str(e.__cause__ or e)]}
+            else:
+                chunk_ids = _insert_documents(batch, chunk)
+            for (index, header, document_lines), new_id in zip(chunk, chunk_ids):
+                if new_id is not None:
+                    ids[index] = new_id
+                    inserted.append((header, document_lines))
+        batch.apply_documents(inserted)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return [None] * len(documents), {'_database': [str(e.__cause__ or e)]}
+    return ids, errors
+
+
+def batch_create_response(batch, documents, mode):
+    if mode not in BULK_MODES:
+        return response_with(resp.INVALID_INPUT_422,
+                             message=f"Unknown batch mode '{mode}', expected one of {', '.join(BULK_MODES)}")
+    if not isinstance(documents, list) or not documents:
+        return response_with(resp.INVALID_INPUT_422, message="Expected a non-empty list of documents")
+    max_documents = current_app.config.get('MAX_BATCH_DOCUMENTS', DEFAULT_MAX_BATCH_DOCUMENTS)
+    if len(documents) > max_documents:
+        return response_with(resp.INVALID_INPUT_422,
+                             message=f"A batch holds at most {max_documents} documents")
+
+    ids, errors = batch_create(batch, documents, mode)
+    inserted = sum(1 for new_id in ids if new_id is not None)
+    if errors and inserted == 0:
+        return response_with(resp.INVALID_INPUT_422, value={'ids': ids},
+                             message="Batch creation error", error=errors)
+    return response_with(resp.SUCCESS_201, value={'ids': ids, 'inserted': inserted},
+                         error=errors or None)
@@ -0,0 +1,184 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, current_app, Response
+
+# Response headers stored and replayed with the body (the next page link).
+CACHED_HEADERS = ('Link',)
+
+
+class NullCacheBackend(object):
+    shared = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+
+class LRUCacheBackend(object):
+    """In-process LRU with per-entry TTL; each worker process holds its own
+    entries."""
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SharedCacheBackend(object):
+    """Backend over a Redis-like client exposing ``get``/``setex``, shared by
+    every worker.
+
+    Any object with that interface works, which lets tests pass in a local
+    stand-in instead of a real server.
+    """
+    shared = True
+
+    def __init__(self, client, prefix='connect_bakery:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "CACHE_BACKEND='redis' requires the 'redis' package to be installed")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + key, ttl, value)
+
+
+class ResponseCache(object):
+    def __init__(self, app=None):
+        self.backend = NullCacheBackend()
+        self.default_ttl = 30
+        self.stats = {'hits': 0, 'misses': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, backend=None):
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 30)
+        if backend is not None:
+            self.backend = backend
+        else:
+            backend_name = app.config.get('CACHE_BACKEND', 'memory')
+            if backend_name == 'redis':
+                self.backend = SharedCacheBackend.from_url(
+                    app.config['CACHE_REDIS_URL'])
+            elif backend_name == 'memory':
+                self.backend = LRUCacheBackend(
+                    app.config.get('CACHE_MAX_ENTRIES', 1024))
+            else:
+                self.backend = NullCacheBackend()
+
+        if app.config.get('STATS_ENDPOINTS_ENABLED') or app.debug or app.testing:
+            app.add_url_rule('/api/cache/stats', 'cache_stats', self._stats_view)
+        app.extensions['response_cache'] = self
+
+    @property
+    def shared(self):
+        """Whether every worker sees the same entries."""
+        return self.backend.shared
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def cached(self, ttl=None):
+        """Cache successful responses of a GET view under the request's ETag
+        (see conditional.py).
+
+        The ETag hashes the full path, the ``Accept`` header and the
+        committed version of every table the blueprint's GETs read, so any
+        write to one of them, from a request, the CLI or a backfill, moves
+        the view to a new key; entries under the old one age out. Views
+        the ETag hook does not cover are not cached.
+
+        ``ttl`` may be a callable, evaluated each time a response is stored.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if 'etag' not in g:
+                    return view(*args, **kwargs)
+                key = f'view:{g.etag}'
+                try:
+                    hit = self.backend.get(key)
+                except Exception as e:
+                    self._count('errors')
+                    logging.warning(f"Cache lookup failed: {e}")
+                    return view(*args, **kwargs)
+
+                if hit is not None:
+                    self._count('hits')
+                    # Stored as the 3-digit status code, the CACHED_HEADERS
+                    # as a JSON line, then the body.
+                    headers, body = hit[3:].split(b'\n', 1)
+                    response = Response(body, status=int(hit[:3]),
+                                        headers=json.loads(headers),
+                                        mimetype='application/json')
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count('misses')
+                response = current_app.make_response(view(*args, **kwargs))
+                if 200 <= response.status_code < 300 and not response.is_streamed:
+                    try:
+                        headers = {name: response.headers[name]
+                                   for name in CACHED_HEADERS if name in response.headers}
+                        self.backend.set(
+                            key,
+                            str(response.status_code).encode() + json.dumps(headers).encode()
+                            + b'\n' + response.get_data(),
+                            (ttl() if callable(ttl) else ttl) or self.default_ttl
+                        )
+                    except Exception as e:
+                        self._count('errors')
+                        logging.warning(f"Cache store failed: {e}")
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def stats_snapshot(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _stats_view(self):
+        return self.stats_snapshot(), 200
+
+
+response_cache = ResponseCache()
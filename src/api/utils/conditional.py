@@ -0,0 +1,82 @@
+import hashlib
+from datetime import date, datetime, time
+from flask import request, g, current_app, make_response
+from src.api.utils.table_versions import get_table_versions
+
+# Tables whose content can show up in any GET served by each blueprint.
+BLUEPRINT_TABLES = {
+    'supplier_routes': ('suppliers', 'goods', 'invoices', 'invoices_goods'),
+    'goods_routes': ('goods', 'suppliers', 'invoices', 'invoices_goods'),
+    'invoice_routes': ('invoices', 'invoices_goods', 'goods', 'suppliers'),
+    'raw_material_routes': ('raw_materials', 'categories', 'receipts', 'receipt_raw_material',
+                            'stocks', 'stock_balances', 'goods', 'invoices', 'invoices_goods',
+                            'goods_costs', 'goods_cost_daily', 'receipt_daily'),
+    'stocks_routes': ('stocks', 'receipts', 'receipt_raw_material', 'raw_materials',
+                      'categories', 'stock_balances'),
+    'categories_routes': ('categories', 'raw_materials'),
+    'receipts_routes': ('receipts', 'receipt_raw_material', 'stocks', 'raw_materials',
+                        'categories'),
+    'analytics_routes': ('goods_cost_daily', 'goods', 'receipt_daily'),
+}
+
+# GETs that also change with the date (they cover "the last N days"), so a
+# copy validated yesterday is stale even if no table changed.
+DATED_ENDPOINTS = ('raw_material_routes.get_raw_material_forecast',)
+
+
+def _compute_validators(table_names):
+    versions = get_table_versions(table_names)
+    dated = request.endpoint in DATED_ENDPOINTS
+    fingerprint = '|'.join(
+        [current_app.config.get('ETAG_SALT', ''), request.full_path,
+         request.headers.get('Accept', '')]
+        + [f'{name}={versions[name][0]}' for name in sorted(versions)]
+        + ([date.today().isoformat()] if dated else [])
+    )
+    etag = hashlib.sha1(fingerprint.encode()).hexdigest()
+    modified = [updated_at for _, updated_at in versions.values()
+                if updated_at is not None]
+    if dated:
+        modified.append(datetime.combine(date.today(), time()))
+    return etag, max(modified) if modified else None
+
+
+def conditional_get_response():
+    """``before_request`` hook: answer 304 from the table versions alone,
+    before the view runs any query or schema dump."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    table_names = BLUEPRINT_TABLES.get(request.blueprint)
+    if not table_names:
+        return None
+
+    etag, last_modified = _compute_validators(table_names)
+    g.etag = etag
+    g.last_modified = last_modified
+
+    not_modified = False
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified is not None:
+        not_modified = last_modified <= request.if_modified_since.replace(
+            tzinfo=None)
+
+    if not_modified:
+        response = make_response('', 304)
+        _set_validators(response)
+        return response
+    return None
+
+
+def _set_validators(response):
+    response.set_etag(g.etag)
+    if g.last_modified is not None:
+        response.last_modified = g.last_modified
+    response.vary.add('Accept')
+
+
+def add_validators(response):
+    """``after_request`` hook: attach ETag/Last-Modified to successful GETs."""
+    if 'etag' in g and 200 <= response.status_code < 300 and 'ETag' not in response.headers:
+        _set_validators(response)
+    return response
@@ -0,0 +1,76 @@
+from sqlalchemy import update, delete, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from src.api.utils.database import db
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE.
+ON_CONFLICT_DIALECTS = {
+    'sqlite': sqlite,
+    'postgresql': postgresql,
+}
+
+
+def _upsert(model, keys, deltas, values, dialect_name):
+    """The dialect's single-statement upsert, or None when it has none."""
+    table = model.__table__
+    row = {**keys, **deltas, **values}
+    if dialect_name in ('mysql', 'mariadb'):
+        statement = mysql.insert(table).values(row)
+        new = statement.inserted
+        return statement.on_duplicate_key_update(
+            {**{name: table.c[name] + new[name] for name in deltas},
+             **{name: new[name] for name in values}})
+    if dialect_name in ON_CONFLICT_DIALECTS:
+        statement = ON_CONFLICT_DIALECTS[dialect_name].insert(table).values(row)
+        new = statement.excluded
+        return statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={**{name: table.c[name] + new[name] for name in deltas},
+                  **{name: new[name] for name in values}})
+    return None
+
+
+def increment_row(model, keys, deltas, values=None, connection=None):
+    """Add ``deltas`` to the row of ``model`` identified by ``keys`` (and set
+    ``values``), creating it when missing; through ``connection`` when given,
+    else in the session's transaction.
+
+    ``keys`` must be the columns of a unique constraint. The write is one
+    ``INSERT ... ON DUPLICATE KEY UPDATE col = col + delta`` (``ON CONFLICT``
+    on SQLite/PostgreSQL), so two writers creating the same row at once
+    both land, one as the insert and the other as the increment. Other
+    dialects insert inside a savepoint and fall back to the update when a
+    concurrent insert won.
+    """
+    values = values or {}
+    executor = connection if connection is not None else db.session
+    dialect_name = (connection.dialect.name if connection is not None
+                    else db.session.get_bind(mapper=model.__mapper__).dialect.name)
+    statement = _upsert(model, keys, deltas, values, dialect_name)
+    if statement is not None:
+        executor.execute(statement)
+        return
+
+    table = model.__table__
+    increment = (
+        update(table)
+        .where(*[table.c[name] == value for name, value in keys.items()])
+        .values({**{name: table.c[name] + delta for name, delta in deltas.items()}, **values})
+    )
+    if executor.execute(increment).rowcount:
+        return
+    try:
+        with executor.begin_nested():
+            executor.execute(insert(table).values({**keys, **deltas, **values}))
+    except IntegrityError:
+        executor.execute(increment)
+
+
+def delete_empty_rows(model, *criteria):
+    """Drop rows whose ``line_count`` fell to zero."""
+    db.session.flush()
+    db.session.execute(
+        delete(model)
+        .where(model.line_count <= 0, *criteria)
+        .execution_options(synchronize_session=False)
+    )
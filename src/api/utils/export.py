@@ -0,0 +1,51 @@
+from flask import Response, request, current_app, stream_with_context
+from src.api.utils.database import db
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+DEFAULT_EXPORT_CHUNK_SIZE = 500
+
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(
+        ['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def stream_ndjson(model, stmt, schema):
+    """Stream ``stmt`` (ordered by ``model.id``) as one JSON document per line.
+
+    Rows are read in keyset batches of ``EXPORT_CHUNK_SIZE`` (``id > last``),
+    so the schema's eager-load plan still applies per batch; each batch is
+    dumped, written out and dropped from the session, keeping memory flat
+    however many rows match.
+    """
+    chunk_size = current_app.config.get(
+        'EXPORT_CHUNK_SIZE', DEFAULT_EXPORT_CHUNK_SIZE)
+    dumps = current_app.json.dumps
+
+    def generate():
+        last_id = None
+        while True:
+            batch_stmt = stmt if last_id is None else stmt.where(
+                model.id > last_id)
+            rows = db.session.execute(
+                batch_stmt.limit(chunk_size)).scalars().all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            yield ''.join(dumps(row) + '\n' for row in schema.serialize(rows))
+            db.session.expunge_all()
+            if len(rows) < chunk_size:
+                break
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def stream_ndjson_records(records):
+    """Stream an iterable of plain dicts as NDJSON, pulling it lazily."""
+    dumps = current_app.json.dumps
+
+    def generate():
+        for record in records:
+            yield dumps(record) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,149 @@
+"""Days of cover and reorder suggestions for every raw material at once.
+
+Daily usage is ``receipt_daily.issued_quantity`` (what negative receipt
+lines took out) over the ``window_days`` before today, laid out as one
+materials x days array. Averages, deviations and the reorder figures are
+whole-array NumPy operations, so the cost follows the rollup rows read
+in the window, not the history kept (benchmarks/forecast.py).
+"""
+from datetime import date, timedelta
+from sqlalchemy import func, select, cast, Float, Integer
+from src.api.utils.database import db
+from src.api.models import RawMaterial, StockBalance, ReceiptDaily
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_WINDOW_DAYS = 28
+MAX_WINDOW_DAYS = 365
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_COVER_DAYS = 14
+MAX_PLANNING_DAYS = 366
+# Safety stock in standard deviations of lead-time usage (~95% service level).
+SAFETY_FACTOR = 1.65
+
+
+def _scatter(material_ids, row_material_ids, values):
+    """Sum ``values`` into an array aligned with the sorted ``material_ids``."""
+    totals = np.zeros(len(material_ids))
+    if len(row_material_ids):
+        np.add.at(totals, np.searchsorted(material_ids, row_material_ids), values)
+    return totals
+
+
+def _day_index(column, first_day, dialect_name):
+    """SQL expression for the whole days from ``first_day`` to ``column``."""
+    if dialect_name == 'sqlite':
+        return cast(func.julianday(column) - func.julianday(first_day), Integer)
+    if dialect_name in ('mysql', 'mariadb'):
+        return func.datediff(column, first_day)
+    return column - first_day
+
+
+def _usage_matrix(material_ids, first_day, window_days, stock_id):
+    # Read through the connection: plain tuples, without the ORM result layer.
+    connection = db.session.connection(bind_arguments={'mapper': ReceiptDaily.__mapper__})
+    statement = (
+        select(ReceiptDaily.raw_material_id,
+               _day_index(ReceiptDaily.day, first_day, connection.dialect.name),
+               ReceiptDaily.issued_quantity.cast(Float))
+        .where(ReceiptDaily.day >= first_day,
+               ReceiptDaily.day < first_day + timedelta(days=window_days),
+               ReceiptDaily.issued_quantity > 0)
+    )
+    if stock_id is not None:
+        statement = statement.where(ReceiptDaily.stock_id == stock_id)
+    rows = connection.execute(statement).all()
+    if not rows:
+        return np.zeros((len(material_ids), window_days))
+    row_material_ids, day_index, quantities = (np.array(values) for values in zip(*rows))
+    cell = np.searchsorted(material_ids, row_material_ids) * window_days + day_index
+    # Several stocks share a material/day cell; bincount adds them up.
+    return np.bincount(cell, weights=quantities, minlength=len(material_ids) * window_days) \
+        .reshape(len(material_ids), window_days)
+
+
+def _on_hand(material_ids, stock_id):
+    statement = (
+        select(StockBalance.raw_material_id, func.sum(StockBalance.quantity.cast(Float)))
+        .group_by(StockBalance.raw_material_id)
+    )
+    if stock_id is not None:
+        statement = statement.where(StockBalance.stock_id == stock_id)
+    rows = db.session.execute(statement).all()
+    row_material_ids, quantities = zip(*rows) if rows else ((), ())
+    return _scatter(material_ids, np.array(row_material_ids, dtype=np.int64),
+                    np.array(quantities, dtype=float))
+
+
+def _rounded(values, places=3):
+    # Adding 0.0 turns -0.0 into 0.0.
+    return (np.round(values, places) + 0.0).tolist()
+
+
+def material_forecast(window_days=DEFAULT_WINDOW_DAYS, lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                      cover_days=DEFAULT_COVER_DAYS, stock_id=None, today=None):
+    """One row per raw material, those running out first at the top.
+
+    ``reorder_point`` is the usage expected over the lead time plus
+    ``SAFETY_FACTOR`` deviations of it; at or below it ``reorder`` is set
+    and ``suggested_quantity`` tops the stock up to the reorder point plus
+    ``cover_days`` of average usage.
+    """
+    if np is None:
+        raise RuntimeError("The raw material forecast requires the 'numpy' package to be installed")
+    today = today or date.today()
+    first_day = today - timedelta(days=window_days)
+
+    materials = db.session.execute(
+        select(RawMaterial.id, RawMaterial.code, RawMaterial.name, RawMaterial.default_unit)
+        .order_by(RawMaterial.id)
+    ).all()
+    if not materials:
+        return []
+    ids, codes, names, units = zip(*materials)
+    material_ids = np.array(ids, dtype=np.int64)
+
+    usage = _usage_matrix(material_ids, first_day, window_days, stock_id)
+    on_hand = _on_hand(material_ids, stock_id)
+
+    average = usage.mean(axis=1)
+    deviation = usage.std(axis=1)
+    recent = usage[:, -min(7, window_days):].mean(axis=1)
+    reorder_point = average * lead_time_days + SAFETY_FACTOR * deviation * np.sqrt(lead_time_days)
+    using = average > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(using, np.maximum(on_hand, 0) / average, np.inf)
+    reorder = using & (on_hand <= reorder_point)
+    suggested = np.where(reorder, np.maximum(reorder_point + average * cover_days - on_hand, 0), 0)
+    stockout_offset = np.floor(np.where(using, days_of_cover, 0)).astype(np.int64)
+
+    # Soonest stock-out first; materials without usage last, by id.
+    order = np.lexsort((material_ids, days_of_cover)).tolist()
+    columns = {
+        'on_hand': _rounded(on_hand),
+        'average_daily_usage': _rounded(average),
+        'recent_daily_usage': _rounded(recent),
+        'usage_deviation': _rounded(deviation),
+        'reorder_point': _rounded(reorder_point),
+        'suggested_quantity': _rounded(suggested),
+    }
+    cover = _rounded(np.where(using, days_of_cover, 0), 1)
+    using = using.tolist()
+    reorder = reorder.tolist()
+    stockout_offset = stockout_offset.tolist()
+    return [
+        {
+            'raw_material_id': ids[i],
+            'code': codes[i],
+            'name': names[i],
+            'default_unit': units[i],
+            **{name: str(values[i]) for name, values in columns.items()},
+            'days_of_cover': cover[i] if using[i] else None,
+            'stockout_date': (today + timedelta(days=stockout_offset[i])).isoformat() if using[i] else None,
+            'reorder': reorder[i],
+        }
+        for i in order
+    ]
@@ -0,0 +1,159 @@
+"""Replay-safe creates for invoices and receipts.
+
+A POST carrying an ``Idempotency-Key`` header, or sent with ``?dedupe=code``
+(keyed on the document code instead), is looked up before its line items
+are parsed. The first request to succeed stores its status and body in
+``idempotency_records`` in the same transaction as the document, so a
+retry gets those bytes back without touching the documents, the stock
+ledger or the cost rollups. Reusing a key with a different body is a 409.
+"""
+import hashlib
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from flask import current_app, request
+from sqlalchemy import select, delete
+from src.api.utils.database import db
+from src.api.utils import responses as resp
+from src.api.utils.responses import response_with, COMMON_HEADERS
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+DEFAULT_IDEMPOTENCY_TTL_HOURS = 24
+
+# ``natural_key`` maps header fields (read from the raw JSON) to the columns
+# that identify an existing document with the same code.
+IdempotentCreate = namedtuple(
+    'IdempotentCreate', 'scope record_model header_key natural_key')
+
+
+def fingerprint(json_data):
+    canonical = json.dumps(json_data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _cutoff():
+    hours = current_app.config.get('IDEMPOTENCY_TTL_HOURS', DEFAULT_IDEMPOTENCY_TTL_HOURS)
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+
+
+class IdempotencyClaim(object):
+    """What ``claim_idempotency`` found for one request.
+
+    ``response`` is set when the request must not run (a replay or a
+    conflict). Otherwise call ``save(rv)`` just before committing, and
+    ``replay()`` after a failed commit in case a concurrent request with
+    the same key won.
+    """
+
+    def __init__(self, spec, scope=None, key=None, fingerprint=None):
+        self.spec = spec
+        self.scope = scope
+        self.key = key
+        self.fingerprint = fingerprint
+        self.response = None
+
+    def _record(self):
+        model = self.spec.record_model
+        return db.session.execute(
+            select(model).where(model.scope == self.scope, model.key == self.key)
+        ).scalar_one_or_none()
+
+    def lookup(self):
+        """Set ``response`` from a stored result; True when one applies."""
+        record = self._record()
+        if record is None or record.created_at < _cutoff():
+            return False
+        if record.fingerprint != self.fingerprint:
+            self.response = response_with(
+                resp.CONFLICT_409,
+                message=f"Key '{self.key}' was already used for a different request")
+            return True
+        rv = current_app.response_class(
+            record.body, status=record.status_code, mimetype=current_app.json.mimetype)
+        rv.headers.update(COMMON_HEADERS)
+        rv.headers[REPLAYED_HEADER] = 'true'
+        self.response = rv
+        return True
+
+    def save(self, rv):
+        """Store ``rv`` under the key, in the caller's transaction."""
+        if self.key is None:
+            return
+        model = self.spec.record_model
+        # An expired record still holds the unique key.
+        db.session.execute(delete(model).where(
+            model.scope == self.scope, model.key == self.key, model.created_at < _cutoff()))
+        db.session.add(model(self.scope, self.key, self.fingerprint, rv.status_code,
+                             rv.get_data(), datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)))
+
+    def replay(self):
+        """The stored response after a lost race, or None."""
+        if self.key is None:
+            return None
+        self.lookup()
+        return self.response
+
+
+def _natural_key(spec, json_data):
+    header = json_data.get(spec.header_key) if isinstance(json_data, dict) else None
+    if not isinstance(header, dict):
+        return None
+    values = [header.get(field) for field in spec.natural_key]
+    if any(value is None or value == '' for value in values):
+        return None
+    return values
+
+
+def claim_idempotency(spec, json_data):
+    """Check ``Idempotency-Key`` / ``?dedupe=code`` for a create request."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is not None:
+        if not key or len(key) > MAX_KEY_LENGTH:
+            claim = IdempotencyClaim(spec)
+            claim.response = response_with(
+                resp.INVALID_INPUT_422,
+                message=f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+            return claim
+        claim = IdempotencyClaim(spec, spec.scope, key, fingerprint(json_data))
+        claim.lookup()
+        return claim
+
+    dedupe = request.args.get('dedupe')
+    if dedupe is None:
+        return IdempotencyClaim(spec)
+    if dedupe != 'code':
+        claim = IdempotencyClaim(spec)
+        claim.response = response_with(
+            resp.INVALID_INPUT_422, message=f"Unknown dedupe mode '{dedupe}'")
+        return claim
+
+    values = _natural_key(spec, json_data)
+    if values is None:
+        # Let validation report the missing code.
+        return IdempotencyClaim(spec)
+    claim = IdempotencyClaim(
+        spec, f'{spec.scope}.code', ':'.join(str(value) for value in values),
+        fingerprint(json_data))
+    if claim.lookup():
+        return claim
+    # Created without a stored result (before dedupe, or without it).
+    columns = list(spec.natural_key.values())
+    existing = db.session.execute(
+        select(columns[0].class_.id).where(
+            *[column == value for column, value in zip(columns, values)]).limit(1)
+    ).first()
+    if existing is not None:
+        claim.response = response_with(
+            resp.CONFLICT_409, value={'id': existing.id},
+            message=f"A document with code '{claim.key}' already exists")
+    return claim
+
+
+def prune_idempotency_records(record_model):
+    """Delete records older than ``IDEMPOTENCY_TTL_HOURS``; return how many."""
+    result = db.session.execute(
+        delete(record_model).where(record_model.created_at < _cutoff()))
+    db.session.commit()
+    return result.rowcount
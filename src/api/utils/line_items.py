@@ -0,0 +1,74 @@
+from collections import deque
+
+LINE_UPDATE_MODES = ('merge', 'replace')
+
+
+class LineMergeError(Exception):
+    pass
+
+
+def merge_line_items(collection, incoming_data, loaded_lines, match_attr, fields):
+    """Turn ``collection`` into the incoming list of lines with as few
+    statements as possible.
+
+    Incoming lines carrying an ``id`` update that line; the others are
+    matched to a remaining line with the same ``match_attr`` value (e.g.
+    ``goods_id``), and only then inserted. Existing lines left unmatched are
+    removed (delete-orphan). Only attributes listed in ``fields`` whose value
+    actually changed are written, so untouched lines cost nothing.
+    Returns a summary of what changed.
+    """
+    existing_by_id = {line.id: line for line in collection}
+    unmatched = dict(existing_by_id)
+    summary = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    pairs = []
+
+    # Explicit ids first, so a line matched by id is never claimed by key.
+    pending = []
+    for raw_line, loaded_line in zip(incoming_data, loaded_lines):
+        line_id = raw_line.get('id') if isinstance(raw_line, dict) else None
+        if line_id is None:
+            pending.append(loaded_line)
+            continue
+        try:
+            line_id = int(line_id)
+        except (TypeError, ValueError):
+            raise LineMergeError(f"Invalid line id {line_id!r}")
+        existing_line = unmatched.pop(line_id, None)
+        if existing_line is None:
+            if line_id in existing_by_id:
+                raise LineMergeError(f"Line with id {line_id} appears more than once")
+            raise LineMergeError(f"Line with id {line_id} does not belong to this document")
+        pairs.append((existing_line, loaded_line))
+
+    # Remaining lines by key, in collection order, so each lookup is O(1).
+    unmatched_by_key = {}
+    for line in unmatched.values():
+        unmatched_by_key.setdefault(getattr(line, match_attr), deque()).append(line)
+    for loaded_line in pending:
+        candidates = unmatched_by_key.get(getattr(loaded_line, match_attr))
+        if not candidates:
+            pairs.append((None, loaded_line))
+            continue
+        existing_line = candidates.popleft()
+        del unmatched[existing_line.id]
+        pairs.append((existing_line, loaded_line))
+
+    for existing_line, loaded_line in pairs:
+        if existing_line is None:
+            collection.append(loaded_line)
+            summary['inserted'] += 1
+            continue
+        changed = False
+        for field in fields:
+            new_value = getattr(loaded_line, field)
+            if getattr(existing_line, field) != new_value:
+                setattr(existing_line, field, new_value)
+                changed = True
+        summary['updated' if changed else 'unchanged'] += 1
+
+    for existing_line in unmatched.values():
+        collection.remove(existing_line)
+        summary['deleted'] += 1
+
+    return summary
@@ -0,0 +1,208 @@
+from collections import defaultdict
+from decimal import Decimal
+from types import SimpleNamespace
+from sqlalchemy import func, select, delete
+from src.api.utils.database import db
+from src.api.utils.counters import increment_row, delete_empty_rows
+from src.api.models import Goods, GoodsCost, GoodsCostDaily, Invoice, InvoiceGoods
+
+COST_FIELDS = ('buy_quantity', 'total_cost', 'price_sum', 'line_count')
+
+
+def _to_decimal(value):
+    return Decimal(str(value or 0))
+
+
+def _aggregate_lines(lines, sign=1, totals=None):
+    if totals is None:
+        totals = defaultdict(lambda: [Decimal('0'), Decimal('0'), Decimal('0'), 0])
+    for line in lines:
+        quantity = _to_decimal(line.buy_quantity)
+        price = _to_decimal(line.buying_price_per_unit)
+        entry = totals[line.goods_id]
+        entry[0] += quantity * sign
+        entry[1] += quantity * price * sign
+        entry[2] += price * sign
+        entry[3] += sign
+    return totals
+
+
+def _apply_totals(day, totals):
+    for goods_id, values in totals.items():
+        if not any(values):
+            continue
+        deltas = dict(zip(COST_FIELDS, values))
+        increment_row(GoodsCost, {'goods_id': goods_id}, deltas)
+        increment_row(GoodsCostDaily, {'goods_id': goods_id, 'day': day}, deltas)
+    goods_ids = list(totals)
+    if goods_ids:
+        delete_empty_rows(GoodsCost, GoodsCost.goods_id.in_(goods_ids))
+        delete_empty_rows(GoodsCostDaily, GoodsCostDaily.goods_id.in_(goods_ids),
+                          GoodsCostDaily.day == day)
+
+
+def apply_invoice_lines(invoice, lines, sign=1):
+    """Fold invoice lines into the goods cost totals, inside the caller's
+    transaction."""
+    _apply_totals(invoice.created_date, _aggregate_lines(lines, sign))
+
+
+def apply_invoice_documents(documents):
+    """Fold newly inserted invoices, given as ``(header, lines)`` column
+    dicts, into the cost totals with one update per day and goods."""
+    totals_by_day = {}
+    for header, lines in documents:
+        totals_by_day[header['created_date']] = _aggregate_lines(
+            (SimpleNamespace(**line) for line in lines), 1,
+            totals_by_day.get(header['created_date']))
+    for day, totals in totals_by_day.items():
+        _apply_totals(day, totals)
+
+
+def snapshot_invoice(invoice):
+    """Capture an invoice's contribution before it is edited in place."""
+    return invoice.created_date, _aggregate_lines(invoice.list_of_bought_goods)
+
+
+def apply_invoice_change(snapshot, invoice):
+    old_day, old_totals = snapshot
+    if old_day != invoice.created_date:
+        _apply_totals(old_day, {
+            goods_id: [-value for value in values]
+            for goods_id, values in old_totals.items()
+        })
+        apply_invoice_lines(invoice, invoice.list_of_bought_goods)
+        return
+
+    totals = _aggregate_lines(invoice.list_of_bought_goods)
+    for goods_id, values in old_totals.items():
+        totals[goods_id] = [new - old for new, old in zip(totals[goods_id], values)]
+    _apply_totals(invoice.created_date, totals)
+
+
+def compute_costs_from_invoices():
+    """Return ``{(goods_id, day): [buy_quantity, total_cost, price_sum, line_count]}``
+    recomputed from every invoice line."""
+    rows = db.session.execute(
+        select(
+            InvoiceGoods.goods_id,
+            Invoice.created_date,
+            func.sum(InvoiceGoods.buy_quantity),
+            func.sum(InvoiceGoods.buy_quantity * InvoiceGoods.buying_price_per_unit),
+            func.sum(InvoiceGoods.buying_price_per_unit),
+            func.count(InvoiceGoods.id)
+        )
+        .join(Invoice, Invoice.id == InvoiceGoods.invoice_id)
+        .group_by(InvoiceGoods.goods_id, Invoice.created_date)
+    ).all()
+    return {
+        (goods_id, day): [_to_decimal(quantity), _to_decimal(cost), _to_decimal(price_sum), line_count]
+        for goods_id, day, quantity, cost, price_sum, line_count in rows
+    }
+
+
+def _quantized(values):
+    return (
+        values[0].quantize(Decimal('0.001')),
+        values[1].quantize(Decimal('0.001')),
+        values[2].quantize(Decimal('1')),
+        values[3]
+    )
+
+
+def verify_material_costs():
+    """Return the ``(goods_id, day)`` buckets whose stored totals drifted from
+    the invoices, as ``{key: (expected, stored)}``."""
+    expected = {
+        key: _quantized(values)
+        for key, values in compute_costs_from_invoices().items()
+    }
+    stored = {
+        (row.goods_id, row.day): _quantized([
+            _to_decimal(row.buy_quantity),
+            _to_decimal(row.total_cost),
+            _to_decimal(row.price_sum),
+            row.line_count
+        ])
+        for row in db.session.execute(select(GoodsCostDaily)).scalars()
+    }
+    mismatches = {}
+    for key in expected.keys() | stored.keys():
+        if expected.get(key) != stored.get(key):
+            mismatches[key] = (expected.get(key), stored.get(key))
+    return mismatches
+
+
+def rebuild_material_costs():
+    daily = compute_costs_from_invoices()
+    totals = defaultdict(lambda: [Decimal('0'), Decimal('0'), Decimal('0'), 0])
+    for (goods_id, _), values in daily.items():
+        totals[goods_id] = [total + value for total, value in zip(totals[goods_id], values)]
+    try:
+        db.session.execute(delete(GoodsCostDaily))
+        db.session.execute(delete(GoodsCost))
+        if daily:
+            db.session.execute(GoodsCostDaily.__table__.insert(), [
+                {'goods_id': goods_id, 'day': day, **dict(zip(COST_FIELDS, values))}
+                for (goods_id, day), values in daily.items()
+            ])
+            db.session.execute(GoodsCost.__table__.insert(), [
+                {'goods_id': goods_id, **dict(zip(COST_FIELDS, values))}
+                for goods_id, values in totals.items()
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(totals)
+
+
+def rebuild_cost_totals():
+    """Recompute ``goods_costs`` as the sum of ``goods_cost_daily``; return
+    the number of goods.
+
+    The totals are locked before the days are summed with a locking read,
+    so a concurrent invoice write either commits first and is summed, or
+    waits and applies its delta on top of the rebuilt totals.
+    """
+    try:
+        db.session.execute(select(GoodsCost.goods_id).with_for_update()).all()
+        sums = db.session.execute(
+            select(GoodsCostDaily.goods_id,
+                   *[func.sum(getattr(GoodsCostDaily, field)) for field in COST_FIELDS])
+            .group_by(GoodsCostDaily.goods_id)
+            .with_for_update(read=True)
+        ).all()
+        db.session.execute(delete(GoodsCost))
+        if sums:
+            db.session.execute(GoodsCost.__table__.insert(), [
+                {'goods_id': goods_id, **dict(zip(COST_FIELDS, values))}
+                for goods_id, *values in sums
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(sums)
+
+
+def material_cost_query(as_of=None):
+    """Per ``material_code`` purchase totals, read from the maintained cost
+    tables (optionally only invoices dated on or before ``as_of``)."""
+    source = GoodsCost
+    join_condition = GoodsCost.goods_id == Goods.id
+    if as_of is not None:
+        source = GoodsCostDaily
+        join_condition = (GoodsCostDaily.goods_id == Goods.id) & (GoodsCostDaily.day <= as_of)
+    return (
+        select(
+            Goods.material_code,
+            func.sum(source.price_sum),
+            func.sum(source.line_count),
+            func.sum(source.total_cost),
+            func.sum(source.buy_quantity * Goods.convert_rate)
+        )
+        .select_from(Goods)
+        .join(source, join_condition, isouter=True)
+        .group_by(Goods.material_code)
+    )
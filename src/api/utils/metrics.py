@@ -0,0 +1,233 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from flask import request, g, has_request_context, current_app, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.api.utils.pool_metrics import pool_metrics, WAIT_BUCKETS
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Histogram(object):
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [
+                    [0] * len(self.buckets), 0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labelvalues, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labelnames + ('le',),
+                                            labelvalues + (repr(float(bound)),))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _format_labels(self.labelnames + ('le',), labelvalues + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def _simple_family(name, kind, documentation, samples):
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for labelnames, labelvalues, value in samples:
+        lines.append(f'{name}{_format_labels(labelnames, labelvalues)} {value}')
+    return lines
+
+
+class RequestMetrics(object):
+    """Per-endpoint request instrumentation, exposed on ``/metrics``.
+
+    Each gunicorn worker keeps its own numbers; the ``pid`` label on
+    ``process_start_time_seconds`` tells the scrapes apart.
+    """
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Time spent handling the request.',
+            LATENCY_BUCKETS, ('endpoint', 'method', 'status'))
+        self.response_size = Histogram(
+            'http_response_size_bytes', 'Size of the response body.',
+            SIZE_BUCKETS, ('endpoint',))
+        self.db_queries = Histogram(
+            'http_request_db_queries', 'SQL statements executed per request.',
+            QUERY_COUNT_BUCKETS, ('endpoint',))
+        self.db_duration = Histogram(
+            'http_request_db_seconds', 'Time spent in SQL statements per request.',
+            LATENCY_BUCKETS, ('endpoint',))
+        self.serialization_duration = Histogram(
+            'http_request_serialization_seconds',
+            'Time spent in marshmallow dump() per request.',
+            LATENCY_BUCKETS, ('endpoint',))
+        self.started_at = time.time()
+        self._listening = False
+
+    def init_app(self, app):
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            self._listening = True
+        app.config.setdefault('PROFILING_ENABLED', app.config.get('DEBUG', False))
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        # Endpoint names and pool figures are not for the public internet.
+        if app.config.get('STATS_ENDPOINTS_ENABLED') or app.debug or app.testing:
+            app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+        app.extensions['request_metrics'] = self
+
+    def _start(self):
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        g.serialization_seconds = 0.0
+        if request.args.get('profile') == '1' and current_app.config['PROFILING_ENABLED']:
+            g.profiler = _start_profiler()
+
+    def _finish(self, response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        self.request_duration.observe(elapsed, endpoint, request.method,
+                                      str(response.status_code))
+        self.db_queries.observe(g.sql_count, endpoint)
+        self.db_duration.observe(g.sql_seconds, endpoint)
+        self.serialization_duration.observe(g.serialization_seconds, endpoint)
+        if not response.is_streamed:
+            self.response_size.observe(response.calculate_content_length() or 0, endpoint)
+        response.headers['Server-Timing'] = (
+            f'db;desc="{g.sql_count} queries";dur={g.sql_seconds * 1000:.2f}, '
+            f'serialize;dur={g.serialization_seconds * 1000:.2f}, '
+            f'total;dur={elapsed * 1000:.2f}')
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            return Response(_stop_profiler(profiler), mimetype='text/plain',
+                            headers={'Server-Timing': response.headers['Server-Timing']})
+        return response
+
+    def render(self):
+        lines = []
+        for histogram in (self.request_duration, self.response_size, self.db_queries,
+                          self.db_duration, self.serialization_duration):
+            lines.extend(histogram.render())
+
+        pools = pool_metrics.snapshot()
+        lines.append('# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.')
+        lines.append('# TYPE db_pool_checkout_wait_seconds histogram')
+        for name, stats in sorted(pools.items()):
+            cumulative = 0
+            for bound in WAIT_BUCKETS:
+                cumulative += stats['wait_buckets'][str(bound)]
+                lines.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="{float(bound)!r}"}} {cumulative}')
+            lines.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="+Inf"}} {stats["checkouts"]}')
+            lines.append(f'db_pool_checkout_wait_seconds_sum{{pool="{name}"}} {stats["wait_seconds_sum"]}')
+            lines.append(f'db_pool_checkout_wait_seconds_count{{pool="{name}"}} {stats["checkouts"]}')
+        for metric, kind, key, documentation in (
+                ('db_pool_timeouts_total', 'counter', 'timeouts', 'Checkouts that timed out.'),
+                ('db_pool_checked_out', 'gauge', 'checked_out', 'Connections currently checked out.'),
+                ('db_pool_size', 'gauge', 'size', 'Connections kept in the pool.'),
+                ('db_pool_saturation', 'gauge', 'saturation', 'Checked out / allowed connections.')):
+            lines.extend(_simple_family(metric, kind, documentation, [
+                (('pool',), (name,), stats[key])
+                for name, stats in sorted(pools.items()) if stats[key] is not None]))
+
+        cache = current_app.extensions.get('response_cache')
+        if cache is not None:
+            lines.extend(_simple_family(
+                'response_cache_events_total', 'counter', 'Response cache events.',
+                [(('event',), (name,), value)
+                 for name, value in sorted(cache.stats_snapshot().items())]))
+
+        lines.extend(_simple_family(
+            'process_start_time_seconds', 'gauge', 'Start time of the process.',
+            [(('pid',), (os.getpid(),), self.started_at)]))
+        startup_ms = current_app.extensions.get('startup_ms')
+        if startup_ms is not None:
+            lines.extend(_simple_family(
+                'app_create_seconds', 'gauge', 'Time create_app() took.',
+                [((), (), startup_ms / 1000)]))
+        return '\n'.join(lines) + '\n'
+
+    def _metrics_view(self):
+        return Response(self.render(), mimetype=PROMETHEUS_MIMETYPE)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('query_started')
+    if not stack:
+        return
+    started = stack.pop()
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_seconds += time.perf_counter() - started
+
+
+def record_serialization(seconds):
+    if has_request_context() and 'serialization_seconds' in g:
+        g.serialization_seconds += seconds
+
+
+def _start_profiler():
+    """pyinstrument's call tree when it is installed, cProfile otherwise."""
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+
+def _stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(60)
+        return output.getvalue()
+    profiler.stop()
+    return profiler.output_text(unicode=True, color=False)
+
+
+request_metrics = RequestMetrics()
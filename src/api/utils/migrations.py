@@ -0,0 +1,93 @@
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import inspect, select, insert
+from src.api.utils.database import db
+from src.api.models import SchemaMigration, ImsSchemaMigration
+from src.api.migrations import MIGRATIONS
+
+MIGRATION_MODELS = {
+    None: SchemaMigration,
+    'IMS_db': ImsSchemaMigration,
+}
+
+
+def _record(connection, model, version):
+    connection.execute(insert(model).values(
+        version=version, applied_at=datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)))
+
+
+def upgrade_bind(bind_key):
+    """Apply the schema changes of the pending migrations to one bind;
+    return the versions applied.
+
+    Migrations with a ``backfill`` are left unrecorded here:
+    upgrade_database() records them once the backfill has run.
+    """
+    model = MIGRATION_MODELS[bind_key]
+    applied = []
+    with db.engines[bind_key].begin() as connection:
+        model.__table__.create(connection, checkfirst=True)
+        done = set(connection.scalars(select(model.version)))
+        for migration in MIGRATIONS:
+            if migration.VERSION in done:
+                continue
+            logging.info(
+                f"Applying migration {migration.VERSION} to bind {bind_key or 'default'}")
+            migration.upgrade(connection, bind_key)
+            if getattr(migration, 'backfill', None) is None:
+                _record(connection, model, migration.VERSION)
+            applied.append(migration.VERSION)
+    return applied
+
+
+def upgrade_database():
+    """Bring every bind up to date; return ``{bind_key: [versions applied]}``.
+
+    Every bind gets its schema changes first, so the backfills, which fill
+    derived tables with the application's own rebuild code, run against the
+    finished schema. A backfill shared by several migrations runs once; an
+    interrupted upgrade runs it again, as each one rebuilds its tables.
+    """
+    applied = {bind_key: upgrade_bind(bind_key) for bind_key in db.metadatas}
+    backfilled = set()
+    for migration in MIGRATIONS:
+        backfill = getattr(migration, 'backfill', None)
+        bind_keys = [bind_key for bind_key, versions in applied.items()
+                     if migration.VERSION in versions]
+        if backfill is None or not bind_keys:
+            continue
+        if backfill not in backfilled:
+            logging.info(f"Backfilling for migration {migration.VERSION}")
+            backfill()
+            backfilled.add(backfill)
+        for bind_key in bind_keys:
+            with db.engines[bind_key].begin() as connection:
+                _record(connection, MIGRATION_MODELS[bind_key], migration.VERSION)
+    return applied
+
+
+def run_backfills():
+    """Fill every derived table from the documents with the migrations'
+    backfills, as an upgrade from the baseline would; for data loaded
+    straight into the document tables."""
+    backfills = []
+    for migration in MIGRATIONS:
+        backfill = getattr(migration, 'backfill', None)
+        if backfill is not None and backfill not in backfills:
+            backfills.append(backfill)
+    for backfill in backfills:
+        backfill()
+
+
+def pending_migrations():
+    """Return ``{bind_key: [versions not yet applied]}`` without changing anything."""
+    pending = {}
+    for bind_key in db.metadatas:
+        model = MIGRATION_MODELS[bind_key]
+        with db.engines[bind_key].connect() as connection:
+            done = set()
+            if inspect(connection).has_table(model.__tablename__):
+                done = set(connection.scalars(select(model.version)))
+        pending[bind_key] = [migration.VERSION for migration in MIGRATIONS
+                             if migration.VERSION not in done]
+    return pending
@@ -0,0 +1,154 @@
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+from urllib.parse import urlencode
+from flask import request, current_app
+from src.api.utils.database import db
+from src.api.utils.responses import response_with
+from src.api.utils import responses as resp
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_MAX_PAGE_SIZE = 1000
+
+ListArgs = namedtuple('ListArgs', ['limit', 'after', 'criteria', 'schema', 'fields'])
+
+
+class ListArgsError(Exception):
+    def __init__(self, response, message):
+        super().__init__(message)
+        self.response = response
+        self.message = message
+
+
+@lru_cache(maxsize=256)
+def schema_for(schema_cls, only=None):
+    """Build (once) a ``many=True`` schema restricted to ``only``."""
+    return schema_cls(many=True, only=only)
+
+
+def _coerce(column, raw_value):
+    python_type = column.type.python_type
+    if python_type is date:
+        return date.fromisoformat(raw_value)
+    return python_type(raw_value)
+
+
+def _parse_int(name, minimum):
+    raw_value = request.args.get(name)
+    if raw_value is None:
+        return None
+    try:
+        value = int(raw_value)
+    except ValueError:
+        raise ListArgsError(resp.INVALID_INPUT_422,
+                            f"'{name}' must be an integer")
+    if value < minimum:
+        raise ListArgsError(resp.INVALID_INPUT_422,
+                            f"'{name}' must be at least {minimum}")
+    return value
+
+
+def parse_list_args(schema_cls, filters=None, extra_fields=()):
+    """Read ``limit``/``after``/``fields`` and the column filters declared in
+    ``filters`` (``{arg_name: (column, operator)}``) from the query string."""
+    limit = _parse_int('limit', 1)
+    after = _parse_int('after', 0)
+    max_page_size = current_app.config.get(
+        'MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    if limit is not None and limit > max_page_size:
+        raise ListArgsError(resp.INVALID_INPUT_422,
+                            f"'limit' cannot exceed {max_page_size}")
+
+    criteria = []
+    for arg_name, (column, operator) in (filters or {}).items():
+        raw_value = request.args.get(arg_name)
+        if raw_value is None:
+            continue
+        try:
+            value = _coerce(column, raw_value)
+        except ValueError:
+            raise ListArgsError(resp.INVALID_INPUT_422,
+                                f"Invalid value for filter '{arg_name}'")
+        if operator == '>=':
+            criteria.append(column >= value)
+        elif operator == '<=':
+            criteria.append(column <= value)
+        else:
+            criteria.append(column == value)
+
+    fields = None
+    only = None
+    raw_fields = request.args.get('fields')
+    if raw_fields:
+        fields = frozenset(name.strip()
+                           for name in raw_fields.split(',') if name.strip())
+        only = tuple(sorted(fields.difference(extra_fields))) or ('id',)
+    try:
+        schema = schema_for(schema_cls, only)
+    except ValueError as err:
+        raise ListArgsError(resp.INVALID_FIELD_NAME_SENT_422, str(err))
+
+    return ListArgs(limit, after, criteria, schema, fields)
+
+
+def wants_field(list_args, name):
+    return list_args.fields is None or name in list_args.fields
+
+
+def build_list_statement(model, list_args, stmt=None):
+    """Apply the filters, the schema's eager-load plan and the ``after``
+    keyset to ``stmt`` (defaults to ``select(model)``), ordered by id."""
+    if stmt is None:
+        stmt = db.select(model)
+    stmt = (
+        stmt.where(*list_args.criteria)
+        .options(*list_args.schema.loader_options())
+        .order_by(model.id)
+    )
+    if list_args.after is not None:
+        stmt = stmt.where(model.id > list_args.after)
+    return stmt
+
+
+def fetch_page(model, list_args, stmt=None):
+    """Run the list statement for ``model`` with a keyset page applied.
+
+    Returns ``(rows, pagination)``. Without ``limit`` the page holds
+    ``DEFAULT_PAGE_SIZE`` rows, so no list GET reads a whole table.
+    """
+    stmt = build_list_statement(model, list_args, stmt)
+
+    limit = list_args.limit or current_app.config.get(
+        'DEFAULT_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    rows = db.session.execute(stmt.limit(limit + 1)).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    pagination = {
+        'limit': limit,
+        'after': list_args.after,
+        'next_after': rows[-1].id if has_more else None,
+        'has_more': has_more
+    }
+    return rows, pagination
+
+
+def _next_url(next_after):
+    args = request.args.copy()
+    args['after'] = next_after
+    return f'{request.path}?{urlencode(list(args.items(multi=True)))}'
+
+
+def list_response(output, pagination):
+    """The page as ``{'data': [...], 'pagination': {...}}``.
+
+    Every list GET is paged, so the envelope is always there: its
+    ``pagination['next']`` (and a ``Link: rel="next"`` header) is the URL
+    of the next page while there is one, ``None`` on the last.
+    """
+    headers = {}
+    next_url = None
+    if pagination['next_after'] is not None:
+        next_url = _next_url(pagination['next_after'])
+        headers['Link'] = f'<{next_url}>; rel="next"'
+    return response_with(resp.SUCCESS_200, value={'data': output},
+                         pagination={**pagination, 'next': next_url}, headers=headers)
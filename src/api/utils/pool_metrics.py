@@ -0,0 +1,97 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics(object):
+    """Checkout wait times and occupancy of every ``TimedQueuePool``,
+    keyed by the pool's ``pool_logging_name``."""
+
+    def __init__(self):
+        self.pools = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, pool):
+        with self._lock:
+            self.pools[pool.metrics_name] = pool
+            self._stats.setdefault(pool.metrics_name, {
+                'checkouts': 0,
+                'timeouts': 0,
+                'wait_seconds_sum': 0.0,
+                'wait_seconds_max': 0.0,
+                'wait_buckets': [0] * len(WAIT_BUCKETS),
+            })
+
+    def observe(self, name, waited, timed_out=False):
+        with self._lock:
+            stats = self._stats[name]
+            if timed_out:
+                stats['timeouts'] += 1
+                return
+            stats['checkouts'] += 1
+            stats['wait_seconds_sum'] += waited
+            stats['wait_seconds_max'] = max(stats['wait_seconds_max'], waited)
+            for position, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    stats['wait_buckets'][position] += 1
+                    break
+
+    def snapshot(self):
+        """Counters plus the current occupancy of each pool."""
+        with self._lock:
+            report = {}
+            for name, pool in self.pools.items():
+                stats = dict(self._stats[name])
+                stats['wait_buckets'] = dict(zip(
+                    [str(bound) for bound in WAIT_BUCKETS], stats['wait_buckets']))
+                checked_out = pool.checkedout()
+                stats.update({
+                    'size': pool.size(),
+                    'checked_out': checked_out,
+                    'overflow': pool.overflow(),
+                    'capacity': pool.capacity,
+                    # Share of all allowed connections in use right now.
+                    'saturation': (round(checked_out / pool.capacity, 3)
+                                   if pool.capacity else None),
+                })
+                report[name] = stats
+            return report
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """``QueuePool`` that reports how long each checkout waited (queueing
+    for a free slot, plus opening or pinging the connection).
+
+    Select it with ``poolclass`` in the engine options; the metrics key is
+    the engine's ``pool_logging_name``. ``dispose()`` rebuilds the pool via
+    ``recreate()``, which keeps the class and name.
+    """
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.metrics_name = kw.get('logging_name') or 'default'
+        # max_overflow=-1 means no limit, so there is no saturation point.
+        self.capacity = pool_size + max_overflow if max_overflow >= 0 else None
+        pool_metrics.register(self)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.observe(self.metrics_name, 0, timed_out=True)
+            raise
+        pool_metrics.observe(self.metrics_name, time.perf_counter() - started)
+        return connection
+
+
+def pool_stats_view():
+    return pool_metrics.snapshot(), 200
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from flask import request, g, has_app_context, has_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+PARAMETERS_MAX_LENGTH = 500
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class QueryWatch(object):
+    """Development/test guard rails: a slow-query log and an N+1 detector.
+
+    ``SLOW_QUERY_THRESHOLD_MS`` records every statement slower than that
+    (statement, parameters, duration, route). ``NPLUSONE_THRESHOLD`` flags
+    a request that lazy loads the same relationship statement more than
+    that many times, i.e. a lazy load inside a loop (eager loads batched
+    by selectinload are not counted); ``NPLUSONE_ACTION`` is
+    ``'log'`` or ``'raise'`` (fail the request, and with it the test).
+    Both are off unless configured, and the engine listeners are only
+    installed when one of them is on.
+    """
+
+    def __init__(self, max_entries=200):
+        self.slow_queries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', None)
+        app.config.setdefault('NPLUSONE_THRESHOLD', None)
+        app.config.setdefault('NPLUSONE_ACTION', 'log')
+        if app.config['SLOW_QUERY_THRESHOLD_MS'] is None and app.config['NPLUSONE_THRESHOLD'] is None:
+            return
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Session, 'do_orm_execute', self._count_lazy_load)
+            self._listening = True
+        if app.config['NPLUSONE_THRESHOLD'] is not None:
+            app.before_request(self._reset_lazy_loads)
+            app.after_request(self._check_repeated_queries)
+        # Statements and parameters are not for production eyes.
+        if app.config['SLOW_QUERY_THRESHOLD_MS'] is not None and (app.debug or app.testing):
+            app.add_url_rule('/api/debug/slow-queries', 'slow_queries', self._slow_queries_view)
+        app.extensions['query_watch'] = self
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('watch_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('watch_started')
+        if not stack:
+            return
+        elapsed_ms = (time.perf_counter() - stack.pop()) * 1000
+        if not has_app_context():
+            return
+        config = current_app.config
+
+        threshold = config.get('SLOW_QUERY_THRESHOLD_MS')
+        if threshold is not None and elapsed_ms >= threshold:
+            self._record_slow(statement, parameters, elapsed_ms)
+
+    def _count_lazy_load(self, orm_execute_state):
+        # lazy_loaded_from raises on ORM-enabled UPDATE/DELETE.
+        if (not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None
+                or not has_request_context()
+                or current_app.config.get('NPLUSONE_THRESHOLD') is None):
+            return
+        # The keys are bound parameters, so the statement text is the shape.
+        shape = str(orm_execute_state.statement)
+        g.setdefault('lazy_load_shapes', Counter())[shape] += 1
+
+    def _record_slow(self, statement, parameters, elapsed_ms):
+        route = (f'{request.method} {request.path} ({request.endpoint})'
+                 if has_request_context() else 'outside request')
+        entry = {
+            'statement': statement,
+            'parameters': repr(parameters)[:PARAMETERS_MAX_LENGTH],
+            'duration_ms': round(elapsed_ms, 3),
+            'route': route,
+            'at': time.time(),
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+        logging.warning(
+            f"Slow query ({entry['duration_ms']} ms) in {route}: {statement} {entry['parameters']}")
+
+    def _reset_lazy_loads(self):
+        # g outlives the request when the app context was pushed around it
+        # (test clients inside ``with app.app_context()``).
+        g.pop('lazy_load_shapes', None)
+
+    def _check_repeated_queries(self, response):
+        threshold = current_app.config['NPLUSONE_THRESHOLD']
+        repeated = {statement: count for statement, count in g.get('lazy_load_shapes', {}).items()
+                    if count > threshold}
+        if not repeated:
+            return response
+        details = '; '.join(f'{count}x {statement}' for statement, count in repeated.items())
+        message = (f"Possible N+1 in {request.method} {request.path} ({request.endpoint}): "
+                   f"{details}")
+        if current_app.config['NPLUSONE_ACTION'] == 'raise':
+            raise NPlusOneError(message)
+        logging.warning(message)
+        return response
+
+    def _slow_queries_view(self):
+        with self._lock:
+            return list(self.slow_queries), 200
+
+
+query_watch = QueryWatch()
@@ -0,0 +1,146 @@
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import select, func, and_
+from src.api.utils.database import db
+from src.api.models import Goods, Invoice, InvoiceGoods, RawMaterial, Receipt, ReceiptRawMaterial
+
+DEFAULT_RECONCILIATION_CHUNK_SIZE = 500
+QUANTITY_PLACES = Decimal('0.001')
+# Collations ordering codes by code point, as Python compares them; SQLite's
+# default (BINARY) already does.
+BINARY_COLLATIONS = {
+    'mysql': 'utf8mb4_bin',
+    'mariadb': 'utf8mb4_bin',
+    'postgresql': 'C',
+}
+
+
+class ReconciliationError(Exception):
+    pass
+
+
+def _date_window(column, date_from, date_to):
+    criteria = []
+    if date_from is not None:
+        criteria.append(column >= date_from)
+    if date_to is not None:
+        criteria.append(column <= date_to)
+    return criteria
+
+
+def _binary(column, model):
+    """``column`` ordered by code point on the model's bind."""
+    dialect_name = db.session.get_bind(mapper=model.__mapper__).dialect.name
+    collation = BINARY_COLLATIONS.get(dialect_name)
+    return column.collate(collation) if collation else column
+
+
+def invoiced_statement(date_from=None, date_to=None):
+    """Base-unit quantity invoiced per ``material_code`` (PMS), sorted by code.
+
+    Every goods' material shows up, with a NULL total when nothing was
+    invoiced for it inside the window.
+    """
+    lines = InvoiceGoods.__table__.join(Invoice.__table__, and_(
+        Invoice.id == InvoiceGoods.invoice_id,
+        *_date_window(Invoice.created_date, date_from, date_to)
+    ))
+    code = _binary(Goods.material_code, Goods)
+    return (
+        select(
+            code,
+            func.sum(InvoiceGoods.buy_quantity * Goods.convert_rate)
+        )
+        .select_from(Goods)
+        .outerjoin(lines, InvoiceGoods.goods_id == Goods.id)
+        .group_by(code)
+        .order_by(code)
+    )
+
+
+def received_statement(date_from=None, date_to=None):
+    """Quantity received per raw material ``code`` (IMS), sorted by code."""
+    lines = ReceiptRawMaterial.__table__.join(Receipt.__table__, and_(
+        Receipt.id == ReceiptRawMaterial.receipt_id,
+        *_date_window(Receipt.created_date, date_from, date_to)
+    ))
+    code = _binary(RawMaterial.code, RawMaterial)
+    return (
+        select(
+            code,
+            func.sum(ReceiptRawMaterial.quantity)
+        )
+        .select_from(RawMaterial)
+        .outerjoin(lines, ReceiptRawMaterial.raw_material_id == RawMaterial.id)
+        .group_by(code)
+        .order_by(code)
+    )
+
+
+def _quantity(value):
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(QUANTITY_PLACES)
+
+
+def _stream(stmt, label):
+    """Yield ``(code, quantity)`` from a server-side cursor, checking that the
+    database really returned the codes in ascending order."""
+    chunk_size = current_app.config.get(
+        'RECONCILIATION_CHUNK_SIZE', DEFAULT_RECONCILIATION_CHUNK_SIZE)
+    previous = None
+    for code, quantity in db.session.execute(
+            stmt, execution_options={'yield_per': chunk_size}):
+        if previous is not None and code <= previous:
+            # A collation other than BINARY_COLLATIONS' orders codes
+            # differently from Python; the merge would mis-pair them.
+            raise ReconciliationError(
+                f"{label} codes are not in ascending order ({previous!r} before {code!r}); "
+                "check the column collation")
+        previous = code
+        yield code, _quantity(quantity)
+
+
+def _status(invoiced, received, variance):
+    if invoiced is None:
+        return 'receipt_only'
+    if received is None:
+        return 'invoice_only'
+    return 'matched' if variance == 0 else 'variance'
+
+
+def reconcile(date_from=None, date_to=None):
+    """Merge-join invoiced and received quantities by material code.
+
+    The two sides live on different binds, so they cannot be joined in SQL;
+    each is streamed sorted by code and walked once, holding a single row
+    from each side at a time. Yields one dict per code with activity on
+    either side inside the window.
+    """
+    invoiced_rows = _stream(invoiced_statement(date_from, date_to), 'Invoiced')
+    received_rows = _stream(received_statement(date_from, date_to), 'Received')
+    invoiced_row = next(invoiced_rows, None)
+    received_row = next(received_rows, None)
+
+    while invoiced_row is not None or received_row is not None:
+        if received_row is None or (invoiced_row is not None and invoiced_row[0] < received_row[0]):
+            code, invoiced, received = invoiced_row[0], invoiced_row[1], None
+            invoiced_row = next(invoiced_rows, None)
+        elif invoiced_row is None or received_row[0] < invoiced_row[0]:
+            code, invoiced, received = received_row[0], None, received_row[1]
+            received_row = next(received_rows, None)
+        else:
+            code, invoiced, received = invoiced_row[0], invoiced_row[1], received_row[1]
+            invoiced_row = next(invoiced_rows, None)
+            received_row = next(received_rows, None)
+        if invoiced is None and received is None:
+            continue
+
+        variance = (received or Decimal('0')) - (invoiced or Decimal('0'))
+        yield {
+            'material_code': code,
+            'invoiced_quantity': str(invoiced) if invoiced is not None else None,
+            'received_quantity': str(received) if received is not None else None,
+            'variance': str(variance.quantize(QUANTITY_PLACES)),
+            'status': _status(invoiced, received, variance)
+        }
@@ -1,4 +1,4 @@
-from flask import make_response, jsonify
+from flask import current_app
 
 INVALID_FIELD_NAME_SENT_422 = {
     "http_code": 422,
@@ -30,6 +30,11 @@ SERVER_ERROR_404 = {
     "code": "notFound",
     "message": "Resource not found"
 }
+CONFLICT_409 = {
+    "http_code": 409,
+    "code": "conflict",
+    "message": "Conflicts with an existing resource"
+}
 UNAUTHORIZED_403 = {
     "http_code": 403,
     "code": "notAuthorized",
@@ -49,26 +54,33 @@ SUCCESS_204 = {
 }
 
 
-def response_with(response, value=None, message=None, error=None, headers={}, pagination=None):
-    result = {}
+COMMON_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'server': 'Flask REST API',
+}
+
 
-    if value is not None:
-        result.update(value)
+def response_with(response, value=None, message=None, error=None, headers=None, pagination=None):
+    # ``value`` is always a fresh dict from the caller, so it becomes the body
+    # as is instead of being copied key by key.
+    result = value if value is not None else {}
 
+    if message is None:
+        message = response.get('message')
     if message is not None:
-        result.update({'message': message})
-    elif response.get('message', None) is not None:
-        result.update({'message': response['message']})
+        result['message'] = message
 
-    result.update({'code': response['code']})
+    result['code'] = response['code']
 
     if error is not None:
-        result.update({'errors': error})
+        result['errors'] = error
 
     if pagination is not None:
-        result.update({'pagination': pagination})
-
-    headers.update({'Access-Control-Allow-Origin': '*'})
-    headers.update({'server': 'Flask REST API'})
+        result['pagination'] = pagination
 
-    return make_response(jsonify(result), response['http_code'], headers)
+    rv = current_app.json.response(result)
+    rv.status_code = response['http_code']
+    if headers:
+        rv.headers.update(headers)
+    rv.headers.update(COMMON_HEADERS)
+    return rv
@@ -0,0 +1,171 @@
+from collections import defaultdict
+from decimal import Decimal
+from types import SimpleNamespace
+from sqlalchemy import func, select, delete
+from src.api.utils.database import db
+from src.api.utils.counters import increment_row, delete_empty_rows
+from src.api.utils.stock_snapshots import invalidate_snapshots
+from src.api.models import StockBalance, ReceiptDaily, Receipt, ReceiptRawMaterial
+
+QUANTITY_PLACES = Decimal('0.001')
+
+
+def _to_quantity(value):
+    return Decimal(str(value or 0)).quantize(QUANTITY_PLACES)
+
+
+def _aggregate_lines(lines, sign=1, deltas=None):
+    """``{raw_material_id: [quantity, line_count, issued_quantity]}``."""
+    if deltas is None:
+        deltas = defaultdict(lambda: [Decimal('0'), 0, Decimal('0')])
+    for line in lines:
+        entry = deltas[line.raw_material_id]
+        quantity = _to_quantity(line.quantity)
+        entry[0] += quantity * sign
+        entry[1] += sign
+        if quantity < 0:
+            entry[2] -= quantity * sign
+    return deltas
+
+
+def _apply_balances(stock_id, deltas):
+    for raw_material_id, (quantity, line_count, _) in deltas.items():
+        if quantity == 0 and line_count == 0:
+            continue
+        increment_row(
+            StockBalance,
+            {'stock_id': stock_id, 'raw_material_id': raw_material_id},
+            {'quantity': quantity, 'line_count': line_count}
+        )
+    delete_empty_rows(StockBalance, StockBalance.stock_id == stock_id)
+
+
+def _apply_daily(stock_id, day, deltas):
+    for raw_material_id, (quantity, line_count, issued_quantity) in deltas.items():
+        if quantity == 0 and line_count == 0 and issued_quantity == 0:
+            continue
+        increment_row(
+            ReceiptDaily,
+            {'stock_id': stock_id, 'raw_material_id': raw_material_id, 'day': day},
+            {'quantity': quantity, 'line_count': line_count, 'issued_quantity': issued_quantity}
+        )
+    delete_empty_rows(ReceiptDaily, ReceiptDaily.stock_id == stock_id, ReceiptDaily.day == day)
+
+
+def _apply_deltas(stock_id, day, deltas):
+    _apply_balances(stock_id, deltas)
+    _apply_daily(stock_id, day, deltas)
+    invalidate_snapshots(stock_id, day)
+
+
+def apply_receipt_lines(receipt, lines, sign=1):
+    """Fold receipt lines into the stock balances and daily totals of the
+    receipt's stock.
+
+    Runs inside the caller's transaction; pass ``sign=-1`` to take lines
+    back out.
+    """
+    _apply_deltas(receipt.stock_id, receipt.created_date, _aggregate_lines(lines, sign))
+
+
+def apply_receipt_documents(documents):
+    """Fold newly inserted receipts, given as ``(header, lines)`` column
+    dicts, into the balances with one update per stock and material, and
+    into the daily totals with one per stock, day and material."""
+    deltas_by_stock = {}
+    deltas_by_day = {}
+    for header, lines in documents:
+        stock_id = header.get('stock_id')
+        key = (stock_id, header.get('created_date'))
+        lines = [SimpleNamespace(**line) for line in lines]
+        deltas_by_stock[stock_id] = _aggregate_lines(lines, 1, deltas_by_stock.get(stock_id))
+        deltas_by_day[key] = _aggregate_lines(lines, 1, deltas_by_day.get(key))
+    for stock_id, deltas in deltas_by_stock.items():
+        _apply_balances(stock_id, deltas)
+    first_days = {}
+    for (stock_id, day), deltas in deltas_by_day.items():
+        _apply_daily(stock_id, day, deltas)
+        if stock_id not in first_days or day < first_days[stock_id]:
+            first_days[stock_id] = day
+    for stock_id, day in first_days.items():
+        invalidate_snapshots(stock_id, day)
+
+
+def snapshot_receipt(receipt):
+    """Capture a receipt's contribution before it is edited in place."""
+    return receipt.stock_id, receipt.created_date, _aggregate_lines(receipt.list_of_raw_materials)
+
+
+def apply_receipt_change(snapshot, receipt):
+    """Move the ledger from ``snapshot`` to the receipt's current lines,
+    touching only the materials whose net quantity or line count changed."""
+    old_stock_id, old_day, old_deltas = snapshot
+    if old_stock_id != receipt.stock_id or old_day != receipt.created_date:
+        _apply_deltas(old_stock_id, old_day, {
+            raw_material_id: [-value for value in entry]
+            for raw_material_id, entry in old_deltas.items()
+        })
+        apply_receipt_lines(receipt, receipt.list_of_raw_materials)
+        return
+
+    deltas = _aggregate_lines(receipt.list_of_raw_materials)
+    for raw_material_id, entry in old_deltas.items():
+        for index, value in enumerate(entry):
+            deltas[raw_material_id][index] -= value
+    _apply_deltas(receipt.stock_id, receipt.created_date, deltas)
+
+
+def compute_balances_from_receipts():
+    rows = db.session.execute(
+        select(
+            Receipt.stock_id,
+            ReceiptRawMaterial.raw_material_id,
+            func.sum(ReceiptRawMaterial.quantity),
+            func.count(ReceiptRawMaterial.id)
+        )
+        .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
+        .group_by(Receipt.stock_id, ReceiptRawMaterial.raw_material_id)
+    ).all()
+    return {
+        (stock_id, raw_material_id): (_to_quantity(quantity), line_count)
+        for stock_id, raw_material_id, quantity, line_count in rows
+    }
+
+
+def verify_stock_balances():
+    """Return the (stock_id, raw_material_id) keys whose ledger row has drifted
+    from the receipts, as ``{key: (expected, stored)}``."""
+    expected = compute_balances_from_receipts()
+    stored = {
+        (balance.stock_id, balance.raw_material_id): (_to_quantity(balance.quantity), balance.line_count)
+        for balance in db.session.execute(select(StockBalance)).scalars()
+    }
+    mismatches = {}
+    for key in expected.keys() | stored.keys():
+        if expected.get(key) != stored.get(key):
+            mismatches[key] = (expected.get(key), stored.get(key))
+    return mismatches
+
+
+def rebuild_stock_balances():
+    expected = compute_balances_from_receipts()
+    try:
+        db.session.execute(delete(StockBalance))
+        if expected:
+            db.session.execute(
+                StockBalance.__table__.insert(),
+                [
+                    {
+                        'stock_id': stock_id,
+                        'raw_material_id': raw_material_id,
+                        'quantity': quantity,
+                        'line_count': line_count
+                    }
+                    for (stock_id, raw_material_id), (quantity, line_count) in expected.items()
+                ]
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(expected)
@@ -0,0 +1,260 @@
+"""Stock snapshots and as-of balances.
+
+``build_stock_snapshots()`` extends each stock's ``stock_snapshots`` from
+its ``snapshot_through`` up to yesterday (today is still open). A row holds
+the closing balance of a stock/material on a day that material moved in
+that stock; days without movements get no rows, so the table grows with
+the receipts, not with stocks x materials x days. Receipt writes dated on
+or before the watermark move it back through ``invalidate_snapshots()``,
+so the next run redoes just those days.
+
+``balances_as_of(day)`` reads, per stock/material, the latest row dated on
+or before ``min(day, snapshot_through)`` and adds the receipts dated after
+the watermark, a few days of lines when the job runs daily.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import func, select, insert, update, delete, and_, or_
+from src.api.utils.database import db
+from src.api.models import Stock, StockSnapshot, StockSnapshotState, Receipt, ReceiptRawMaterial
+
+QUANTITY_PLACES = Decimal('0.001')
+INSERT_CHUNK_SIZE = 5000
+
+
+def _to_quantity(value):
+    return Decimal(str(value or 0)).quantize(QUANTITY_PLACES)
+
+
+def invalidate_snapshots(stock_id, day):
+    """Move the stock's watermark before ``day`` if it already covers it.
+
+    Runs inside the receipt write's transaction. Receipts dated today or
+    later are never snapshotted yet, so they skip the update.
+    """
+    if day is None or day >= date.today():
+        return
+    db.session.execute(
+        update(StockSnapshotState)
+        .where(StockSnapshotState.stock_id == stock_id,
+               StockSnapshotState.snapshot_through >= day)
+        .values(snapshot_through=day - timedelta(days=1))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _movements(stock_id, date_from, date_to):
+    """``{day: [(raw_material_id, quantity, line_count)]}`` of one stock."""
+    statement = (
+        select(
+            Receipt.created_date,
+            ReceiptRawMaterial.raw_material_id,
+            func.sum(ReceiptRawMaterial.quantity),
+            func.count(ReceiptRawMaterial.id)
+        )
+        .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
+        .where(Receipt.stock_id == stock_id, Receipt.created_date <= date_to)
+        .group_by(Receipt.created_date, ReceiptRawMaterial.raw_material_id)
+    )
+    if date_from is not None:
+        statement = statement.where(Receipt.created_date >= date_from)
+    movements = defaultdict(list)
+    for day, raw_material_id, quantity, line_count in db.session.execute(statement):
+        movements[day].append((raw_material_id, quantity, line_count))
+    return movements
+
+
+def _latest_snapshots(stock_days, raw_material_id=None):
+    """``{(stock_id, raw_material_id): [quantity, line_count]}`` from each
+    pair's latest row dated on or before its stock's day in ``stock_days``
+    (``{stock_id: day}``)."""
+    stocks_by_day = defaultdict(list)
+    for stock_id, day in stock_days.items():
+        stocks_by_day[day].append(stock_id)
+    balances = {}
+    for day, stock_ids in stocks_by_day.items():
+        latest = (
+            select(StockSnapshot.stock_id, StockSnapshot.raw_material_id,
+                   func.max(StockSnapshot.day).label('day'))
+            .where(StockSnapshot.stock_id.in_(stock_ids), StockSnapshot.day <= day)
+            .group_by(StockSnapshot.stock_id, StockSnapshot.raw_material_id)
+        )
+        if raw_material_id is not None:
+            latest = latest.where(StockSnapshot.raw_material_id == raw_material_id)
+        latest = latest.subquery()
+        statement = (
+            select(StockSnapshot.stock_id, StockSnapshot.raw_material_id,
+                   StockSnapshot.quantity, StockSnapshot.line_count)
+            .join(latest, and_(StockSnapshot.stock_id == latest.c.stock_id,
+                               StockSnapshot.raw_material_id == latest.c.raw_material_id,
+                               StockSnapshot.day == latest.c.day))
+        )
+        for row_stock_id, row_raw_material_id, quantity, line_count in db.session.execute(statement):
+            balances[(row_stock_id, row_raw_material_id)] = [_to_quantity(quantity), line_count]
+    return balances
+
+
+def _snapshot_stock(stock_id, through):
+    # Locked so a backdated receipt write waits for this run, not races it.
+    state = db.session.execute(
+        select(StockSnapshotState)
+        .where(StockSnapshotState.stock_id == stock_id)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if state is None:
+        state = StockSnapshotState(stock_id, through)
+        db.session.add(state)
+        start = None
+    elif state.snapshot_through >= through:
+        return 0
+    else:
+        start = state.snapshot_through + timedelta(days=1)
+
+    # Rows past the watermark were left behind by a backdated write.
+    stale = delete(StockSnapshot).where(StockSnapshot.stock_id == stock_id)
+    if start is not None:
+        stale = stale.where(StockSnapshot.day >= start)
+    db.session.execute(stale.execution_options(synchronize_session=False))
+
+    running = {}
+    if start is not None:
+        running = {
+            raw_material_id: entry
+            for (_, raw_material_id), entry
+            in _latest_snapshots({stock_id: start - timedelta(days=1)}).items()
+        }
+
+    written = 0
+    rows = []
+    movements = _movements(stock_id, start, through)
+    for day in sorted(movements):
+        for raw_material_id, quantity, line_count in movements[day]:
+            entry = running.setdefault(raw_material_id, [Decimal('0'), 0])
+            entry[0] += _to_quantity(quantity)
+            entry[1] += line_count
+            rows.append({'stock_id': stock_id, 'raw_material_id': raw_material_id, 'day': day,
+                         'quantity': entry[0], 'line_count': entry[1]})
+        if len(rows) >= INSERT_CHUNK_SIZE:
+            db.session.execute(insert(StockSnapshot), rows)
+            written += len(rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(StockSnapshot), rows)
+        written += len(rows)
+    state.snapshot_through = through
+    return written
+
+
+def build_stock_snapshots(through=None):
+    """Bring every stock's snapshots up to ``through`` (default yesterday),
+    one transaction per stock; return the number of rows written."""
+    yesterday = date.today() - timedelta(days=1)
+    through = through or yesterday
+    if through > yesterday:
+        raise ValueError("Snapshots can only be taken up to yesterday")
+    written = 0
+    for stock_id in db.session.execute(select(Stock.id).order_by(Stock.id)).scalars().all():
+        try:
+            written += _snapshot_stock(stock_id, through)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return written
+
+
+def reset_stock_snapshots():
+    """Drop every snapshot, so the next build starts from the first receipt."""
+    try:
+        db.session.execute(delete(StockSnapshot))
+        db.session.execute(delete(StockSnapshotState))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def rebuild_stock_snapshots():
+    """Drop and rebuild every snapshot up to yesterday; return the rows written."""
+    reset_stock_snapshots()
+    return build_stock_snapshots()
+
+
+def balances_as_of(day, stock_id=None, raw_material_id=None):
+    """``{(stock_id, raw_material_id): quantity}`` at the close of ``day``,
+    for the pairs that had any receipt line by then."""
+    states = select(StockSnapshotState.stock_id, StockSnapshotState.snapshot_through)
+    if stock_id is not None:
+        states = states.where(StockSnapshotState.stock_id == stock_id)
+    watermarks = dict(db.session.execute(states).all())
+
+    # Never read past a stock's watermark: later rows may be stale.
+    balances = _latest_snapshots(
+        {state_stock_id: min(day, through) for state_stock_id, through in watermarks.items()},
+        raw_material_id)
+
+    # Receipts after the watermark, and every receipt of a stock never snapshotted.
+    pending = [and_(Receipt.stock_id == state_stock_id, Receipt.created_date > through)
+               for state_stock_id, through in watermarks.items() if through < day]
+    if stock_id is None:
+        pending.append(Receipt.stock_id.notin_(list(watermarks)))
+    elif stock_id not in watermarks:
+        pending.append(Receipt.stock_id == stock_id)
+    if pending:
+        statement = (
+            select(
+                Receipt.stock_id,
+                ReceiptRawMaterial.raw_material_id,
+                func.sum(ReceiptRawMaterial.quantity),
+                func.count(ReceiptRawMaterial.id)
+            )
+            .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
+            .where(Receipt.created_date <= day, or_(*pending))
+            .group_by(Receipt.stock_id, ReceiptRawMaterial.raw_material_id)
+        )
+        if raw_material_id is not None:
+            statement = statement.where(ReceiptRawMaterial.raw_material_id == raw_material_id)
+        for row_stock_id, row_raw_material_id, quantity, line_count in db.session.execute(statement):
+            entry = balances.setdefault((row_stock_id, row_raw_material_id), [Decimal('0'), 0])
+            entry[0] += _to_quantity(quantity)
+            entry[1] += line_count
+
+    return {key: quantity for key, (quantity, line_count) in balances.items() if line_count > 0}
+
+
+def compute_balances_as_of(day, stock_id=None):
+    """``balances_as_of`` the slow way, summing every receipt line up to ``day``."""
+    statement = (
+        select(
+            Receipt.stock_id,
+            ReceiptRawMaterial.raw_material_id,
+            func.sum(ReceiptRawMaterial.quantity)
+        )
+        .join(Receipt, Receipt.id == ReceiptRawMaterial.receipt_id)
+        .where(Receipt.created_date <= day)
+        .group_by(Receipt.stock_id, ReceiptRawMaterial.raw_material_id)
+    )
+    if stock_id is not None:
+        statement = statement.where(Receipt.stock_id == stock_id)
+    return {
+        (row_stock_id, raw_material_id): _to_quantity(quantity)
+        for row_stock_id, raw_material_id, quantity in db.session.execute(statement)
+    }
+
+
+def verify_stock_snapshots():
+    """Compare each stock's balances on its watermark day with the receipts;
+    return ``{(stock_id, raw_material_id, day): (expected, stored)}``."""
+    mismatches = {}
+    for state in db.session.execute(select(StockSnapshotState)).scalars().all():
+        day = state.snapshot_through
+        expected = compute_balances_as_of(day, state.stock_id)
+        stored = {
+            key: quantity
+            for key, (quantity, line_count) in _latest_snapshots({state.stock_id: day}).items()
+        }
+        for key in expected.keys() | stored.keys():
+            if expected.get(key) != stored.get(key):
+                mismatches[key + (day,)] = (expected.get(key), stored.get(key))
+    return mismatches
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from sqlalchemy import event, select
+from src.api.utils.database import db
+from src.api.utils.counters import increment_row
+from src.api.models import TableVersion, ImsTableVersion
+
+VERSION_MODELS = {
+    None: TableVersion,
+    'IMS_db': ImsTableVersion,
+}
+VERSION_TABLE_NAME = 'table_versions'
+
+
+def table_bind_key(table):
+    return table.metadata.info.get('bind_key')
+
+
+def _changed_tables(session):
+    return session.info.setdefault('changed_tables', set())
+
+
+def _track_table(session, table):
+    if table is not None and table.name != VERSION_TABLE_NAME:
+        _changed_tables(session).add((table_bind_key(table), table.name))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_flushed_tables(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        _track_table(session, getattr(instance, '__table__', None))
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _track_table(orm_execute_state.session,
+                     getattr(orm_execute_state.statement, 'table', None))
+
+
+@event.listens_for(db.session, 'before_commit')
+def _collect_changes(session):
+    # Flush first so tables touched by pending objects are tracked too.
+    session.flush()
+    changed = session.info.pop('changed_tables', None)
+    if changed:
+        session.info.setdefault('committing_tables', set()).update(changed)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_versions(session):
+    """Bump the versions of the committed tables, each in its own short
+    transaction.
+
+    Bumping inside the write's transaction would hold the version row's
+    lock until that commit, queueing every concurrent writer of the table
+    behind it. Bumped after the commit, a reader that sees the new version
+    also sees the new rows; a crash in between leaves the old version up
+    until the table's next write.
+    """
+    changed = session.info.pop('committing_tables', None)
+    if not changed:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    by_bind = {}
+    for bind_key, table_name in changed:
+        by_bind.setdefault(bind_key, []).append(table_name)
+    for bind_key, table_names in sorted(by_bind.items(), key=lambda item: item[0] or ''):
+        with db.engines[bind_key].begin() as connection:
+            for table_name in sorted(table_names):
+                increment_row(VERSION_MODELS[bind_key], {'table_name': table_name},
+                              {'version': 1}, {'updated_at': now}, connection=connection)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changes(session):
+    session.info.pop('changed_tables', None)
+    session.info.pop('committing_tables', None)
+
+
+def get_table_versions(table_names):
+    """Return ``{table_name: (version, updated_at)}`` for the given tables.
+
+    Tables never written since tracking started report ``(0, None)``.
+    """
+    bind_keys = {}
+    for bind_key, metadata in db.metadatas.items():
+        for table_name in table_names:
+            if table_name in metadata.tables:
+                bind_keys.setdefault(bind_key, []).append(table_name)
+
+    versions = {table_name: (0, None) for table_name in table_names}
+    for bind_key, names in bind_keys.items():
+        model = VERSION_MODELS[bind_key]
+        for table_name, version, updated_at in db.session.execute(
+            select(model.table_name, model.version, model.updated_at)
+            .where(model.table_name.in_(names))
+        ):
+            versions[table_name] = (version, updated_at)
+    return versions
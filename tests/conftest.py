@@ -0,0 +1,82 @@
+import pytest
+from main import create_app
+from src.api.config.config import TestingConfig
+from src.api.utils.database import db
+from src.api.utils.migrations import upgrade_database
+
+
+def make_app(pms_url='sqlite://', ims_url='sqlite://', **settings):
+    config = type('Config', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': pms_url,
+        'SQLALCHEMY_BINDS': {'IMS_db': ims_url},
+        'CACHE_BACKEND': 'null',
+        **settings,
+    })
+    return create_app(config)
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """An app on SQLite files under ``tmp_path``, with no schema yet."""
+    app = make_app(f"sqlite:///{tmp_path / 'pms.db'}", f"sqlite:///{tmp_path / 'ims.db'}")
+    with app.app_context():
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def app():
+    """An app on in-memory SQLite, migrated, with the per-process cache."""
+    app = make_app(CACHE_BACKEND='memory')
+    with app.app_context():
+        upgrade_database()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def seed_api(client, size):
+    """Create ``size`` rows of every kind through the API, with a mix of set
+    and empty optional fields, plus one invoice and one receipt of three
+    lines per row."""
+    client.post('/api/suppliers/', json=[
+        {'name': f'Supplier {index}', 'email': f'supplier{index}@example.com' if index % 2 else None}
+        for index in range(size)
+    ])
+    client.post('/api/goods/', json=[
+        {'name': f'Goods {index}', 'material_code': f'M{index}', 'convert_rate': (1, 2.5, 10)[index % 3],
+         'goods_unit': 'kg', 'supplier_id': 1 + index % size}
+        for index in range(size)
+    ])
+    client.post('/api/categories/', json=[{'name': f'Category {index}'} for index in range(size)])
+    client.post('/api/raw-materials/', json=[
+        {'code': f'M{index}', 'name': f'Material {index}', 'default_unit': 'kg',
+         'category_id': 1 + index % size if index else None}
+        for index in range(size)
+    ])
+    client.post('/api/stocks/', json=[{'stock_code': f'ST{index}'} for index in range(size)])
+    for index in range(size):
+        invoice = client.post('/api/invoices/', json={
+            'invoice': {'code': f'INV-{index}', 'created_date': f'2026-01-{index % 28 + 1:02d}',
+                        'supplier_id': 1 + index % size},
+            'list_of_bought_goods': [
+                {'goods_id': 1 + (index + line) % size, 'buy_quantity': f'{line + 1}.25',
+                 'buying_price_per_unit': '10', **({'vat_precentage': '0.08'} if line else {})}
+                for line in range(3)
+            ],
+        })
+        receipt = client.post('/api/receipts/', json={
+            'receipt': {'receipt_code': f'R-{index}', 'created_date': f'2026-02-{index % 28 + 1:02d}',
+                        'stock_id': 1 + index % size},
+            'list_of_raw_materials': [
+                {'raw_material_id': 1 + (index + line) % size, 'quantity': f'{line + 1}.5'}
+                for line in range(3)
+            ],
+        })
+        assert invoice.status_code == 201 and receipt.status_code == 201
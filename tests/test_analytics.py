@@ -0,0 +1,84 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import update
+from src.api.utils.database import db
+from src.api.utils.analytics import backfill_rollups, verify_rollups
+from src.api.utils.material_costs import verify_material_costs
+from src.api.models import GoodsCost, GoodsCostDaily
+
+# Monday 5 and Wednesday 7 January share a week; Monday 12 starts the next.
+DAYS = ('2026-01-05', '2026-01-07', '2026-01-12', '2026-02-02')
+
+
+@pytest.fixture
+def seeded(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    client.post('/api/goods/', json={
+        'name': 'Flour 25kg', 'material_code': 'FLOUR', 'convert_rate': 25,
+        'goods_unit': 'bag', 'supplier_id': 1})
+    client.post('/api/raw-materials/', json=[{'code': 'FLOUR', 'name': 'Flour', 'default_unit': 'kg'}])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}])
+    for index, day in enumerate(DAYS):
+        client.post('/api/invoices/', json={
+            'invoice': {'code': f'INV-{index}', 'created_date': day, 'supplier_id': 1},
+            'list_of_bought_goods': [
+                {'goods_id': 1, 'buy_quantity': str(index + 1), 'buying_price_per_unit': '100'}]})
+        client.post('/api/receipts/', json={
+            'receipt': {'receipt_code': f'R-{index}', 'created_date': day, 'stock_id': 1},
+            'list_of_raw_materials': [{'raw_material_id': 1, 'quantity': str(10 * (index + 1))}]})
+    return client
+
+
+@pytest.mark.parametrize('bucket, expected', [
+    ('day', [('2026-01-05', '25.000', '100.000', 1), ('2026-01-07', '50.000', '200.000', 1),
+             ('2026-01-12', '75.000', '300.000', 1), ('2026-02-02', '100.000', '400.000', 1)]),
+    ('week', [('2026-01-05', '75.000', '300.000', 2), ('2026-01-12', '75.000', '300.000', 1),
+              ('2026-02-02', '100.000', '400.000', 1)]),
+    ('month', [('2026-01-01', '150.000', '600.000', 3), ('2026-02-01', '100.000', '400.000', 1)]),
+])
+def test_purchases_are_bucketed_in_base_units(seeded, bucket, expected):
+    response = seeded.get(f'/api/analytics/purchases?bucket={bucket}')
+
+    assert response.status_code == 200
+    assert [(row['bucket'], row['quantity'], row['total_cost'], row['line_count'])
+            for row in response.get_json()] == expected
+    assert {row['material_code'] for row in response.get_json()} == {'FLOUR'}
+
+
+@pytest.mark.parametrize('bucket, expected', [
+    ('day', [('2026-01-05', '10.000'), ('2026-01-07', '20.000'),
+             ('2026-01-12', '30.000'), ('2026-02-02', '40.000')]),
+    ('week', [('2026-01-05', '30.000'), ('2026-01-12', '30.000'), ('2026-02-02', '40.000')]),
+    ('month', [('2026-01-01', '60.000'), ('2026-02-01', '40.000')]),
+])
+def test_receipts_are_bucketed(seeded, bucket, expected):
+    response = seeded.get(f'/api/analytics/receipts?bucket={bucket}')
+
+    assert [(row['bucket'], row['quantity']) for row in response.get_json()] == expected
+
+
+def test_the_date_window_is_inclusive(seeded):
+    response = seeded.get('/api/analytics/receipts?bucket=month&date_from=2026-01-07&date_to=2026-01-12')
+
+    assert [(row['bucket'], row['quantity']) for row in response.get_json()] == [('2026-01-01', '50.000')]
+
+
+@pytest.mark.parametrize('query', ['bucket=year', 'date_from=05-01-2026',
+                                   'date_from=2026-02-01&date_to=2026-01-01'])
+def test_bad_arguments_are_a_422(seeded, query):
+    assert seeded.get(f'/api/analytics/purchases?{query}').status_code == 422
+
+
+def test_backfill_rebuilds_the_rollups_and_the_cost_totals(seeded):
+    db.session.execute(update(GoodsCostDaily).values(buy_quantity=0, line_count=7))
+    db.session.execute(update(GoodsCost).values(buy_quantity=Decimal('999'), total_cost=0))
+    db.session.commit()
+    assert verify_rollups() and verify_material_costs()
+
+    written = backfill_rollups(chunk_days=7)
+
+    assert written == {'goods_cost_daily': 4, 'goods_costs': 1, 'receipt_daily': 4}
+    assert verify_rollups() == {}
+    assert verify_material_costs() == {}
+    cost = db.session.get(GoodsCost, 1)
+    assert (cost.buy_quantity, cost.total_cost, cost.line_count) == (Decimal('10'), Decimal('1000'), 4)
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import select, func
+from src.api.utils.database import db
+from src.api.models import StockSnapshot
+from src.api.utils.stock_snapshots import (
+    build_stock_snapshots, balances_as_of, compute_balances_as_of, verify_stock_snapshots)
+
+
+def _seed(client):
+    client.post('/api/raw-materials/', json=[{'code': 'FLOUR', 'name': 'Flour', 'default_unit': 'kg'}])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}])
+    for code, day, quantity in (('R1', '2026-01-03', '10'), ('R2', '2026-01-10', '-4')):
+        client.post('/api/receipts/', json={
+            'receipt': {'receipt_code': code, 'created_date': day, 'stock_id': 1},
+            'list_of_raw_materials': [{'raw_material_id': 1, 'quantity': quantity}]})
+
+
+def test_stock_as_of_lists_only_receipts_up_to_that_day(client):
+    _seed(client)
+
+    stock = client.get('/api/stocks/1?as_of=2026-01-05').get_json()
+
+    assert [receipt['receipt_code'] for receipt in stock['receipts']] == ['R1']
+    assert stock['stock_item'] == [{'material_code': 'FLOUR', 'total_stock_quantity': '10.0'}]
+    assert len(client.get('/api/stocks/1').get_json()['receipts']) == 2
+
+
+def test_raw_material_as_of_lists_only_movements_up_to_that_day(client):
+    _seed(client)
+
+    raw_material = client.get('/api/raw-materials/1?as_of=2026-01-05').get_json()
+
+    assert [movement['quantity'] for movement in raw_material['movement_history']] == ['10.000']
+    assert raw_material['total_stock_quantity'] == '10.0'
+    assert len(client.get('/api/raw-materials/1').get_json()['movement_history']) == 2
+
+
+def test_snapshots_hold_a_row_per_movement_and_answer_every_day(client):
+    client.post('/api/raw-materials/', json=[
+        {'code': 'FLOUR', 'name': 'Flour', 'default_unit': 'kg'},
+        {'code': 'SUGAR', 'name': 'Sugar', 'default_unit': 'kg'},
+    ])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}, {'stock_code': 'ST2'}])
+    receipts = (
+        ('R1', '2026-01-03', 1, [(1, '10'), (2, '5')]),
+        ('R2', '2026-01-08', 1, [(1, '-4')]),
+        ('R3', '2026-01-08', 2, [(2, '7')]),
+        ('R4', '2026-01-15', 1, [(2, '-5')]),
+    )
+    for code, day, stock_id, lines in receipts:
+        client.post('/api/receipts/', json={
+            'receipt': {'receipt_code': code, 'created_date': day, 'stock_id': stock_id},
+            'list_of_raw_materials': [
+                {'raw_material_id': raw_material_id, 'quantity': quantity}
+                for raw_material_id, quantity in lines
+            ]})
+
+    build_stock_snapshots(date(2026, 1, 31))
+
+    # (ST1, FLOUR) x 2 days, (ST1, SUGAR) x 2 days, (ST2, SUGAR) x 1 day.
+    assert db.session.scalar(select(func.count()).select_from(StockSnapshot)) == 5
+    for day in (date(2026, 1, 1) + timedelta(days=offset) for offset in range(40)):
+        assert balances_as_of(day) == compute_balances_as_of(day), day
+
+    client.post('/api/receipts/', json={
+        'receipt': {'receipt_code': 'R5', 'created_date': '2026-01-05', 'stock_id': 1},
+        'list_of_raw_materials': [{'raw_material_id': 1, 'quantity': '2'}]})
+    assert balances_as_of(date(2026, 1, 20))[(1, 1)] == Decimal('8.000')
+
+    build_stock_snapshots(date(2026, 1, 31))
+
+    assert db.session.scalar(select(func.count()).select_from(StockSnapshot)) == 6
+    assert verify_stock_snapshots() == {}
+    for day in (date(2026, 1, 1) + timedelta(days=offset) for offset in range(40)):
+        assert balances_as_of(day) == compute_balances_as_of(day), day
@@ -0,0 +1,117 @@
+from decimal import Decimal
+from sqlalchemy import select
+from src.api.utils.database import db
+from src.api.utils.material_costs import verify_material_costs
+from src.api.utils.stock_ledger import verify_stock_balances
+from src.api.models import GoodsCost, StockBalance
+
+
+def _seed_goods(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    for index in range(2):
+        client.post('/api/goods/', json={
+            'name': f'Goods {index}', 'material_code': f'M{index}', 'convert_rate': 1,
+            'goods_unit': 'kg', 'supplier_id': 1})
+
+
+def _seed_stock(client):
+    client.post('/api/raw-materials/', json=[
+        {'code': f'RM{index}', 'name': f'Material {index}', 'default_unit': 'kg'}
+        for index in range(2)
+    ])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}])
+
+
+def _receipt(code, quantities, day='2026-01-03'):
+    return {
+        'receipt': {'receipt_code': code, 'created_date': day, 'stock_id': 1},
+        'list_of_raw_materials': [
+            {'raw_material_id': index + 1, 'quantity': quantity}
+            for index, quantity in enumerate(quantities)
+        ],
+    }
+
+
+def _balances():
+    return {
+        balance.raw_material_id: balance.quantity
+        for balance in db.session.scalars(select(StockBalance))
+    }
+
+
+def test_invoice_batch_updates_the_goods_costs(client):
+    _seed_goods(client)
+
+    response = client.post('/api/invoices/batch', json=[
+        {'invoice': {'code': f'INV-{index}', 'created_date': f'2026-01-0{index + 1}', 'supplier_id': 1},
+         'list_of_bought_goods': [
+             {'goods_id': 1, 'buy_quantity': '2', 'buying_price_per_unit': '10'},
+             {'goods_id': 2, 'buy_quantity': '1.5', 'buying_price_per_unit': '4'},
+         ]}
+        for index in range(2)
+    ])
+
+    assert response.status_code == 201
+    assert response.get_json()['ids'] == [1, 2]
+    costs = {cost.goods_id: (cost.buy_quantity, cost.total_cost, cost.line_count)
+             for cost in db.session.scalars(select(GoodsCost))}
+    assert costs == {1: (Decimal('4'), Decimal('40'), 2), 2: (Decimal('3'), Decimal('12'), 2)}
+    assert verify_material_costs() == {}
+
+
+def test_receipt_batch_updates_the_stock_balances(client):
+    _seed_stock(client)
+
+    response = client.post('/api/receipts/batch', json=[
+        _receipt('R1', ['10', '2.5']), _receipt('R2', ['1'], day='2026-01-04')])
+
+    assert response.status_code == 201
+    assert response.get_json()['inserted'] == 2
+    assert _balances() == {1: Decimal('11'), 2: Decimal('2.5')}
+    assert verify_stock_balances() == {}
+
+
+def test_atomic_batch_writes_nothing_when_one_document_is_invalid(client):
+    _seed_stock(client)
+
+    response = client.post('/api/receipts/batch', json=[
+        _receipt('R1', ['10']), _receipt('R2', ['not a number']), _receipt('R3', ['1'])])
+
+    assert response.status_code == 422
+    assert response.get_json()['ids'] == [None, None, None]
+    assert list(response.get_json()['errors']) == ['1']
+    assert list(response.get_json()['errors']['1']['list_of_raw_materials']) == ['0']
+    assert client.get('/api/receipts/').get_json()['data'] == []
+    assert _balances() == {}
+
+
+def test_atomic_batch_rolls_back_when_the_database_rejects_a_document(client):
+    _seed_stock(client)
+    client.post('/api/receipts/batch', json=[_receipt('R1', ['10'])])
+
+    response = client.post('/api/receipts/batch', json=[
+        _receipt('R2', ['5']), _receipt('R1', ['7'])])
+
+    assert response.status_code == 422
+    assert '_database' in response.get_json()['errors']
+    assert [receipt['receipt_code'] for receipt in client.get('/api/receipts/').get_json()['data']] == ['R1']
+    assert _balances() == {1: Decimal('10')}
+
+
+def test_partial_batch_reports_failed_documents_by_index(app, client):
+    app.config['BATCH_CHUNK_SIZE'] = 4
+    _seed_stock(client)
+    client.post('/api/receipts/batch', json=[_receipt('R1', ['10'])])
+
+    response = client.post('/api/receipts/batch?mode=partial', json=[
+        _receipt('R2', ['1']), {'receipt': {'receipt_code': 'R3'}},
+        _receipt('R1', ['7']), _receipt('R4', ['2', '3'])])
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['ids'] == [2, None, None, 3]
+    assert body['inserted'] == 2
+    assert sorted(body['errors']) == ['1', '2']
+    assert list(body['errors']['2']) == ['_database']
+    assert _balances() == {1: Decimal('13'), 2: Decimal('3')}
+    assert verify_stock_balances() == {}
@@ -0,0 +1,127 @@
+from sqlalchemy import event
+from src.api.utils.bulk import bulk_create, bulk_update
+from src.api.utils.database import db
+from src.api.models import Category
+from src.api.schemas.all_schemas import CategorySchema
+
+
+def _names(client):
+    return [category['name'] for category in client.get('/api/categories/').get_json()['data']]
+
+
+def test_bulk_create_returns_ids_in_input_order(app, client):
+    app.config['BULK_CHUNK_SIZE'] = 2
+    response = client.post('/api/categories/?bulk=atomic',
+                           json=[{'name': f'Category {index}'} for index in range(5)])
+
+    assert response.status_code == 201
+    assert response.get_json()['ids'] == [1, 2, 3, 4, 5]
+    assert response.get_json()['inserted'] == 5
+    assert _names(client) == [f'Category {index}' for index in range(5)]
+
+
+def test_atomic_mode_inserts_nothing_when_a_row_is_invalid(client):
+    response = client.post('/api/categories/?bulk=atomic',
+                           json=[{'name': 'Dry goods'}, {}, {'name': 'Dairy'}])
+
+    assert response.status_code == 422
+    assert response.get_json()['ids'] == [None, None, None]
+    assert list(response.get_json()['errors']) == ['1']
+    assert _names(client) == []
+
+
+def test_atomic_mode_inserts_nothing_when_the_database_rejects_a_row(client):
+    client.post('/api/categories/', json=[{'name': 'Dairy'}])
+
+    response = client.post('/api/categories/?bulk=atomic',
+                           json=[{'name': 'Dry goods'}, {'name': 'Dairy'}])
+
+    assert response.status_code == 422
+    assert '_database' in response.get_json()['errors']
+    assert _names(client) == ['Dairy']
+
+
+def test_partial_mode_reports_invalid_rows_and_inserts_the_rest(client):
+    response = client.post('/api/categories/?bulk=partial',
+                           json=[{'name': 'Dry goods'}, {}, {'name': 'Dairy'}])
+
+    assert response.status_code == 201
+    assert response.get_json()['ids'] == [1, None, 2]
+    assert response.get_json()['inserted'] == 2
+    assert list(response.get_json()['errors']) == ['1']
+
+
+def test_partial_mode_narrows_a_rejected_chunk_to_the_offending_rows(app):
+    app.config['BULK_CHUNK_SIZE'] = 3
+    bulk_create(Category, CategorySchema, [{'name': 'Dairy'}])
+
+    ids, errors = bulk_create(Category, CategorySchema, [
+        {'name': 'Dry goods'}, {'name': 'Dairy'}, {'name': 'Frozen'}, {'name': 'Spices'},
+    ], mode='partial')
+
+    assert ids == [2, None, 3, 4]
+    assert list(errors) == [1]
+    assert list(errors[1]) == ['_database']
+    assert [category.name for category in Category.query.order_by(Category.id)] == [
+        'Dairy', 'Dry goods', 'Frozen', 'Spices']
+
+
+def _seed_categories(client, count):
+    client.post('/api/categories/?bulk=atomic',
+                json=[{'name': f'Category {index}'} for index in range(count)])
+
+
+def test_bulk_update_applies_every_row_and_returns_them_in_input_order(client):
+    _seed_categories(client, 3)
+
+    response = client.put('/api/categories/', json=[
+        {'id': 3, 'name': 'Spices'}, {'id': 1, 'name': 'Dairy'}])
+
+    assert response.status_code == 200
+    assert [(category['id'], category['name']) for category in response.get_json()] == [
+        (3, 'Spices'), (1, 'Dairy')]
+    assert _names(client) == ['Dairy', 'Category 1', 'Spices']
+
+
+def test_bulk_update_reports_every_missing_id_and_writes_nothing(client):
+    _seed_categories(client, 2)
+
+    response = client.put('/api/categories/', json=[
+        {'id': 9, 'name': 'Spices'}, {'id': 1, 'name': 'Dairy'}, {'id': 7, 'name': 'Frozen'}])
+
+    assert response.status_code == 404
+    assert response.get_json()['errors'] == {'missing_ids': [7, 9]}
+    assert _names(client) == ['Category 0', 'Category 1']
+
+
+def test_bulk_update_reports_invalid_rows_together(client):
+    _seed_categories(client, 3)
+
+    response = client.put('/api/categories/', json=[
+        {'name': 'No id'}, {'id': 2, 'name': 'Dairy'}, {'id': 'x'}])
+
+    assert response.status_code == 422
+    assert sorted(response.get_json()['errors']) == ['0', '2']
+    assert _names(client) == ['Category 0', 'Category 1', 'Category 2']
+
+
+def test_bulk_update_looks_ids_up_in_chunks(app, client):
+    _seed_categories(client, 5)
+    app.config['BULK_CHUNK_SIZE'] = 2
+    lookups = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and ' IN ' in statement:
+            lookups.append(parameters)
+
+    engine = db.session.get_bind(mapper=Category.__mapper__)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        ids, errors, missing_ids = bulk_update(Category, CategorySchema, [
+            {'id': row_id, 'name': f'Renamed {row_id}'} for row_id in range(1, 6)])
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert (ids, errors, missing_ids) == ([1, 2, 3, 4, 5], {}, [])
+    assert [len(parameters) for parameters in lookups] == [2, 2, 1]
+    assert _names(client) == [f'Renamed {row_id}' for row_id in range(1, 6)]
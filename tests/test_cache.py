@@ -0,0 +1,69 @@
+from src.api.utils.export import NDJSON_MIMETYPE
+from src.api.config.config import default_cache_backend
+from src.api.utils.database import db
+from src.api.models import Category
+
+
+def test_cached_json_is_not_served_to_ndjson_clients(client):
+    url = '/api/raw-materials/reconciliation/'
+    assert client.get(url).headers['X-Cache'] == 'MISS'
+    assert client.get(url).headers['X-Cache'] == 'HIT'
+
+    response = client.get(url, headers={'Accept': NDJSON_MIMETYPE})
+    assert response.headers.get('X-Cache') != 'HIT'
+    assert response.mimetype == NDJSON_MIMETYPE
+
+
+def test_default_backend_is_redis_when_configured():
+    assert default_cache_backend('redis://cache:6379/0') == 'redis'
+    assert default_cache_backend(None) == 'memory'
+
+
+def _seed_stock(client):
+    client.post('/api/raw-materials/', json=[{'code': 'FLOUR', 'name': 'Flour', 'default_unit': 'kg'}])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}])
+
+
+def _stats(client):
+    return client.get('/api/cache/stats').get_json()
+
+
+def test_a_write_through_another_resource_invalidates_dependent_lists(client):
+    _seed_stock(client)
+    before = _stats(client)
+
+    assert client.get('/api/stocks/').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/stocks/').headers['X-Cache'] == 'HIT'
+    client.post('/api/receipts/', json={
+        'receipt': {'receipt_code': 'R1', 'created_date': '2026-01-03', 'stock_id': 1},
+        'list_of_raw_materials': [{'raw_material_id': 1, 'quantity': '10'}]})
+    response = client.get('/api/stocks/')
+
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [receipt['receipt_code'] for receipt in response.get_json()['data'][0]['receipts']] == ['R1']
+    after = _stats(client)
+    assert after['hits'] - before['hits'] == 1
+    assert after['misses'] - before['misses'] == 2
+
+
+def test_a_write_outside_any_request_invalidates_too(client):
+    client.post('/api/categories/', json=[{'name': 'Dry goods'}])
+    assert client.get('/api/categories/').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/categories/').headers['X-Cache'] == 'HIT'
+
+    # As a CLI command or backfill would write.
+    db.session.add(Category('Dairy'))
+    db.session.commit()
+    response = client.get('/api/categories/')
+
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [category['name'] for category in response.get_json()['data']] == ['Dry goods', 'Dairy']
+
+
+def test_a_write_to_an_unrelated_table_keeps_the_entry(client):
+    client.post('/api/categories/', json=[{'name': 'Dry goods'}])
+    client.get('/api/categories/')
+
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+
+    assert client.get('/api/categories/').headers['X-Cache'] == 'HIT'
@@ -0,0 +1,38 @@
+from src.api.utils.table_versions import get_table_versions
+
+
+def test_matching_if_none_match_gets_304_without_a_body(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    first = client.get('/api/suppliers/')
+
+    again = client.get('/api/suppliers/', headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.headers['ETag']
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_a_write_changes_the_etag_of_dependent_lists(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    before = client.get('/api/goods/').headers['ETag']
+
+    client.post('/api/goods/', json={
+        'name': 'Flour', 'material_code': 'FLOUR', 'convert_rate': 1, 'goods_unit': 'kg',
+        'supplier_id': 1})
+    after = client.get('/api/goods/', headers={'If-None-Match': before})
+
+    assert after.status_code != 304
+    assert after.headers['ETag'] != before
+    assert [goods['name'] for goods in after.get_json()['data']] == ['Flour']
+
+
+def test_only_committed_writes_bump_the_version(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    version, updated_at = get_table_versions(['suppliers'])['suppliers']
+
+    rejected = client.post('/api/suppliers/', json=[{'email': 'no-name@example.com'}])
+
+    assert rejected.status_code == 422
+    assert get_table_versions(['suppliers'])['suppliers'] == (version, updated_at)
+    assert version > 0
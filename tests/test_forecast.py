@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+import pytest
+from src.api.utils.forecast import material_forecast
+
+pytest.importorskip('numpy')
+
+TODAY = date(2026, 3, 1)
+# (code, received before the window, issued per day, issued on odd days only)
+MATERIALS = [
+    ('A', '100', '2', False),
+    ('B', '122', '4', False),
+    ('C', '30', None, False),
+    ('D', '200', '6', True),
+]
+
+
+@pytest.fixture
+def seeded(client):
+    client.post('/api/raw-materials/', json=[
+        {'code': code, 'name': f'Material {code}', 'default_unit': 'kg'} for code, *_ in MATERIALS])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}])
+    client.post('/api/receipts/', json={
+        'receipt': {'receipt_code': 'IN', 'created_date': '2026-01-15', 'stock_id': 1},
+        'list_of_raw_materials': [
+            {'raw_material_id': index + 1, 'quantity': received}
+            for index, (_, received, _, _) in enumerate(MATERIALS)]})
+    # The 28 days before TODAY, the default window.
+    for day_index in range(28):
+        day = TODAY - timedelta(days=28 - day_index)
+        client.post('/api/receipts/', json={
+            'receipt': {'receipt_code': f'OUT-{day_index}', 'created_date': day.isoformat(), 'stock_id': 1},
+            'list_of_raw_materials': [
+                {'raw_material_id': index + 1, 'quantity': f'-{issued}'}
+                for index, (_, _, issued, odd_days) in enumerate(MATERIALS)
+                if issued and (not odd_days or day_index % 2)]})
+    return client
+
+
+def test_forecast_projects_known_consumption(seeded):
+    rows = {row['code']: row for row in material_forecast(today=TODAY)}
+
+    assert [row['code'] for row in material_forecast(today=TODAY)] == ['B', 'A', 'D', 'C']
+
+    # 2 a day, steady: no safety stock, 44 left lasts 22 days.
+    assert rows['A']['on_hand'] == '44.0'
+    assert rows['A']['average_daily_usage'] == '2.0'
+    assert rows['A']['usage_deviation'] == '0.0'
+    assert rows['A']['reorder_point'] == '14.0'
+    assert rows['A']['days_of_cover'] == 22.0
+    assert rows['A']['stockout_date'] == '2026-03-23'
+    assert rows['A']['reorder'] is False
+    assert rows['A']['suggested_quantity'] == '0.0'
+
+    # 10 left at 4 a day is below the 28 reorder point: top up to 28 + 14 x 4.
+    assert rows['B']['days_of_cover'] == 2.5
+    assert rows['B']['stockout_date'] == '2026-03-03'
+    assert rows['B']['reorder'] is True
+    assert rows['B']['suggested_quantity'] == '74.0'
+
+    # 6 every other day: mean 3, deviation 3, so 7 x 3 + 1.65 x 3 x sqrt(7).
+    assert rows['D']['on_hand'] == '116.0'
+    assert rows['D']['average_daily_usage'] == '3.0'
+    assert rows['D']['recent_daily_usage'] == '3.429'
+    assert rows['D']['usage_deviation'] == '3.0'
+    assert rows['D']['reorder_point'] == '34.096'
+    assert rows['D']['days_of_cover'] == 38.7
+    assert rows['D']['reorder'] is False
+
+    # Never issued: no projection.
+    assert rows['C']['on_hand'] == '30.0'
+    assert rows['C']['days_of_cover'] is None
+    assert rows['C']['stockout_date'] is None
+    assert rows['C']['reorder'] is False
+
+
+def test_usage_before_the_window_is_ignored(seeded):
+    # A week on, a 7-day window holds none of the issues.
+    rows = {row['code']: row for row in material_forecast(window_days=7, today=TODAY + timedelta(days=7))}
+
+    assert rows['A']['average_daily_usage'] == '0.0'
+    assert rows['A']['days_of_cover'] is None
+
+
+@pytest.mark.parametrize('query', ['window_days=0', 'lead_time_days=x', 'window_days=366'])
+def test_bad_forecast_arguments_are_a_422(client, query):
+    assert client.get(f'/api/raw-materials/forecast?{query}').status_code == 422
@@ -0,0 +1,70 @@
+def test_invoice_create_replays_the_stored_response(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    for index in range(8):
+        client.post('/api/goods/', json={
+            'name': f'Goods {index}', 'material_code': f'M{index}', 'convert_rate': 1,
+            'goods_unit': 'kg', 'supplier_id': 1})
+    body = {
+        'invoice': {'code': 'INV-1', 'created_date': '2026-01-02', 'supplier_id': 1},
+        'list_of_bought_goods': [
+            {'goods_id': index + 1, 'buy_quantity': '1.5', 'buying_price_per_unit': '10'}
+            for index in range(8)
+        ],
+    }
+    headers = {'Idempotency-Key': 'invoice-1'}
+
+    created = client.post('/api/invoices/', json=body, headers=headers)
+    replayed = client.post('/api/invoices/', json=body, headers=headers)
+
+    assert created.status_code == 201
+    lines = created.get_json()['list_of_bought_goods']
+    assert [line['buy_quantity'] for line in lines] == ['1.500'] * 8
+    assert replayed.status_code == 201
+    assert replayed.get_data() == created.get_data()
+
+
+def _receipt_body(quantity='2.5'):
+    return {
+        'receipt': {'receipt_code': 'R-1', 'created_date': '2026-01-03', 'stock_id': 1},
+        'list_of_raw_materials': [
+            {'raw_material_id': index + 1, 'quantity': quantity} for index in range(3)
+        ],
+    }
+
+
+def _seed_receipt_refs(client):
+    client.post('/api/raw-materials/', json=[
+        {'code': f'RM{index}', 'name': f'Material {index}', 'default_unit': 'kg'}
+        for index in range(3)
+    ])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}])
+
+
+def test_receipt_create_replays_the_stored_response(client):
+    _seed_receipt_refs(client)
+    headers = {'Idempotency-Key': 'receipt-1'}
+
+    created = client.post('/api/receipts/', json=_receipt_body(), headers=headers)
+    replayed = client.post('/api/receipts/', json=_receipt_body(), headers=headers)
+
+    assert created.status_code == 201
+    receipt = created.get_json()
+    assert receipt['receipt_code'] == 'R-1'
+    assert receipt['stock'] == {'stock_code': 'ST1'}
+    assert [line['quantity'] for line in receipt['list_of_raw_materials']] == ['2.500'] * 3
+    assert replayed.status_code == 201
+    assert replayed.headers['Idempotent-Replayed'] == 'true'
+    assert replayed.get_data() == created.get_data()
+    assert len(client.get('/api/receipts/').get_json()['data']) == 1
+
+
+def test_reusing_a_key_with_a_different_body_is_a_conflict(client):
+    _seed_receipt_refs(client)
+    headers = {'Idempotency-Key': 'receipt-1'}
+    client.post('/api/receipts/', json=_receipt_body(), headers=headers)
+
+    response = client.post('/api/receipts/', json=_receipt_body('4'), headers=headers)
+
+    assert response.status_code == 409
+    assert 'Idempotent-Replayed' not in response.headers
+    assert len(client.get('/api/receipts/').get_json()['data']) == 1
@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+import pytest
+from src.api.utils.line_items import merge_line_items, LineMergeError
+
+FIELDS = ('goods_id', 'buy_quantity')
+
+
+def _line(goods_id, buy_quantity, id=None):
+    return SimpleNamespace(id=id, goods_id=goods_id, buy_quantity=buy_quantity)
+
+
+def _merge(collection, incoming):
+    return merge_line_items(
+        collection, incoming, [_line(raw['goods_id'], raw['buy_quantity']) for raw in incoming],
+        match_attr='goods_id', fields=FIELDS)
+
+
+def test_lines_are_matched_by_id_first():
+    collection = [_line(1, 2, id=10), _line(1, 3, id=11)]
+
+    summary = _merge(collection, [{'id': 11, 'goods_id': 1, 'buy_quantity': 5}])
+
+    assert [(line.id, line.buy_quantity) for line in collection] == [(11, 5)]
+    assert summary == {'inserted': 0, 'updated': 1, 'deleted': 1, 'unchanged': 0}
+
+
+def test_lines_without_an_id_are_matched_by_key_in_order():
+    first, second, other = _line(1, 2, id=10), _line(1, 3, id=11), _line(2, 4, id=12)
+    collection = [first, second, other]
+
+    summary = _merge(collection, [
+        {'goods_id': 2, 'buy_quantity': 4},
+        {'goods_id': 1, 'buy_quantity': 7},
+        {'goods_id': 1, 'buy_quantity': 3},
+        {'goods_id': 3, 'buy_quantity': 1},
+    ])
+
+    assert collection[:3] == [first, second, other]
+    assert (first.buy_quantity, second.buy_quantity) == (7, 3)
+    assert [(line.id, line.goods_id) for line in collection[3:]] == [(None, 3)]
+    assert summary == {'inserted': 1, 'updated': 1, 'deleted': 0, 'unchanged': 2}
+
+
+def test_a_line_matched_by_id_is_not_claimed_by_key():
+    collection = [_line(1, 2, id=10), _line(1, 3, id=11)]
+
+    _merge(collection, [
+        {'goods_id': 1, 'buy_quantity': 8},
+        {'id': 10, 'goods_id': 1, 'buy_quantity': 2},
+    ])
+
+    assert [(line.id, line.buy_quantity) for line in collection] == [(10, 2), (11, 8)]
+
+
+def test_unmatched_lines_are_removed():
+    kept = _line(1, 2, id=10)
+    collection = [kept, _line(2, 3, id=11), _line(3, 4, id=12)]
+
+    summary = _merge(collection, [{'goods_id': 1, 'buy_quantity': 2}])
+
+    assert collection == [kept]
+    assert summary == {'inserted': 0, 'updated': 0, 'deleted': 2, 'unchanged': 1}
+
+
+@pytest.mark.parametrize('incoming, message', [
+    ([{'id': 99, 'goods_id': 1, 'buy_quantity': 1}], 'does not belong'),
+    ([{'id': 10, 'goods_id': 1, 'buy_quantity': 1}] * 2, 'more than once'),
+    ([{'id': 'x', 'goods_id': 1, 'buy_quantity': 1}], 'Invalid line id'),
+])
+def test_bad_line_ids_raise(incoming, message):
+    collection = [_line(1, 2, id=10)]
+
+    with pytest.raises(LineMergeError, match=message):
+        _merge(collection, incoming)
+
+
+def test_a_bad_line_id_is_a_422_and_leaves_the_invoice_alone(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    client.post('/api/goods/', json={
+        'name': 'Flour', 'material_code': 'M0', 'convert_rate': 1, 'goods_unit': 'kg', 'supplier_id': 1})
+    invoice = {'code': 'INV-1', 'created_date': '2026-01-02', 'supplier_id': 1}
+    client.post('/api/invoices/', json={'invoice': invoice, 'list_of_bought_goods': [
+        {'goods_id': 1, 'buy_quantity': '2', 'buying_price_per_unit': '10'}]})
+
+    response = client.put('/api/invoices/1', json={'invoice': invoice, 'list_of_bought_goods': [
+        {'id': 99, 'goods_id': 1, 'buy_quantity': '5', 'buying_price_per_unit': '10'}]})
+
+    assert response.status_code == 422
+    assert 'does not belong' in response.get_json()['message']
+    lines = client.get('/api/invoices/1').get_json()['list_of_bought_goods']
+    assert [line['buy_quantity'] for line in lines] == ['2.000']
@@ -0,0 +1,67 @@
+import re
+import pytest
+from tests.conftest import make_app
+from src.api.utils.metrics import PROMETHEUS_MIMETYPE
+
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? -?[0-9.e+-]+$')
+SERVER_TIMING = re.compile(
+    r'^db;desc="\d+ queries";dur=[0-9.]+, serialize;dur=[0-9.]+, total;dur=[0-9.]+$')
+
+
+def test_metrics_are_in_the_prometheus_text_format(client):
+    client.post('/api/categories/', json=[{'name': 'Dairy'}])
+    client.get('/api/categories/')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith(PROMETHEUS_MIMETYPE)
+    lines = response.get_data(as_text=True).splitlines()
+    for line in lines:
+        if line.startswith('# '):
+            assert re.match(r'^# (HELP [a-z_]+ .+|TYPE [a-z_]+ (histogram|counter|gauge))$', line), line
+        else:
+            assert SAMPLE.match(line), line
+
+    series = 'endpoint="categories_routes.get_categories",method="GET",status="200"'
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines
+               if line.startswith('http_request_duration_seconds_bucket{' + series)]
+    assert buckets == sorted(buckets)
+    # One process-wide registry, so earlier tests' requests count too.
+    assert buckets and buckets[-1] >= 1
+    assert f'http_request_duration_seconds_count{{{series}}} {buckets[-1]}' in lines
+
+
+def test_every_response_carries_server_timing(client):
+    response = client.get('/api/categories/')
+
+    assert SERVER_TIMING.match(response.headers['Server-Timing'])
+
+
+def test_profile_is_ignored_when_profiling_is_off():
+    app = make_app(PROFILING_ENABLED=False)
+    with app.app_context():
+        response = app.test_client().get('/api/pool/stats?profile=1')
+
+    assert response.status_code == 200
+    assert response.is_json
+
+
+def test_profile_returns_the_profile_when_profiling_is_on():
+    app = make_app(PROFILING_ENABLED=True)
+    with app.app_context():
+        response = app.test_client().get('/api/pool/stats?profile=1')
+
+    assert response.mimetype == 'text/plain'
+    assert 'pool_stats_view' in response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('path', ['/metrics', '/api/pool/stats', '/api/cache/stats'])
+def test_stats_endpoints_are_off_outside_debug_and_tests(path):
+    hidden = make_app(TESTING=False)
+    enabled = make_app(TESTING=False, STATS_ENDPOINTS_ENABLED=True)
+
+    with hidden.app_context():
+        assert hidden.test_client().get(path).status_code == 404
+    with enabled.app_context():
+        assert enabled.test_client().get(path).status_code == 200
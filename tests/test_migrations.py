@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+from sqlalchemy import create_engine, inspect, insert, update, delete
+from src.api.utils.database import db
+from src.api.utils.migrations import upgrade_database, pending_migrations, MIGRATION_MODELS
+from src.api.migrations import m0001_baseline, m0009_receipt_daily_issued_quantity
+from src.api.models import ReceiptDaily
+from src.api.utils.stock_ledger import verify_stock_balances
+from src.api.utils.material_costs import verify_material_costs
+from src.api.utils.stock_snapshots import verify_stock_snapshots
+from src.api.utils.analytics import verify_rollups
+
+
+def describe(engine):
+    """Tables, columns, keys and indexes as the database reports them."""
+    inspector = inspect(engine)
+    schema = {}
+    for table in inspector.get_table_names():
+        schema[table] = {
+            # Sorted: ALTER TABLE appends, the models may not.
+            'columns': sorted((column['name'], str(column['type']), column['nullable'])
+                              for column in inspector.get_columns(table)),
+            'primary_key': inspector.get_pk_constraint(table)['constrained_columns'],
+            'foreign_keys': sorted(
+                (tuple(key['constrained_columns']), key['referred_table'],
+                 tuple(key['referred_columns']), key['options'].get('ondelete'))
+                for key in inspector.get_foreign_keys(table)),
+            'indexes': sorted((index['name'], tuple(index['column_names']), bool(index['unique']))
+                              for index in inspector.get_indexes(table)),
+            'unique': sorted(tuple(constraint['column_names'])
+                             for constraint in inspector.get_unique_constraints(table)),
+        }
+    return schema
+
+
+def test_migrations_build_the_model_schema(file_app, tmp_path):
+    upgrade_database()
+    assert all(not versions for versions in pending_migrations().values())
+
+    for bind_key, metadata in db.metadatas.items():
+        reference = create_engine(f"sqlite:///{tmp_path / f'reference_{bind_key}.db'}")
+        metadata.create_all(reference)
+        assert describe(db.engines[bind_key]) == describe(reference)
+        reference.dispose()
+
+
+def test_upgrade_is_idempotent(file_app):
+    upgrade_database()
+    assert upgrade_database() == {bind_key: [] for bind_key in db.metadatas}
+
+
+def _create_baseline(connection, rows):
+    m0001_baseline.metadata.create_all(connection)
+    for table_name, table_rows in rows.items():
+        connection.execute(insert(m0001_baseline.metadata.tables[table_name]), table_rows)
+
+
+def _create_baseline_documents():
+    day = date.today() - timedelta(days=5)
+    with db.engines[None].begin() as connection:
+        _create_baseline(connection, {
+            'suppliers': [{'id': 1, 'name': 'Mill'}],
+            'goods': [{'id': 1, 'name': 'Flour bag', 'material_code': 'FLOUR',
+                       'convert_rate': 25, 'goods_unit': 'bag', 'supplier_id': 1}],
+            'invoices': [{'id': 1, 'code': 'INV1', 'created_date': day, 'supplier_id': 1},
+                         {'id': 2, 'code': 'INV2', 'created_date': day + timedelta(days=1), 'supplier_id': 1}],
+            'invoices_goods': [
+                {'invoice_id': 1, 'goods_id': 1, 'buy_quantity': 2, 'buying_price_per_unit': 100},
+                {'invoice_id': 2, 'goods_id': 1, 'buy_quantity': 3, 'buying_price_per_unit': 120},
+            ],
+        })
+    with db.engines['IMS_db'].begin() as connection:
+        _create_baseline(connection, {
+            'stocks': [{'id': 1, 'stock_code': 'ST1'}],
+            'raw_materials': [{'id': 1, 'code': 'FLOUR', 'name': 'Flour', 'default_unit': 'kg'}],
+            'receipts': [{'id': 1, 'receipt_code': 'R1', 'created_date': day, 'stock_id': 1},
+                         {'id': 2, 'receipt_code': 'R2', 'created_date': day + timedelta(days=2), 'stock_id': 1}],
+            'receipt_raw_material': [
+                {'receipt_id': 1, 'raw_material_id': 1, 'quantity': 50},
+                {'receipt_id': 2, 'raw_material_id': 1, 'quantity': -7.5},
+            ],
+        })
+
+
+def test_upgrade_fills_derived_tables_of_an_existing_database(file_app):
+    _create_baseline_documents()
+    upgrade_database()
+
+    assert verify_stock_balances() == {}
+    assert verify_material_costs() == {}
+    assert verify_rollups() == {}
+    assert verify_stock_snapshots() == {}
+    assert all(not versions for versions in pending_migrations().values())
+
+
+def test_issued_quantity_is_backfilled(file_app):
+    _create_baseline_documents()
+    upgrade_database()
+    # As left by 0008 before the column existed: zero everywhere.
+    with db.engines['IMS_db'].begin() as connection:
+        connection.execute(update(ReceiptDaily.__table__).values(issued_quantity=0))
+    for bind_key, model in MIGRATION_MODELS.items():
+        with db.engines[bind_key].begin() as connection:
+            connection.execute(delete(model).where(model.version == m0009_receipt_daily_issued_quantity.VERSION))
+    assert verify_rollups() != {}
+
+    upgrade_database()
+
+    assert verify_rollups() == {}
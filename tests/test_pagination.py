@@ -0,0 +1,62 @@
+import pytest
+from tests.conftest import make_app
+from src.api.utils.database import db
+from src.api.utils.migrations import upgrade_database
+
+
+@pytest.fixture
+def client():
+    app = make_app(CACHE_BACKEND='memory', DEFAULT_PAGE_SIZE=2)
+    with app.app_context():
+        upgrade_database()
+        client = app.test_client()
+        client.post('/api/suppliers/', json=[{'name': f'Supplier {index}'} for index in range(5)])
+        client.post('/api/stocks/', json=[{'stock_code': f'ST{index}'} for index in range(5)])
+        yield client
+        db.session.remove()
+
+
+def test_list_without_limit_is_paged_in_an_envelope(client):
+    response = client.get('/api/suppliers/?fields=id')
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['data'] == [{'id': 1}, {'id': 2}]
+    assert body['pagination']['has_more'] is True
+    assert body['pagination']['next'] == '/api/suppliers/?fields=id&after=2'
+    assert response.headers['Link'] == '</api/suppliers/?fields=id&after=2>; rel="next"'
+
+
+def test_next_url_walks_every_page(client):
+    ids = []
+    url = '/api/suppliers/'
+    while url:
+        body = client.get(url).get_json()
+        ids += [supplier['id'] for supplier in body['data']]
+        url = body['pagination']['next']
+    assert ids == [1, 2, 3, 4, 5]
+
+
+def test_next_link_walks_every_page(client):
+    ids = []
+    url = '/api/suppliers/?limit=2'
+    while url:
+        response = client.get(url)
+        ids += [supplier['id'] for supplier in response.get_json()['data']]
+        link = response.headers.get('Link')
+        url = link[1:link.index('>')] if link else None
+    assert ids == [1, 2, 3, 4, 5]
+    assert response.get_json()['pagination']['has_more'] is False
+
+
+def test_cached_list_keeps_the_next_link(client):
+    first = client.get('/api/stocks/')
+    second = client.get('/api/stocks/')
+
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.headers['Link'] == first.headers['Link']
+    assert second.get_json() == first.get_json()
+
+
+def test_limit_is_capped(client):
+    assert client.get('/api/suppliers/?limit=1001').status_code == 422
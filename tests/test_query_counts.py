@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import event
+from tests.conftest import make_app, seed_api
+from src.api.utils.database import db
+from src.api.utils.migrations import upgrade_database
+
+# Statements per GET, whatever the number of rows: the main query plus
+# one selectinload per nested collection or relationship.
+QUERY_COUNTS = {
+    '/api/suppliers/': 5,
+    '/api/suppliers/1': 5,
+    '/api/goods/': 3,
+    '/api/goods/1': 3,
+    '/api/invoices/': 3,
+    '/api/invoices/1': 3,
+    '/api/categories/': 3,
+    '/api/categories/1': 3,
+    '/api/raw-materials/': 5,
+    '/api/raw-materials/1': 5,
+    '/api/stocks/': 5,
+    '/api/stocks/1': 5,
+    '/api/receipts/': 3,
+    '/api/receipts/1': 3,
+}
+
+
+@pytest.fixture(scope='module', params=[3, 12], ids=lambda size: f'{size} rows')
+def seeded_client(request):
+    app = make_app()
+    with app.app_context():
+        upgrade_database()
+        client = app.test_client()
+        seed_api(client, request.param)
+        yield client
+        db.session.remove()
+
+
+@pytest.mark.parametrize('path', QUERY_COUNTS)
+def test_get_runs_a_fixed_number_of_queries(seeded_client, path):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for engine in db.engines.values():
+        event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = seeded_client.get(path)
+    finally:
+        for engine in db.engines.values():
+            event.remove(engine, 'before_cursor_execute', count)
+
+    assert response.status_code in (200, 201)
+    assert len(statements) == QUERY_COUNTS[path], statements
@@ -0,0 +1,51 @@
+import time
+import pytest
+from sqlalchemy import text
+from tests.conftest import make_app
+from src.api.utils.database import db
+from src.api.utils.query_watch import NPlusOneError
+from src.api.models import Supplier
+
+
+def test_lazy_loads_are_counted_per_request(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    for index in range(8):
+        response = client.post('/api/goods/', json={
+            'name': f'Goods {index}', 'material_code': f'M{index}', 'convert_rate': 1,
+            'goods_unit': 'kg', 'supplier_id': 1})
+        assert response.status_code == 201
+
+
+def test_a_lazy_load_in_a_loop_raises(app, client):
+    def supplier_goods_counts():
+        # Deliberately lazy: one SELECT of goods per supplier.
+        return {supplier.name: len(supplier.goods) for supplier in Supplier.query.all()}
+
+    app.add_url_rule('/test/lazy', 'test_lazy', supplier_goods_counts)
+    client.post('/api/suppliers/', json=[{'name': f'Supplier {index}'} for index in range(6)])
+
+    with pytest.raises(NPlusOneError, match=r'(?s)6x .*FROM goods'):
+        client.get('/test/lazy')
+
+
+def test_a_query_over_the_threshold_is_recorded():
+    app = make_app(SLOW_QUERY_THRESHOLD_MS=50)
+
+    def slow_view():
+        connection = db.session.connection()
+        connection.connection.driver_connection.create_function(
+            'pause', 1, lambda ms: time.sleep(ms / 1000) or ms)
+        connection.execute(text('SELECT 1'))
+        connection.execute(text('SELECT pause(80)'))
+        return {}, 200
+
+    app.add_url_rule('/test/slow', 'test_slow', slow_view)
+    with app.app_context():
+        client = app.test_client()
+        client.get('/test/slow')
+        entries = client.get('/api/debug/slow-queries').get_json()
+        db.session.remove()
+
+    ours = [entry for entry in entries if entry['route'] == 'GET /test/slow (test_slow)']
+    assert [entry['statement'] for entry in ours] == ['SELECT pause(80)']
+    assert ours[0]['duration_ms'] >= 80
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+from sqlalchemy.dialects import mysql
+from src.api.utils import reconciliation
+from src.api.utils.database import db
+
+
+def test_codes_are_ordered_by_binary_collation_on_mysql(app, monkeypatch):
+    bind = SimpleNamespace(dialect=mysql.dialect())
+    monkeypatch.setattr(db.session, 'get_bind', lambda **kwargs: bind)
+    for statement in (reconciliation.invoiced_statement(), reconciliation.received_statement()):
+        sql = str(statement.compile(dialect=mysql.dialect()))
+        assert 'GROUP BY' in sql and sql.count('COLLATE utf8mb4_bin') == 3
+
+
+def test_mixed_case_codes_are_merged_in_code_point_order(client):
+    client.post('/api/suppliers/', json=[{'name': 'Mill'}])
+    client.post('/api/goods/', json=[
+        {'name': name, 'material_code': code, 'convert_rate': 1, 'goods_unit': 'kg', 'supplier_id': 1}
+        for name, code in (('Flour', 'flour'), ('Sugar', 'SUGAR'), ('Salt', 'Salt'))])
+    client.post('/api/raw-materials/', json=[
+        {'code': code, 'name': code, 'default_unit': 'kg'} for code in ('FLOUR', 'SUGAR', 'salt')])
+    client.post('/api/stocks/', json=[{'stock_code': 'ST1'}])
+    client.post('/api/invoices/', json={
+        'invoice': {'code': 'INV1', 'created_date': '2026-01-02', 'supplier_id': 1},
+        'list_of_bought_goods': [{'goods_id': goods_id, 'buy_quantity': '1', 'buying_price_per_unit': '10'}
+                                 for goods_id in (1, 2, 3)]})
+    client.post('/api/receipts/', json={
+        'receipt': {'receipt_code': 'R1', 'created_date': '2026-01-03', 'stock_id': 1},
+        'list_of_raw_materials': [{'raw_material_id': raw_material_id, 'quantity': '1'}
+                                  for raw_material_id in (1, 2, 3)]})
+
+    response = client.get('/api/raw-materials/reconciliation/')
+
+    assert response.status_code == 200
+    rows = {row['material_code']: row['status'] for row in response.get_json()}
+    assert list(rows) == sorted(rows)
+    assert rows == {'FLOUR': 'receipt_only', 'SUGAR': 'matched', 'Salt': 'invoice_only',
+                    'flour': 'invoice_only', 'salt': 'receipt_only'}
@@ -0,0 +1,97 @@
+"""Generated serializers (src/api/schemas/serializers.py) against
+marshmallow's dump(): the encoded JSON must be byte-identical.
+
+Measured with benchmarks/serializers.py on SQLite, 50k goods and about 55k
+invoice lines:
+- dumping 1000 goods with their purchase history: 517 ms with dump(), 153 ms
+  compiled (3.4x);
+- GET /api/goods/ (default page of 100, with purchased_history): 447 ms ->
+  332 ms (1.35x), as ORM loading of the nested lines is ~85% of the request;
+- GET /api/goods/?limit=1000 without purchased_history: 16.3 ms -> 9.6 ms
+  (1.7x).
+The 3x asked for on the whole request is not reached; see the benchmark.
+"""
+import pytest
+from marshmallow import fields
+from sqlalchemy import select
+from tests.conftest import make_app, seed_api
+from src.api.utils.database import db
+from src.api.utils.migrations import upgrade_database
+from src.api.utils.pagination import schema_for
+from src.api.schemas import all_schemas
+
+# Every schema, whole and with sparse fieldsets: nested objects and lists,
+# DecimalToString, Date and Method (category_name) fields, and NULLs.
+SCHEMA_FIELDSETS = [
+    (all_schemas.SupplierSchema, (None, ('id', 'name', 'email'), ('goods', 'id'), ('invoices',))),
+    (all_schemas.GoodsSchema, (None, ('id', 'convert_rate', 'supplier'), ('purchased_history',))),
+    (all_schemas.InvoiceSchema, (None, ('code', 'created_date'), ('list_of_bought_goods', 'supplier'))),
+    (all_schemas.InvoiceGoodsSchema, (None, ('buy_quantity', 'vat_precentage', 'goods', 'invoice'))),
+    (all_schemas.StockSchema, (None, ('id', 'stock_code', 'max_capacity'), ('receipts',))),
+    (all_schemas.CategorySchema, (None, ('name',))),
+    (all_schemas.ReceiptSchema, (None, ('receipt_code', 'stock'), ('list_of_raw_materials',))),
+    (all_schemas.ReceiptRawMaterialSchema, (None, ('quantity', 'raw_material', 'receipt'))),
+    (all_schemas.RawMaterialSchema, (None, ('code', 'category_name'), ('movement_history',))),
+]
+
+LIST_PATHS = [
+    '/api/suppliers/',
+    '/api/goods/',
+    '/api/goods/?fields=id,name,supplier&limit=3',
+    '/api/invoices/',
+    '/api/categories/',
+    '/api/raw-materials/',
+    '/api/stocks/',
+    '/api/receipts/',
+]
+
+
+@pytest.fixture(scope='module')
+def seeded_app():
+    app = make_app()
+    with app.app_context():
+        upgrade_database()
+        seed_api(app.test_client(), 6)
+        yield app
+        db.session.remove()
+
+
+@pytest.mark.parametrize('schema_cls, only', [
+    (schema_cls, only) for schema_cls, fieldsets in SCHEMA_FIELDSETS for only in fieldsets
+], ids=lambda value: getattr(value, '__name__', None) or ','.join(value or ('all',)))
+def test_serialize_matches_dump(seeded_app, schema_cls, only):
+    schema = schema_for(schema_cls, only)
+    model = schema_cls.Meta.model
+    rows = db.session.scalars(
+        select(model).options(*schema.loader_options()).order_by(model.id)).all()
+
+    assert rows
+    assert seeded_app.json.dumps(schema.serialize(rows)) == seeded_app.json.dumps(schema.dump(rows))
+    db.session.expunge_all()
+
+
+@pytest.mark.parametrize('path', LIST_PATHS)
+def test_list_response_is_the_same_with_and_without_compiled_serializers(seeded_app, path):
+    client = seeded_app.test_client()
+    seeded_app.config['COMPILED_SERIALIZERS'] = False
+    try:
+        expected = client.get(path).get_data()
+    finally:
+        seeded_app.config['COMPILED_SERIALIZERS'] = True
+
+    assert client.get(path).get_data() == expected
+
+
+def test_fields_without_an_inline_form_fall_back_to_marshmallow(seeded_app):
+    class LabelledGoodsSchema(all_schemas.GoodsSchema):
+        rate = fields.Float(attribute='convert_rate')
+        label = fields.Function(lambda goods: f'{goods.material_code}/{goods.goods_unit}')
+
+        class Meta(all_schemas.GoodsSchema.Meta):
+            fields = ('id', 'rate', 'label', 'supplier')
+
+    schema = LabelledGoodsSchema(many=True)
+    rows = db.session.scalars(select(all_schemas.Goods).options(*schema.loader_options())).all()
+
+    assert schema.serialize(rows) == schema.dump(rows)
+    assert schema.serialize(rows)[0]['label'] == 'M0/kg'